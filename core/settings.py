@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -97,11 +98,71 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# 通过环境变量选择数据库: DB_ENGINE=sqlite（默认）或 postgres
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'rbac'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+        }
+    }
+    # DB_POOL_MAX_SIZE > 0 时使用 psycopg 连接池（需要安装 psycopg[pool]），否则使用持久连接
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '0'))
+    if DB_POOL_MAX_SIZE > 0:
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
+            }
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        }
+    }
+
+# 只读副本: DB_REPLICA_NAMES 为逗号分隔的副本数据库名称（SQLite 为文件路径），
+# PostgreSQL 副本可通过 DB_REPLICA_HOSTS 指定与之一一对应的主机
+DATABASE_REPLICAS = []
+_replica_names = [name for name in os.environ.get('DB_REPLICA_NAMES', '').split(',') if name]
+_replica_hosts = [host for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host]
+for _index, _name in enumerate(_replica_names, start=1):
+    _alias = f'replica{_index}'
+    DATABASES[_alias] = {
+        **DATABASES['default'],
+        'NAME': _name,
+        # 测试时副本直接使用 default 的测试库
+        'TEST': {'MIRROR': 'default'},
     }
+    if _index <= len(_replica_hosts):
+        DATABASES[_alias]['HOST'] = _replica_hosts[_index - 1]
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ['utils.db.ReplicaRouter']
+
+# 写入后把同一用户的读取固定到主库的秒数，用于读到自己的写入
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', '5'))
+
+# SQLite 连接建立时执行的 PRAGMA，由 utils.db.apply_sqlite_pragmas 应用
+# WAL 模式下写入不会阻塞读取；synchronous=NORMAL 在 WAL 下仍能保证崩溃后数据库一致
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('DB_SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('DB_SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('DB_SQLITE_BUSY_TIMEOUT', '5000')),
+    'mmap_size': int(os.environ.get('DB_SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
 }
 
 
@@ -152,20 +213,77 @@ AUTH_USER_MODEL = 'rbac.User'
 # REST Framework 设置
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rbac.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10
+    'PAGE_SIZE': 10,
+    # 安装了 orjson 时使用更快的 JSON 编解码，输出与默认的 JSONRenderer 一致
+    'DEFAULT_RENDERER_CLASSES': (
+        'utils.fastjson.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'utils.fastjson.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
+# 在 ASGI 下用异步视图处理导航数据（链接、标签）的 list/retrieve 请求
+ASYNC_NAVIGATION_READS = os.environ.get('ASYNC_NAVIGATION_READS', '0') == '1'
+
+# 登录时的密码哈希在有界线程池中计算；执行中和排队中的请求达到上限时返回503
+LOGIN_POOL_WORKERS = int(os.environ.get('LOGIN_POOL_WORKERS', os.cpu_count() or 1))
+LOGIN_POOL_MAX_PENDING = int(os.environ.get('LOGIN_POOL_MAX_PENDING', LOGIN_POOL_WORKERS * 4))
+
+# 导入用户接口在请求内计算密码哈希（不启动进程池），每批的记录数和单个文件的记录数上限；
+# 更大的文件使用 import_users 命令导入
+USER_IMPORT_BATCH_SIZE = int(os.environ.get('USER_IMPORT_BATCH_SIZE', 25))
+USER_IMPORT_MAX_ROWS = int(os.environ.get('USER_IMPORT_MAX_ROWS', 50))
+
+# 在 ASGI 下用异步视图处理登录和获取令牌请求
+ASYNC_LOGIN = os.environ.get('ASYNC_LOGIN', '0') == '1'
+
+# 已验证访问令牌的缓存条目上限和分片数，JWT_CACHE_SIZE=0 时关闭缓存
+JWT_CACHE_SIZE = int(os.environ.get('JWT_CACHE_SIZE', 10000))
+JWT_CACHE_SHARDS = int(os.environ.get('JWT_CACHE_SHARDS', 16))
+
+# 链接热度：半衰期（小时）、第一个周期的基准时间、榜单长度和后台刷新间隔（秒）
+POPULARITY_HALF_LIFE_HOURS = float(os.environ.get('POPULARITY_HALF_LIFE_HOURS', 168))
+POPULARITY_EPOCH = os.environ.get('POPULARITY_EPOCH', '2024-01-01T00:00:00+00:00')
+POPULARITY_TOP_N = int(os.environ.get('POPULARITY_TOP_N', 50))
+POPULARITY_REFRESH_SECONDS = float(os.environ.get('POPULARITY_REFRESH_SECONDS', 60))
+
+# 点击汇总：内存缓冲写入汇总表的间隔（秒）和缓冲的时间段数量上限，小时和天粒度汇总的保留天数
+CLICK_FLUSH_SECONDS = float(os.environ.get('CLICK_FLUSH_SECONDS', 5))
+CLICK_FLUSH_MAX_KEYS = int(os.environ.get('CLICK_FLUSH_MAX_KEYS', 5000))
+CLICK_HOURLY_RETENTION_DAYS = int(os.environ.get('CLICK_HOURLY_RETENTION_DAYS', 7))
+CLICK_DAILY_RETENTION_DAYS = int(os.environ.get('CLICK_DAILY_RETENTION_DAYS', 400))
+
+# 导航快照：输出目录、保留的版本数、写入后延迟发布的秒数、是否在写入后自动发布，版本指针的缓存秒数
+SNAPSHOT_ROOT = Path(os.environ.get('SNAPSHOT_ROOT', BASE_DIR / 'snapshots'))
+SNAPSHOT_KEEP = int(os.environ.get('SNAPSHOT_KEEP', 5))
+SNAPSHOT_DEBOUNCE_SECONDS = float(os.environ.get('SNAPSHOT_DEBOUNCE_SECONDS', 2))
+SNAPSHOT_AUTO_PUBLISH = os.environ.get('SNAPSHOT_AUTO_PUBLISH', '1') == '1'
+SNAPSHOT_POINTER_MAX_AGE = int(os.environ.get('SNAPSHOT_POINTER_MAX_AGE', 30))
+
+# 导航变更日志的保留天数，更早游标的客户端需要重新全量同步
+CHANGE_LOG_RETENTION_DAYS = int(os.environ.get('CHANGE_LOG_RETENTION_DAYS', 30))
+
+# 链接检查：同时检查的链接数、每个主机的并发连接数、单个链接的超时秒数、重新检查的间隔小时数
+LINK_CHECK_CONCURRENCY = int(os.environ.get('LINK_CHECK_CONCURRENCY', 50))
+LINK_CHECK_PER_HOST = int(os.environ.get('LINK_CHECK_PER_HOST', 4))
+LINK_CHECK_TIMEOUT = float(os.environ.get('LINK_CHECK_TIMEOUT', 10))
+LINK_CHECK_INTERVAL_HOURS = int(os.environ.get('LINK_CHECK_INTERVAL_HOURS', 24))
+
 # JWT 设置
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-    'ROTATE_REFRESH_TOKENS': False,
+    'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': False,
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
@@ -175,8 +293,15 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    # 使用 rbac 的撤销列表代替 simplejwt 的黑名单应用，刷新时不必每次查询数据库
+    'TOKEN_REFRESH_SERIALIZER': 'rbac.serializers.RevokingTokenRefreshSerializer',
 }
 
+# 刷新令牌撤销列表的布隆过滤器容量、误判率和增量同步间隔（秒）
+TOKEN_REVOCATION_BLOOM_CAPACITY = int(os.environ.get('TOKEN_REVOCATION_BLOOM_CAPACITY', 100000))
+TOKEN_REVOCATION_BLOOM_ERROR_RATE = float(os.environ.get('TOKEN_REVOCATION_BLOOM_ERROR_RATE', 0.001))
+TOKEN_REVOCATION_SYNC_SECONDS = float(os.environ.get('TOKEN_REVOCATION_SYNC_SECONDS', 5))
+
 # Swagger 设置
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
@@ -0,0 +1,221 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from navigation.models import LinkClickRollup, Links
+from navigation.serializers import LOOKUP_BATCH_SIZE
+from utils.streaming import iter_batches
+
+logger = logging.getLogger(__name__)
+
+HOUR = LinkClickRollup.GRANULARITY_HOUR
+DAY = LinkClickRollup.GRANULARITY_DAY
+
+# 每条 INSERT 语句携带的行数（每行 4 个参数，低于 SQLite 默认的 999 个参数上限）
+UPSERT_BATCH_SIZE = 200
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def bucket_start(at, granularity):
+    """
+    返回时间所在时间段的起点
+
+    按 TIME_ZONE 的本地时间截断，天粒度的时间段与用户看到的日期一致。
+    """
+    local = timezone.localtime(at).replace(minute=0, second=0, microsecond=0)
+    if granularity == DAY:
+        local = local.replace(hour=0)
+    return local
+
+
+def upsert_rollups(counts, batch_size=UPSERT_BATCH_SIZE):
+    """
+    把 {(链接ID, 粒度, 时间段起点): 次数} 累加写入汇总表
+
+    使用 INSERT ... ON CONFLICT DO UPDATE 在数据库中累加，多进程同时写入同一时间段不会互相覆盖；
+    SQLite（3.24+）和 PostgreSQL 的语法相同。写入前跳过已删除的链接。
+
+    返回:
+        写入的行数
+    """
+    link_ids = {link_id for link_id, _, _ in counts}
+    existing = set()
+    for batch in iter_batches(link_ids, LOOKUP_BATCH_SIZE):
+        existing.update(Links.objects.filter(pk__in=batch).values_list('pk', flat=True))
+    rows = [
+        (link_id, granularity, connection.ops.adapt_datetimefield_value(bucket), count)
+        for (link_id, granularity, bucket), count in counts.items()
+        if link_id in existing
+    ]
+    if not rows:
+        return 0
+
+    qn = connection.ops.quote_name
+    table = qn(LinkClickRollup._meta.db_table)
+    link, granularity, bucket, count = (
+        qn(LinkClickRollup._meta.get_field(name).column) for name in ('link', 'granularity', 'bucket', 'count')
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        for batch in iter_batches(rows, batch_size):
+            placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(batch))
+            cursor.execute(
+                f'INSERT INTO {table} ({link}, {granularity}, {bucket}, {count}) VALUES {placeholders} '
+                f'ON CONFLICT ({granularity}, {link}, {bucket}) DO UPDATE SET {count} = {table}.{count} + excluded.{count}',
+                [value for row in batch for value in row],
+            )
+    return len(rows)
+
+
+class ClickAggregator:
+    """
+    进程内的点击聚合器
+
+    每次点击只在内存中累加对应的小时和天两个时间段，缓冲的时间段数量达到 max_keys
+    或距上次写入超过 flush_interval 秒时，由后台线程批量累加写入汇总表。
+    写入量只与活跃的（链接, 时间段）数量有关，与点击次数无关；写入失败的计数会放回缓冲区下次重试。
+    进程退出时写入剩余的计数，进程异常终止时最多丢失一个写入周期的点击。
+
+    参数:
+        flush_interval: 两次写入的最大间隔（秒），默认每次读取 CLICK_FLUSH_SECONDS
+        max_keys: 缓冲的时间段数量上限，默认每次读取 CLICK_FLUSH_MAX_KEYS
+    """
+
+    def __init__(self, flush_interval=None, max_keys=None):
+        self._flush_interval = flush_interval
+        self._max_keys = max_keys
+        self._counts = Counter()
+        self._flushed_at = time.monotonic()
+        self._flushing = False
+        self._lock = threading.Lock()
+        # 串行化写入，避免后台写入与退出时的写入交错
+        self._flush_lock = threading.Lock()
+
+    @property
+    def flush_interval(self):
+        # 在使用时读取配置，override_settings 对模块级的实例同样生效
+        if self._flush_interval is None:
+            return _setting('CLICK_FLUSH_SECONDS', 5)
+        return self._flush_interval
+
+    @property
+    def max_keys(self):
+        if self._max_keys is None:
+            return _setting('CLICK_FLUSH_MAX_KEYS', 5000)
+        return self._max_keys
+
+    def add(self, link_id, at=None, count=1):
+        at = at or timezone.now()
+        with self._lock:
+            for granularity in (HOUR, DAY):
+                self._counts[(int(link_id), granularity, bucket_start(at, granularity))] += count
+            due = (len(self._counts) >= self.max_keys
+                   or time.monotonic() - self._flushed_at >= self.flush_interval)
+            if not due or self._flushing:
+                return
+            self._flushing = True
+        threading.Thread(target=self._flush_in_background, daemon=True).start()
+
+    def pending(self):
+        """缓冲区中尚未写入的时间段数量"""
+        with self._lock:
+            return len(self._counts)
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+    def flush(self):
+        """
+        把缓冲区写入汇总表
+
+        返回:
+            写入的行数
+        """
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, Counter()
+                self._flushed_at = time.monotonic()
+            try:
+                return upsert_rollups(counts) if counts else 0
+            except Exception:
+                logger.exception('写入点击汇总失败，%s 个时间段将在下次重试', len(counts))
+                with self._lock:
+                    self._counts.update(counts)
+                return 0
+            finally:
+                self._flushing = False
+
+
+click_aggregator = ClickAggregator()
+atexit.register(click_aggregator.flush)
+
+
+def _next_bucket(bucket, granularity):
+    """下一个时间段的起点，按本地时间推进"""
+    if granularity == DAY:
+        return timezone.make_aware(timezone.make_naive(bucket) + timedelta(days=1))
+    return bucket_start(bucket + timedelta(hours=1), HOUR)
+
+
+def _since(days, granularity):
+    """最近 days 天的第一个时间段起点：天粒度含今天，小时粒度为最近 days * 24 个小时"""
+    if granularity == DAY:
+        return timezone.make_aware(timezone.make_naive(bucket_start(timezone.now(), DAY)) - timedelta(days=days - 1))
+    return bucket_start(timezone.now(), HOUR) - timedelta(hours=days * 24 - 1)
+
+
+def clicks_by_link(days=30, limit=None):
+    """
+    最近 days 天每个链接的点击次数，只读取天粒度汇总
+
+    返回:
+        [{'id', 'title', 'url', 'clicks'}, ...]，按点击次数降序排列
+    """
+    rows = (
+        LinkClickRollup.objects
+        .filter(granularity=DAY, bucket__gte=_since(days, DAY))
+        .values_list('link_id', 'link__title', 'link__url')
+        .annotate(clicks=Sum('count'))
+        .order_by('-clicks', 'link_id')
+    )
+    return [
+        {'id': link_id, 'title': title, 'url': url, 'clicks': clicks}
+        for link_id, title, url, clicks in (rows[:limit] if limit else rows)
+    ]
+
+
+def link_click_series(link_id, days=30, granularity=DAY):
+    """
+    某个链接最近 days 天按时间段的点击次数，没有点击的时间段补 0
+
+    返回:
+        [{'bucket', 'clicks'}, ...]，按时间升序排列
+    """
+    since = _since(days, granularity)
+    counts = dict(
+        LinkClickRollup.objects
+        .filter(granularity=granularity, link_id=link_id, bucket__gte=since)
+        .values_list('bucket', 'count')
+    )
+    counts = {bucket_start(bucket, granularity): count for bucket, count in counts.items()}
+
+    end = bucket_start(timezone.now(), granularity)
+    series = []
+    bucket = since
+    while bucket <= end:
+        series.append({'bucket': bucket, 'clicks': counts.get(bucket, 0)})
+        bucket = _next_bucket(bucket, granularity)
+    return series
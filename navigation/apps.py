@@ -4,3 +4,32 @@ from django.apps import AppConfig
 class NavigationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'navigation'
+
+    def ready(self):
+        from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+
+        from navigation import changes, snapshot, tag_counts
+        from navigation.models import Links, Tags
+
+        m2m_changed.connect(tag_counts.link_tags_changed, sender=Links.tags.through,
+                            dispatch_uid='tag_counts_link_tags_changed')
+        pre_delete.connect(tag_counts.link_deleted, sender=Links, dispatch_uid='tag_counts_link_deleted')
+        pre_delete.connect(tag_counts.tag_deleted, sender=Tags, dispatch_uid='tag_counts_tag_deleted')
+        pre_save.connect(tag_counts.tag_pre_save, sender=Tags, dispatch_uid='tag_counts_tag_pre_save')
+        post_save.connect(tag_counts.tag_post_save, sender=Tags, dispatch_uid='tag_counts_tag_post_save')
+
+        # 导航数据变化后重新发布快照
+        for model in (Links, Tags):
+            post_save.connect(snapshot.catalog_changed, sender=model, dispatch_uid=f'snapshot_{model.__name__}_saved')
+            post_delete.connect(snapshot.catalog_changed, sender=model,
+                                dispatch_uid=f'snapshot_{model.__name__}_deleted')
+        m2m_changed.connect(snapshot.catalog_changed, sender=Links.tags.through, dispatch_uid='snapshot_link_tags')
+
+        # 增量同步的变更日志
+        post_save.connect(changes.link_saved, sender=Links, dispatch_uid='changes_link_saved')
+        post_delete.connect(changes.link_deleted, sender=Links, dispatch_uid='changes_link_deleted')
+        post_save.connect(changes.tag_saved, sender=Tags, dispatch_uid='changes_tag_saved')
+        pre_delete.connect(changes.tag_pre_delete, sender=Tags, dispatch_uid='changes_tag_pre_delete')
+        post_delete.connect(changes.tag_deleted, sender=Tags, dispatch_uid='changes_tag_deleted')
+        m2m_changed.connect(changes.link_tags_changed, sender=Links.tags.through,
+                            dispatch_uid='changes_link_tags_changed')
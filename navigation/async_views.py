@@ -0,0 +1,142 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from navigation.models import Links, Tags
+from navigation.serializers import LinksSerializer, TagsSerializer
+from navigation.views import LinksView, TagsView
+from utils.db import REPLICA_PIN_COOKIE, use_replica_for_reads
+from utils.fastjson import FastJSONRenderer
+from utils.fieldsets import get_sparse_fieldset
+
+
+class AsyncReadView(View):
+    """
+    导航数据的异步只读视图
+
+    GET 请求直接在事件循环中使用异步 ORM（aiterator、afirst、acount，预取在 aiterator 中异步完成）
+    查询并序列化，在 ASGI 下不占用线程池；其他方法转交给对应 DRF 视图集的同步实现。
+    响应格式与视图集的 list/retrieve 完全一致。
+
+    子类需要设置 queryset、serializer_class 和 viewset。
+    """
+    queryset = None
+    serializer_class = None
+    viewset = None
+    detail = False
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # 与 DRF 视图一致，由认证类而不是 CSRF 中间件负责校验
+        view.csrf_exempt = True
+        return view
+
+    def get_queryset(self):
+        # 与视图集一致，按 ?fields= 和 ?expand= 裁剪查询的列和预取
+        return self.get_serializer().project_queryset(self.queryset.all())
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.fieldset
+        return self.serializer_class(*args, fields=fields, expand=expand, **kwargs)
+
+    async def get(self, request, pk=None):
+        self.fieldset = get_sparse_fieldset(request.GET)
+        # 异步视图中不能同步读取 request.user，只根据 Cookie 判断是否需要固定到主库
+        try:
+            with use_replica_for_reads(not request.COOKIES.get(REPLICA_PIN_COOKIE)):
+                if self.detail:
+                    data = await self.retrieve(pk)
+                else:
+                    data = await self.list(request)
+        except (NotFound, ParseError) as exc:
+            return self.render({'detail': exc.detail}, status=exc.status_code)
+        return self.render(data)
+
+    async def retrieve(self, pk):
+        instance = await self.get_queryset().filter(pk=pk).afirst()
+        if instance is None:
+            # 与 DRF 的 get_object_or_404 使用相同的提示
+            raise NotFound(f'No {self.queryset.model._meta.object_name} matches the given query.')
+        return self.get_serializer(instance).data
+
+    async def list(self, request):
+        paginator = PageNumberPagination()
+        page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE')
+        # 与视图集使用相同的过滤和排序参数
+        queryset = self.get_queryset()
+        for backend in self.viewset.filter_backends:
+            queryset = backend().filter_queryset(request, queryset, self.viewset)
+        count = await queryset.acount()
+
+        page_number = request.GET.get(paginator.page_query_param) or 1
+        if page_number in paginator.last_page_strings:
+            page_number = max(1, -(-count // page_size))
+        try:
+            page_number = int(page_number)
+            if page_number < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(paginator.invalid_page_message)
+
+        offset = (page_number - 1) * page_size
+        if offset and offset >= count:
+            raise NotFound(paginator.invalid_page_message)
+
+        page = queryset[offset:offset + page_size]
+        instances = [instance async for instance in page.aiterator(chunk_size=page_size)]
+
+        url = request.build_absolute_uri()
+        next_url = None
+        if offset + page_size < count:
+            next_url = replace_query_param(url, paginator.page_query_param, page_number + 1)
+        previous_url = None
+        if page_number > 1:
+            if page_number == 2:
+                previous_url = remove_query_param(url, paginator.page_query_param)
+            else:
+                previous_url = replace_query_param(url, paginator.page_query_param, page_number - 1)
+
+        return {
+            'count': count,
+            'next': next_url,
+            'previous': previous_url,
+            'results': self.get_serializer(instances, many=True).data,
+        }
+
+    def render(self, data, status=200):
+        return HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
+
+    async def _delegate(self, request, *args, **kwargs):
+        if self.detail:
+            actions = {'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+        else:
+            actions = {'post': 'create'}
+        view = self.viewset.as_view(actions)
+
+        def call_view():
+            # DRF 的 Response 需要在同步线程中完成渲染
+            return view(request, *args, **kwargs).render()
+
+        return await sync_to_async(call_view)()
+
+    post = put = patch = delete = _delegate
+
+    async def options(self, request, *args, **kwargs):
+        return await self._delegate(request, *args, **kwargs)
+
+
+class AsyncLinksReadView(AsyncReadView):
+    queryset = Links.objects.all().prefetch_related('tags')
+    serializer_class = LinksSerializer
+    viewset = LinksView
+
+
+class AsyncTagsReadView(AsyncReadView):
+    queryset = Tags.objects.all()
+    serializer_class = TagsSerializer
+    viewset = TagsView
@@ -0,0 +1,582 @@
+import codecs
+import hashlib
+import html
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
+from html.parser import HTMLParser
+from itertools import chain
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+from django.utils.text import slugify
+
+from navigation import changes, snapshot, tag_counts
+from navigation.duplicates import hash_holders
+from navigation.models import Links, Tags
+from navigation.serializers import LOOKUP_BATCH_SIZE, WRITE_BATCH_SIZE
+from utils.jsonstream import READ_SIZE, iter_json_events
+from utils.streaming import iter_batches
+from utils.urlnorm import url_hash
+
+# 支持的书签文件格式及其 Content-Type
+BOOKMARK_FORMATS = {
+    'html': 'text/html',
+    'json': 'application/json',
+}
+
+TITLE_MAX_LENGTH = Links._meta.get_field('title').max_length
+URL_MAX_LENGTH = Links._meta.get_field('url').max_length
+TAG_NAME_MAX_LENGTH = Tags._meta.get_field('name').max_length
+# 标题重复时最多尝试的编号数
+TITLE_SUFFIX_ATTEMPTS = 5
+# Chrome 书签时间戳的起点（1601-01-01，单位微秒）
+CHROME_EPOCH_OFFSET = 11644473600
+
+_validate_url = URLValidator()
+
+
+def guess_bookmark_format(filename, default='html'):
+    """根据文件扩展名推断书签文件格式"""
+    suffix = str(filename).rsplit('.', 1)[-1].lower()
+    if suffix in ('htm', 'html'):
+        return 'html'
+    if suffix == 'json':
+        return 'json'
+    return default
+
+
+# 书签文件统一解析为以下事件：
+#   ('folder_start', 文件夹编号, 上级文件夹编号或 None)
+#   ('bookmark', 所在文件夹编号或 None, 序号, {'title', 'url', 'description', 'icon'})
+#   ('folder_end', 文件夹编号, 文件夹名称或 None)
+# 文件夹名称在结束时给出：Chrome 的 JSON 中 children 排在 name 之前。名称为 None 的文件夹
+# （HTML 的最外层、Chrome 的 roots、Firefox 的根容器）不对应标签。
+
+
+class _NetscapeParser(HTMLParser):
+    """Netscape 书签 HTML 的增量解析器，每次 feed 后通过 pop_events 取出已解析的事件"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.events = []
+        self.folders = []
+        self.next_folder = 0
+        self.count = 0
+        self.pending_name = None
+        self.bookmark = None
+        self.capture = None
+        self.text = []
+
+    def pop_events(self):
+        events, self.events = self.events, []
+        return events
+
+    def _flush_bookmark(self):
+        if self.bookmark is not None:
+            folder = self.folders[-1][0] if self.folders else None
+            self.count += 1
+            self.events.append(('bookmark', folder, self.count, self.bookmark))
+            self.bookmark = None
+
+    def _end_capture(self):
+        text = ''.join(self.text).strip()
+        capture, self.capture, self.text = self.capture, None, []
+        return capture, text
+
+    def handle_starttag(self, tag, attrs):
+        if self.capture == 'dd' and tag in ('dt', 'dl', 'h3', 'a'):
+            self.bookmark['description'] = self._end_capture()[1] or None
+        if tag in ('dt', 'h3', 'dl', 'a'):
+            self._flush_bookmark()
+        if tag == 'dt':
+            # <DT><H3> 之后没有 <DL> 的空文件夹
+            self.pending_name = None
+        elif tag == 'h3':
+            self.capture = 'h3'
+        elif tag == 'a':
+            attrs = dict(attrs)
+            self.bookmark = {'url': attrs.get('href') or '', 'icon': None, 'description': None, 'title': ''}
+            self.capture = 'a'
+        elif tag == 'dd' and self.bookmark is not None:
+            self.capture = 'dd'
+        elif tag == 'dl':
+            parent = self.folders[-1][0] if self.folders else None
+            self.folders.append((self.next_folder, self.pending_name))
+            self.events.append(('folder_start', self.next_folder, parent))
+            self.next_folder += 1
+            self.pending_name = None
+
+    def handle_endtag(self, tag):
+        if tag == 'h3' and self.capture == 'h3':
+            self.pending_name = self._end_capture()[1]
+        elif tag == 'a' and self.capture == 'a':
+            self.bookmark['title'] = self._end_capture()[1]
+        elif tag == 'dl' and self.folders:
+            if self.capture == 'dd':
+                self.bookmark['description'] = self._end_capture()[1] or None
+            self._flush_bookmark()
+            self.pending_name = None
+            folder, name = self.folders.pop()
+            # 最外层的 <DL> 没有标题，不对应标签
+            self.events.append(('folder_end', folder, name or None))
+
+    def handle_data(self, data):
+        if self.capture:
+            self.text.append(data)
+
+    def close(self):
+        super().close()
+        if self.capture == 'dd':
+            self.bookmark['description'] = self._end_capture()[1] or None
+        self._flush_bookmark()
+        while self.folders:
+            folder, name = self.folders.pop()
+            self.events.append(('folder_end', folder, name or None))
+
+
+def iter_html_bookmarks(fileobj, read_size=READ_SIZE):
+    """流式解析 Netscape 书签 HTML（各浏览器导出的 bookmarks.html），产出书签事件"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    parser = _NetscapeParser()
+    while True:
+        data = fileobj.read(read_size)
+        parser.feed(decoder.decode(data, final=not data))
+        yield from parser.pop_events()
+        if not data:
+            break
+    parser.close()
+    yield from parser.pop_events()
+
+
+def iter_json_bookmarks(fileobj, read_size=READ_SIZE):
+    """
+    流式解析 JSON 书签，产出书签事件
+
+    支持 Chrome 的 Bookmarks 文件（roots 下的 folder/url 节点，name、url 字段）
+    和 Firefox 的 JSON 备份（title、uri 字段，根容器带 root 字段）。
+    """
+    # 每层容器：{'key': 所在的键, 'fields': 标量字段, 'folder': 文件夹编号, 'root': 是否为根容器}，
+    # 数组的 fields 为 None
+    stack = []
+    folders = []
+    next_folder = 0
+    count = 0
+    key = None
+
+    for event, value in iter_json_events(fileobj, read_size):
+        parent = stack[-1] if stack else None
+        in_map = parent is not None and parent['fields'] is not None
+        if event == 'map_key':
+            key = value
+        elif event == 'start_map':
+            # 最外层对象和 Chrome roots 下的 bookmark_bar、other 等不对应标签
+            root = parent is None or (in_map and parent['key'] == 'roots')
+            stack.append({'key': key if in_map else None, 'fields': {}, 'folder': None, 'root': root})
+        elif event == 'start_array':
+            container = {'key': key if in_map else None, 'fields': None, 'folder': None}
+            if in_map and key == 'children':
+                parent['folder'] = container['folder'] = next_folder
+                next_folder += 1
+                yield 'folder_start', parent['folder'], folders[-1] if folders else None
+                folders.append(parent['folder'])
+            stack.append(container)
+        elif event == 'end_array':
+            if stack.pop()['folder'] is not None:
+                folders.pop()
+        elif event == 'end_map':
+            node = stack.pop()
+            fields = node['fields']
+            if node['folder'] is not None:
+                name = str(fields.get('name') or fields.get('title') or '').strip()
+                root = node['root'] or 'root' in fields
+                yield 'folder_end', node['folder'], None if root else (name or None)
+                continue
+            url = fields.get('url') or fields.get('uri')
+            if url:
+                count += 1
+                description = fields.get('description')
+                yield 'bookmark', folders[-1] if folders else None, count, {
+                    'url': str(url),
+                    'title': str(fields.get('name') or fields.get('title') or '').strip(),
+                    'description': str(description) if description else None,
+                    'icon': None,
+                }
+        elif in_map:
+            # 只记录对象自身的标量字段，数组中的标量忽略
+            parent['fields'][key] = value
+
+
+BOOKMARK_PARSERS = {
+    'html': iter_html_bookmarks,
+    'json': iter_json_bookmarks,
+}
+
+
+def import_bookmarks(fileobj, fmt, batch_size=1000):
+    """
+    从书签文件导入
+
+    文件可以随机读取时先完整解析一遍再导入：格式错误在写入任何数据之前发现（抛出 ValueError），
+    不会留下只导入了一部分、文件夹标签还没有建立的链接。
+
+    参数:
+        fileobj: 以二进制方式打开的文件对象
+        fmt: BOOKMARK_PARSERS 中的格式
+
+    返回:
+        BookmarkImportResult
+    """
+    parse = BOOKMARK_PARSERS[fmt]
+    if fileobj.seekable():
+        for _ in parse(fileobj):
+            pass
+        fileobj.seek(0)
+    return BookmarkImporter(batch_size=batch_size).run(parse(fileobj))
+
+
+@dataclass
+class BookmarkImportResult:
+    """
+    书签导入结果
+
+    existing 为地址（规范化后）已存在或在文件中重复的书签数，这些书签复用已有链接，只补充标签关联。
+    errors 中的每一项为 (书签序号, 错误信息)，出错的书签会被跳过，不影响其他书签的导入。
+    """
+    created: int = 0
+    existing: int = 0
+    tags_created: int = 0
+    errors: list = field(default_factory=list)
+
+
+@dataclass
+class _Folder:
+    parent: object
+    # 文件夹内（不含子文件夹）书签对应的链接ID
+    link_ids: list = field(default_factory=list)
+    # 子文件夹新建的、等待设置父级的标签ID
+    child_tag_ids: list = field(default_factory=list)
+
+
+class BookmarkImporter:
+    """
+    批量导入书签
+
+    书签按批次处理：每批只用一次 IN 查询按规范化地址的哈希去重（已存在的链接直接复用，不修改），
+    标题按 title 唯一约束批量查重后自动编号，在一个事务内通过 bulk_create 写入。
+    文件夹结束时按名称复用或新建标签（父级为上层文件夹对应的标签），
+    并把文件夹内的链接与标签的关联分块 bulk_create。bulk_create 和 update 不发送信号，
+    标签计数按每块关联和移动的子标签前后的状态增量更新，只涉及导入触及的标签及其上级标签。
+
+    参数:
+        batch_size: 每批处理的书签数
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+
+    def run(self, events):
+        """
+        导入书签
+
+        参数:
+            events: iter_html_bookmarks / iter_json_bookmarks 产出的事件序列
+
+        返回:
+            BookmarkImportResult
+        """
+        result = BookmarkImportResult()
+        self._folders = {}
+        # {url_hash: 链接ID}
+        self._seen = {}
+        self._changed_tags = set()
+        batch = []
+
+        try:
+            for event in events:
+                kind = event[0]
+                if kind == 'bookmark':
+                    batch.append(event[1:])
+                    if len(batch) >= self.batch_size:
+                        self._import_batch(batch, result)
+                        batch = []
+                elif kind == 'folder_start':
+                    self._folders[event[1]] = _Folder(parent=event[2])
+                elif kind == 'folder_end':
+                    # 文件夹内的书签全部写入后才能建立标签关联
+                    if batch:
+                        self._import_batch(batch, result)
+                        batch = []
+                    self._close_folder(event[1], event[2], result)
+            if batch:
+                self._import_batch(batch, result)
+        finally:
+            # 中途出错时已提交的批次保留（标签计数随各批次一起提交），变更记录和快照同样需要更新
+            changes.record(changes.TAG, self._changed_tags)
+            snapshot.catalog_changed()
+        result.errors.sort(key=lambda error: error[0])
+        return result
+
+    def _clean(self, item):
+        """校验单条书签，返回 (清洗后的数据, 错误信息)"""
+        url = item['url'].strip()
+        if not url:
+            return None, '链接地址不能为空'
+        if len(url) > URL_MAX_LENGTH:
+            return None, f'链接地址不能超过{URL_MAX_LENGTH}个字符'
+        try:
+            _validate_url(url)
+        except ValidationError:
+            return None, f'不支持的链接地址: {url[:100]}'
+        title = ' '.join(item['title'].split()) or url
+        return {
+            'url': url,
+            'url_hash': url_hash(url),
+            'title': title[:TITLE_MAX_LENGTH],
+            'description': item['description'],
+            'icon': item['icon'],
+        }, None
+
+    def _import_batch(self, batch, result):
+        rows = []
+        for folder, number, item in batch:
+            cleaned, error = self._clean(item)
+            if error:
+                result.errors.append((number, error))
+            else:
+                rows.append((folder, cleaned))
+        if not rows:
+            return
+
+        # 每批只按规范化地址的哈希查询一次已存在的链接，文件内重复的地址复用第一次写入的链接
+        hashes = {row['url_hash'] for _, row in rows if row['url_hash'] not in self._seen}
+        for value, link_ids in hash_holders(hashes).items():
+            self._seen[value] = min(link_ids)
+
+        new_links = {}
+        for folder, row in rows:
+            if row['url_hash'] in self._seen or row['url_hash'] in new_links:
+                result.existing += 1
+            else:
+                new_links[row['url_hash']] = Links(**row)
+        self._assign_titles(list(new_links.values()))
+
+        with transaction.atomic():
+            created = Links.objects.bulk_create(new_links.values(), batch_size=WRITE_BATCH_SIZE)
+            changes.record(changes.LINK, [link.id for link in created])
+        result.created += len(created)
+        self._seen.update((link.url_hash, link.id) for link in created)
+        for folder, row in rows:
+            if folder in self._folders:
+                self._folders[folder].link_ids.append(self._seen[row['url_hash']])
+
+    def _assign_titles(self, links):
+        """标题与已有链接或本批链接重复时追加编号，每轮只查询一次"""
+        titles = {id(link): link.title for link in links}
+        taken = set()
+        pending = links
+        for number in range(1, TITLE_SUFFIX_ATTEMPTS + 2):
+            if number > 1:
+                suffix = f' ({number})'
+                for link in pending:
+                    link.title = titles[id(link)][:TITLE_MAX_LENGTH - len(suffix)].rstrip() + suffix
+            lookup = [link.title for link in pending if link.title not in taken]
+            for chunk in iter_batches(lookup, LOOKUP_BATCH_SIZE):
+                taken.update(Links.objects.filter(title__in=chunk).values_list('title', flat=True))
+            conflicts = []
+            for link in pending:
+                if link.title in taken:
+                    conflicts.append(link)
+                else:
+                    taken.add(link.title)
+            if not conflicts:
+                return
+            pending = conflicts
+        # 多次编号仍然重复时追加链接地址的哈希
+        for link in pending:
+            digest = hashlib.blake2b(link.url.encode(), digest_size=4).hexdigest()
+            link.title = f'{titles[id(link)][:TITLE_MAX_LENGTH - 9].rstrip()} {digest}'
+
+    def _close_folder(self, folder_id, name, result):
+        folder = self._folders.pop(folder_id, None)
+        if folder is None:
+            return
+        if name is None:
+            # 没有对应标签的容器，子文件夹的标签保持在顶层
+            return
+
+        with transaction.atomic():
+            tag, created = self._get_or_create_tag(name[:TAG_NAME_MAX_LENGTH])
+            if created:
+                result.tags_created += 1
+                parent = self._folders.get(folder.parent)
+                if parent is not None:
+                    parent.child_tag_ids.append(tag.id)
+            if folder.child_tag_ids:
+                moved = list(
+                    Tags.objects.filter(pk__in=folder.child_tag_ids, parent__isnull=True).values_list('id', flat=True)
+                )
+                Tags.objects.filter(pk__in=moved).update(parent=tag.id)
+                self._changed_tags.update(folder.child_tag_ids)
+                self._count_moved_tags(moved, tag.id)
+
+            Through = Links.tags.through
+            for chunk in iter_batches(dict.fromkeys(folder.link_ids), WRITE_BATCH_SIZE):
+                before = tag_counts.load_link_tags(chunk)
+                Through.objects.bulk_create(
+                    [Through(links_id=link_id, tags_id=tag.id) for link_id in chunk],
+                    batch_size=WRITE_BATCH_SIZE,
+                    ignore_conflicts=True,
+                )
+                # 已有的关联被忽略，写入后每个链接的标签就是原来的标签加上当前标签
+                tag_counts.apply_changes(before, {link_id: tags | {tag.id} for link_id, tags in before.items()})
+                changes.record(changes.LINK, chunk)
+        self._changed_tags.add(tag.id)
+
+    def _count_moved_tags(self, tag_ids, parent_id):
+        """子文件夹的标签从顶层移到 parent_id 下之后，按移动前后的层级更新受影响链接的标签计数"""
+        subtree = set()
+        for tag_id in tag_ids:
+            subtree |= tag_counts.load_descendants(tag_id)
+        link_tags = tag_counts.load_link_tags(tag_counts.tagged_link_ids(subtree))
+        parents = tag_counts.load_parents([parent_id, *tag_ids, *chain.from_iterable(link_tags.values())])
+        parents_before = {**parents, **dict.fromkeys(tag_ids)}
+        tag_counts.apply_changes(link_tags, link_tags, parents_before, parents)
+
+    def _get_or_create_tag(self, name):
+        """按名称复用已有标签（标签名称全局唯一），不存在时新建并生成不重复的 slug"""
+        tag = Tags.objects.filter(name=name).first()
+        if tag is not None:
+            return tag, False
+        base = slugify(name, allow_unicode=True)[:40] or 'tag'
+        slug = base
+        existing = set(Tags.objects.filter(slug__startswith=base).values_list('slug', flat=True))
+        number = 1
+        while slug in existing:
+            number += 1
+            slug = f'{base}-{number}'
+        return Tags.objects.create(name=name, slug=slug), True
+
+
+# 导出
+
+def _links_by_tag(tag_id):
+    queryset = Links.objects.order_by('sort_order', 'id')
+    queryset = queryset.filter(tags=tag_id) if tag_id is not None else queryset.filter(tags__isnull=True)
+    return queryset.values('title', 'url', 'description', 'icon', 'created_at').iterator(chunk_size=WRITE_BATCH_SIZE)
+
+
+def _tag_tree():
+    """返回 {父级标签ID: [标签, ...]}，按排序值排列"""
+    children = {}
+    for tag in Tags.objects.order_by('sort_order', 'id').values('id', 'name', 'parent_id', 'created_at'):
+        children.setdefault(tag['parent_id'], []).append(tag)
+    return children
+
+
+def render_html_bookmarks():
+    """
+    流式导出 Netscape 书签 HTML
+
+    标签树对应文件夹，链接出现在其每个标签对应的文件夹中，没有标签的链接在最外层。
+    每个标签的链接单独查询并分块读取。
+    """
+    children = _tag_tree()
+    yield (
+        '<!DOCTYPE NETSCAPE-Bookmark-file-1>\n'
+        '<!-- This is an automatically generated file.\n'
+        '     It will be read and overwritten.\n'
+        '     DO NOT EDIT! -->\n'
+        '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">\n'
+        '<TITLE>Bookmarks</TITLE>\n'
+        '<H1>Bookmarks</H1>\n'
+        '<DL><p>\n'
+    )
+
+    def links(tag_id, indent):
+        lines = []
+        for link in _links_by_tag(tag_id):
+            add_date = int(link['created_at'].timestamp())
+            lines.append(
+                f'{indent}<DT><A HREF="{html.escape(link["url"])}" ADD_DATE="{add_date}">'
+                f'{html.escape(link["title"])}</A>\n'
+            )
+            if link['description']:
+                lines.append(f'{indent}<DD>{html.escape(" ".join(link["description"].split()))}\n')
+            if len(lines) >= WRITE_BATCH_SIZE:
+                yield ''.join(lines)
+                lines = []
+        if lines:
+            yield ''.join(lines)
+
+    def folder(tag, depth):
+        indent = '    ' * depth
+        add_date = int(tag['created_at'].timestamp())
+        yield f'{indent}<DT><H3 ADD_DATE="{add_date}">{html.escape(tag["name"])}</H3>\n{indent}<DL><p>\n'
+        for child in children.get(tag['id'], ()):
+            yield from folder(child, depth + 1)
+        yield from links(tag['id'], '    ' * (depth + 1))
+        yield f'{indent}</DL><p>\n'
+
+    for tag in children.get(None, ()):
+        yield from folder(tag, 1)
+    yield from links(None, '    ')
+    yield '</DL><p>\n'
+
+
+def _chrome_time(value):
+    delta = value - datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+    return str((int(delta.total_seconds()) + CHROME_EPOCH_OFFSET) * 1000000 + delta.microseconds)
+
+
+def render_json_bookmarks():
+    """
+    流式导出 Chrome Bookmarks 格式的 JSON
+
+    标签树放在 roots.bookmark_bar 下，结构与 render_html_bookmarks 相同；
+    url 节点额外带 description 字段。
+    """
+    children = _tag_tree()
+    dumps = json.dumps
+
+    def items(tag_id):
+        # 子文件夹在前，链接在后，与 HTML 导出的顺序一致
+        separator = ''
+        for child in children.get(tag_id, ()):
+            yield separator
+            separator = ','
+            yield from folder(child)
+        nodes = []
+        for link in _links_by_tag(tag_id):
+            node = {
+                'date_added': _chrome_time(link['created_at']),
+                'name': link['title'],
+                'type': 'url',
+                'url': link['url'],
+            }
+            if link['description']:
+                node['description'] = link['description']
+            nodes.append(dumps(node, ensure_ascii=False))
+            if len(nodes) >= WRITE_BATCH_SIZE:
+                yield separator + ','.join(nodes)
+                separator = ','
+                nodes = []
+        if nodes:
+            yield separator + ','.join(nodes)
+
+    def folder(tag):
+        yield '{"children":['
+        yield from items(tag['id'])
+        yield (f'],"date_added":{dumps(_chrome_time(tag["created_at"]))},'
+               f'"name":{dumps(tag["name"], ensure_ascii=False)},"type":"folder"}}')
+
+    yield '{"roots":{"bookmark_bar":{"children":['
+    yield from items(None)
+    yield '],"name":"书签栏","type":"folder"}},"version":1}\n'
+
+
+BOOKMARK_RENDERERS = {
+    'html': render_html_bookmarks,
+    'json': render_json_bookmarks,
+}
@@ -0,0 +1,182 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Exists, Max, OuterRef
+from django.utils import timezone
+
+from navigation.models import Links, NavigationChange, NavigationChangeHorizon, Tags
+
+LINK = NavigationChange.KIND_LINK
+TAG = NavigationChange.KIND_TAG
+UPSERT = NavigationChange.ACTION_UPSERT
+DELETE = NavigationChange.ACTION_DELETE
+
+# bulk_create 变更记录时每条语句写入的行数
+RECORD_BATCH_SIZE = 500
+# 串行追加变更日志的 PostgreSQL 咨询锁编号
+APPEND_LOCK_ID = 0x6E617663
+
+
+def _lock_for_append(using):
+    """
+    获取追加变更日志的事务级锁，直到事务结束才释放
+
+    PostgreSQL 的自增主键在插入时分配、在提交时才可见：持有较小ID的事务可能晚于较大ID的事务提交，
+    读取方越过较大的ID后会永久漏掉较小的ID。追加前获取同一把锁，写入变更日志的事务按ID顺序提交，
+    游标才是单调的。SQLite 的写事务本身是串行的，不需要加锁。
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [APPEND_LOCK_ID])
+
+
+def record(kind, object_ids, action=UPSERT):
+    """为一组对象追加变更记录，在调用方的事务内写入"""
+    object_ids = sorted(set(object_ids))
+    if object_ids:
+        using = router.db_for_write(NavigationChange)
+        with transaction.atomic(using=using):
+            _lock_for_append(using)
+            NavigationChange.objects.using(using).bulk_create(
+                [NavigationChange(kind=kind, object_id=object_id, action=action) for object_id in object_ids],
+                batch_size=RECORD_BATCH_SIZE,
+            )
+
+
+def latest_cursor():
+    return NavigationChange.objects.aggregate(cursor=Max('id'))['cursor'] or 0
+
+
+def pruned_through():
+    return NavigationChangeHorizon.objects.values_list('pruned_through', flat=True).first() or 0
+
+
+def changes_since(since, limit):
+    """
+    读取游标之后的一页变更
+
+    同一对象在一页中的多条记录合并为一条：对象仍存在时返回当前数据，否则返回删除标记，
+    因此客户端只需按结果覆盖或删除本地数据。游标为空或早于已清理的位置时返回 reset，
+    客户端应重新全量获取，再从返回的游标开始增量同步。
+
+    返回:
+        {'cursor', 'has_more', 'reset', 'links': [链接对象], 'tags': [标签对象],
+         'deleted': {'links': [ID], 'tags': [ID]}}
+    """
+    result = {
+        'cursor': since or 0,
+        'has_more': False,
+        'reset': False,
+        'links': [],
+        'tags': [],
+        'deleted': {'links': [], 'tags': []},
+    }
+    horizon = pruned_through()
+    if since is None or since < horizon:
+        # 过期记录全部清理后日志为空，latest_cursor() 为 0：返回清理位置，否则客户端会反复收到 reset
+        result.update(cursor=max(latest_cursor(), horizon), reset=True)
+        return result
+
+    rows = list(
+        NavigationChange.objects.filter(id__gt=since).order_by('id').values_list('id', 'kind', 'object_id')[:limit + 1]
+    )
+    result['has_more'] = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return result
+    result['cursor'] = rows[-1][0]
+
+    changed = {LINK: set(), TAG: set()}
+    for _, kind, object_id in rows:
+        changed[kind].add(object_id)
+    querysets = ((LINK, Links.objects.prefetch_related('tags'), 'links'), (TAG, Tags.objects.all(), 'tags'))
+    for kind, queryset, key in querysets:
+        if not changed[kind]:
+            continue
+        result[key] = list(queryset.filter(pk__in=changed[kind]).order_by('pk'))
+        result['deleted'][key] = sorted(changed[kind] - {obj.pk for obj in result[key]})
+    return result
+
+
+def compact(retention_days=None, batch_size=1000):
+    """
+    压缩变更日志
+
+    先删除同一对象已有更新记录的旧记录（增量同步按对象的当前状态返回，旧记录不影响结果），
+    再删除超过保留天数的记录并推进清理位置。
+
+    返回:
+        (合并删除的行数, 过期删除的行数)
+    """
+    retention_days = retention_days or getattr(settings, 'CHANGE_LOG_RETENTION_DAYS', 30)
+    newer = NavigationChange.objects.filter(
+        kind=OuterRef('kind'), object_id=OuterRef('object_id'), id__gt=OuterRef('id')
+    )
+    superseded = NavigationChange.objects.filter(Exists(newer))
+    merged = _delete_in_batches(superseded, batch_size)
+
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    expired = NavigationChange.objects.filter(changed_at__lt=cutoff)
+    last_expired = expired.aggregate(cursor=Max('id'))['cursor']
+    if last_expired is None:
+        return merged, 0
+    horizon, _ = NavigationChangeHorizon.objects.get_or_create(pk=1)
+    if last_expired > horizon.pruned_through:
+        # 先推进清理位置再删除，删除中途失败时客户端只会多做一次全量同步
+        NavigationChangeHorizon.objects.filter(pk=1).update(pruned_through=last_expired)
+    pruned = _delete_in_batches(NavigationChange.objects.filter(id__lte=last_expired), batch_size)
+    return merged, pruned
+
+
+def _delete_in_batches(queryset, batch_size):
+    deleted = 0
+    while True:
+        # 每批单独删除，避免长时间持有写锁阻塞写入
+        ids = list(queryset.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        count, _ = NavigationChange.objects.filter(id__in=ids).delete()
+        deleted += count
+
+
+# 信号处理
+
+def link_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record(LINK, [instance.pk])
+
+
+def link_deleted(sender, instance, **kwargs):
+    record(LINK, [instance.pk], DELETE)
+
+
+def tag_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record(TAG, [instance.pk])
+
+
+def tag_pre_delete(sender, instance, **kwargs):
+    # 级联删除关联、子标签的 parent 置空都不发送信号，受影响的链接和子标签在删除前记录
+    record(LINK, Links.tags.through.objects.filter(tags_id=instance.pk).values_list('links_id', flat=True))
+    record(TAG, Tags.objects.filter(parent_id=instance.pk).values_list('id', flat=True))
+
+
+def tag_deleted(sender, instance, **kwargs):
+    record(TAG, [instance.pk], DELETE)
+
+
+def link_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # 从标签一侧清空时，post_clear 不再能查到原来的链接
+        instance._changes_cleared_links = list(
+            Links.tags.through.objects.filter(tags_id=instance.pk).values_list('links_id', flat=True)
+        )
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            record(LINK, [instance.pk])
+        elif action == 'post_clear':
+            record(LINK, instance.__dict__.pop('_changes_cleared_links', ()))
+        else:
+            record(LINK, pk_set)
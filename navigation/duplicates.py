@@ -0,0 +1,75 @@
+from django.db.models import Count
+
+from navigation.models import Links
+from utils.streaming import iter_batches
+from utils.urlnorm import normalize_url, url_hash
+
+# IN 查询每次携带的参数个数，与 serializers.LOOKUP_BATCH_SIZE 相同（serializers 依赖本模块）
+LOOKUP_BATCH_SIZE = 900
+
+
+def find_by_url(url):
+    """规范化后与 url 相同的链接，按 url_hash 索引等值查询"""
+    return Links.objects.filter(url_hash=url_hash(url))
+
+
+def hash_holders(hashes):
+    """返回 {url_hash: {链接ID, ...}}，按 LOOKUP_BATCH_SIZE 分块查询"""
+    holders = {}
+    for chunk in iter_batches(list(hashes), LOOKUP_BATCH_SIZE):
+        for value, link_id in Links.objects.filter(url_hash__in=chunk).values_list('url_hash', 'id'):
+            holders.setdefault(value, set()).add(link_id)
+    return holders
+
+
+def find_duplicates(limit=None):
+    """
+    查找规范化地址相同的链接
+
+    按 url_hash 分组计数只扫描 links_url_hash_idx 索引，再按哈希取出各组的链接。
+
+    返回:
+        [{'url_hash', 'normalized_url', 'count', 'links': [{'id', 'title', 'url', 'created_at'}]}]，
+        按重复数从多到少排列
+    """
+    groups = (
+        Links.objects.values('url_hash')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .order_by('-count', 'url_hash')
+    )
+    if limit is not None:
+        groups = groups[:limit]
+    groups = {row['url_hash']: {**row, 'links': []} for row in groups}
+
+    for chunk in iter_batches(list(groups), LOOKUP_BATCH_SIZE):
+        rows = Links.objects.filter(url_hash__in=chunk).order_by('url_hash', 'id')
+        for row in rows.values('id', 'title', 'url', 'created_at', 'url_hash'):
+            groups[row.pop('url_hash')]['links'].append(row)
+    for group in groups.values():
+        group['normalized_url'] = normalize_url(group['links'][0]['url'])
+    return list(groups.values())
+
+
+def rehash(batch_size=500):
+    """
+    重新计算所有链接的 url_hash
+
+    规范化规则（utils.urlnorm）调整后执行，只写入变化的行。
+
+    返回:
+        更新的链接数
+    """
+    changed = []
+    updated = 0
+    for link in Links.objects.only('id', 'url', 'url_hash').order_by('id').iterator(chunk_size=batch_size):
+        value = url_hash(link.url)
+        if value != link.url_hash:
+            link.url_hash = value
+            changed.append(link)
+        if len(changed) >= batch_size:
+            Links.objects.bulk_update(changed, ['url_hash'])
+            updated += len(changed)
+            changed = []
+    Links.objects.bulk_update(changed, ['url_hash'])
+    return updated + len(changed)
@@ -0,0 +1,84 @@
+from datetime import timedelta
+from itertools import product
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+from django.http import QueryDict
+from django.utils import timezone
+
+from utils.filters import IndexedFilterBackend, index_combinations
+from utils.query_plans import hot_query
+
+from .linkcheck import links_due
+from .models import LinkClickRollup, Links, Tags
+from .views import LinksView, TagsView
+
+
+@hot_query('navigation.visible_links', '按排序获取显示的链接')
+def visible_links():
+    return Links.objects.filter(is_show__in=[True]).order_by('sort_order', 'id')
+
+
+@hot_query('navigation.recommended_links', '按排序获取显示的推荐链接')
+def recommended_links():
+    return Links.objects.filter(is_show__in=[True], is_recommend__in=[True]).order_by('sort_order', 'id')
+
+
+@hot_query('navigation.visible_tags', '按排序获取显示的标签')
+def visible_tags():
+    return Tags.objects.filter(is_show__in=[True]).order_by('sort_order', 'id')
+
+
+@hot_query('navigation.child_tags', '按排序获取某个标签的子标签')
+def child_tags():
+    return Tags.objects.filter(parent_id=1).order_by('sort_order')
+
+
+@hot_query('navigation.tag_links', '获取某个标签下的链接')
+def tag_links():
+    return Links.objects.filter(tags=1)
+
+
+@hot_query('navigation.popular_links', '按热度获取显示的链接（热度榜单刷新）')
+def popular_links():
+    return Links.objects.filter(is_show=True, popularity__gt=0).order_by('-popularity')
+
+
+@hot_query('navigation.link_click_series', '获取某个链接最近的小时点击汇总')
+def link_click_series():
+    return LinkClickRollup.objects.filter(
+        granularity='hour', link_id=1, bucket__gte=timezone.now() - timedelta(days=1)
+    ).order_by('bucket')
+
+
+@hot_query('navigation.links_by_url_hash', '按规范化地址的哈希查找链接（查重、导入去重）')
+def links_by_url_hash():
+    return Links.objects.filter(url_hash='0' * 16)
+
+
+@hot_query('navigation.links_due_for_check', '按检查时间选取待检查的链接（check_links）')
+def links_due_for_check():
+    return links_due().values_list('id', 'url')
+
+
+def _register_list_orderings(name, view):
+    """
+    登记列表接口支持的每个过滤和排序组合，生成的 SQL 与 IndexedFilterBackend 相同
+
+    每个组合按正序和倒序、再分别加上 related_filter_fields 中的每个多对多过滤登记一次。
+    """
+    model = view.queryset.model
+    combinations = index_combinations(model, view.index_filter_fields, view.ordering_fields)
+    related = [{}] + [{field: 1} for field in getattr(view, 'related_filter_fields', ())]
+    for (filters, field), direction, extra in product(combinations, ('', '-'), related):
+        params = urlencode({**dict.fromkeys(sorted(filters), 'true'), **extra, 'ordering': direction + field})
+
+        def query(params=params):
+            request = SimpleNamespace(GET=QueryDict(params))
+            return IndexedFilterBackend().filter_queryset(request, view.queryset.all(), view)
+
+        hot_query(f'navigation.{name}_list?{params}', f'{model._meta.verbose_name}列表的过滤和排序')(query)
+
+
+_register_list_orderings('links', LinksView)
+_register_list_orderings('tags', TagsView)
@@ -0,0 +1,290 @@
+import asyncio
+import ssl
+from collections import deque
+from datetime import timedelta
+from urllib.parse import urljoin, urlsplit
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from navigation.models import Links
+
+# 无法连接、超时或响应无法解析时记录的状态码
+STATUS_UNREACHABLE = 0
+# HEAD 返回这些状态码时改用 GET 重试：部分服务器不支持 HEAD 或对 HEAD 返回错误
+HEAD_FALLBACK_STATUSES = frozenset({400, 403, 404, 405, 406, 429, 500, 501, 502, 503})
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# 响应头的最大字节数
+MAX_HEADER_BYTES = 64 * 1024
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def is_alive(status):
+    return status is not None and 200 <= status < 400
+
+
+class _Response:
+    def __init__(self, status, headers, reusable):
+        self.status = status
+        self.headers = headers
+        self.reusable = reusable
+
+
+class _Budget:
+    """单个链接剩余的超时时间，只在网络读写期间消耗"""
+
+    def __init__(self, seconds):
+        self.remaining = seconds
+
+    async def run(self, awaitable):
+        if self.remaining <= 0:
+            awaitable.close()
+            raise asyncio.TimeoutError
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            return await asyncio.wait_for(awaitable, self.remaining)
+        finally:
+            self.remaining -= loop.time() - started
+
+
+class LinkChecker:
+    """
+    基于 asyncio 的链接检查客户端
+
+    同时检查的链接数由工作协程数量限制，每个主机另有连接数上限；每个链接先发送 HEAD，
+    失败或返回错误时改用 GET（只读取响应头），并跟随重定向。HEAD 响应没有响应体，
+    连接在同一主机的后续请求中复用；GET 读取响应头后即关闭连接，不下载页面内容。
+
+    参数:
+        concurrency: 同时检查的链接数
+        per_host: 每个主机（协议、主机名、端口）同时使用的连接数
+        timeout: 单个链接（包括重定向和 GET 重试）连接、发送和读取响应的累计超时秒数，
+            不包括等待同一主机空闲连接数的时间
+        max_redirects: 最多跟随的重定向次数
+        verify_ssl: 是否校验 HTTPS 证书
+    """
+
+    user_agent = 'Mozilla/5.0 (compatible; navigation-link-checker/1.0)'
+
+    def __init__(self, concurrency=50, per_host=4, timeout=10, max_redirects=5, verify_ssl=True):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.ssl_context = ssl.create_default_context()
+        if not verify_ssl:
+            self.ssl_context.check_hostname = False
+            self.ssl_context.verify_mode = ssl.CERT_NONE
+        self._host_slots = {}
+        self._idle = {}
+
+    async def run(self, items, on_batch, batch_size=200):
+        """
+        检查一组链接，结果按批次交给 on_batch
+
+        参数:
+            items: [(链接ID, 地址)]，会按主机交错排列，避免同一主机的链接占满所有工作协程
+            on_batch: 协程函数，接收 [(链接ID, 状态码, 检查时间)]；写入期间检查继续进行
+            batch_size: 每批结果的条数
+        """
+        pending = iter(interleave_by_host(items))
+        results = asyncio.Queue()
+
+        async def worker():
+            # 所有工作协程共用一个迭代器，next() 不会被打断
+            for link_id, url in pending:
+                status = await self.check(url)
+                await results.put((link_id, status, timezone.now()))
+
+        async def finish(workers):
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                await results.put(None)
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, self.concurrency))]
+        finisher = asyncio.create_task(finish(workers))
+        try:
+            batch = []
+            while (result := await results.get()) is not None:
+                batch.append(result)
+                if len(batch) >= batch_size:
+                    await on_batch(batch)
+                    batch = []
+            if batch:
+                await on_batch(batch)
+            await finisher
+        finally:
+            for task in workers:
+                task.cancel()
+            self.close()
+
+    async def check(self, url):
+        """检查单个链接，返回最终的 HTTP 状态码，无法连接或超时返回 STATUS_UNREACHABLE"""
+        try:
+            return await self._check(url, _Budget(self.timeout))
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            return STATUS_UNREACHABLE
+
+    async def _check(self, url, budget):
+        for _ in range(self.max_redirects + 1):
+            try:
+                response = await self._request('HEAD', url, budget)
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                response = None
+            if response is None or response.status in HEAD_FALLBACK_STATUSES:
+                response = await self._request('GET', url, budget)
+            location = response.headers.get('location')
+            if 300 <= response.status < 400 and location:
+                url = urljoin(url, location)
+                continue
+            return response.status
+        # 重定向次数过多时记录最后一次的状态码
+        return response.status
+
+    async def _request(self, method, url, budget):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in DEFAULT_PORTS or not parts.hostname:
+            raise ValueError(f'不支持的链接地址: {url}')
+        host = parts.hostname.encode('idna').decode('ascii')
+        port = parts.port or DEFAULT_PORTS[scheme]
+        key = (scheme, host, port)
+        host_header = host if port == DEFAULT_PORTS[scheme] else f'{host}:{port}'
+        target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+
+        slot = self._host_slots.get(key)
+        if slot is None:
+            slot = self._host_slots[key] = asyncio.Semaphore(self.per_host)
+        request = (
+            f'{method} {target} HTTP/1.1\r\n'
+            f'Host: {host_header}\r\n'
+            f'User-Agent: {self.user_agent}\r\n'
+            'Accept: */*\r\n'
+            'Connection: keep-alive\r\n'
+            '\r\n'
+        ).encode('latin-1')
+        # 等待主机连接数的时间不计入超时，否则排在同一主机后面的正常链接会被记为超时
+        async with slot:
+            return await budget.run(self._exchange(key, method, request))
+
+    async def _exchange(self, key, method, request):
+        while True:
+            reader, writer, reused = await self._connect(key)
+            try:
+                writer.write(request)
+                await writer.drain()
+                response = await self._read_response(reader, method)
+            except (OSError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+                # 复用的连接可能已被服务器关闭，丢弃空闲连接后新建连接重试
+                self._discard_idle(key)
+                continue
+            except BaseException:
+                writer.close()
+                raise
+            self._release(key, reader, writer, response.reusable)
+            return response
+
+    async def _connect(self, key):
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer, True
+            writer.close()
+        scheme, host, port = key
+        reader, writer = await asyncio.open_connection(
+            host, port,
+            ssl=self.ssl_context if scheme == 'https' else None,
+            server_hostname=host if scheme == 'https' else None,
+            limit=MAX_HEADER_BYTES,
+        )
+        return reader, writer, False
+
+    def _release(self, key, reader, writer, reusable):
+        if reusable:
+            self._idle.setdefault(key, deque()).append((reader, writer))
+        else:
+            writer.close()
+
+    def _discard_idle(self, key):
+        for _, writer in self._idle.pop(key, ()):
+            writer.close()
+
+    async def _read_response(self, reader, method):
+        while True:
+            status_line = (await reader.readuntil(b'\r\n')).decode('latin-1')
+            version, status, *_ = status_line.split(' ', 2)
+            if not version.startswith('HTTP/'):
+                raise ValueError(f'无法解析的响应: {status_line[:100]!r}')
+            status = int(status)
+            if not 100 <= status <= 999:
+                raise ValueError(f'无效的状态码: {status}')
+            headers = {}
+            size = 0
+            while True:
+                line = await reader.readuntil(b'\r\n')
+                size += len(line)
+                if size > MAX_HEADER_BYTES:
+                    raise ValueError('响应头过大')
+                if line == b'\r\n':
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            # 跳过 100 Continue 等临时响应
+            if not 100 <= status < 200:
+                break
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = 'close' not in connection and (version != 'HTTP/1.0' or 'keep-alive' in connection)
+        # HEAD 和 204/304 没有响应体，读完响应头即可复用连接
+        reusable = keep_alive and (method == 'HEAD' or status in (204, 304))
+        return _Response(status, headers, reusable)
+
+    def close(self):
+        for key in list(self._idle):
+            self._discard_idle(key)
+
+
+def interleave_by_host(items):
+    """按主机轮流排列链接，同一主机的链接尽量分散"""
+    queues = {}
+    for link_id, url in items:
+        try:
+            host = urlsplit(url).hostname or ''
+        except ValueError:
+            host = ''
+        queues.setdefault(host, deque()).append((link_id, url))
+    queues = deque(queues.values())
+    while queues:
+        queue = queues.popleft()
+        yield queue.popleft()
+        if queue:
+            queues.append(queue)
+
+
+def links_due(interval_hours=None, now=None):
+    """
+    需要检查的链接：从未检查过的，以及距上次检查超过 interval_hours 小时的
+
+    按检查时间从旧到新（未检查的在前）排列，中断后重新执行会从未写入结果的链接继续。
+    """
+    interval_hours = _setting('LINK_CHECK_INTERVAL_HOURS', 24) if interval_hours is None else interval_hours
+    cutoff = (now or timezone.now()) - timedelta(hours=interval_hours)
+    return Links.objects.filter(Q(last_checked__isnull=True) | Q(last_checked__lt=cutoff)).order_by(
+        'last_checked', 'id'
+    )
+
+
+def save_results(results):
+    """批量写入检查结果，不修改 updated_at，也不记录导航变更"""
+    links = [Links(id=link_id, status=status, last_checked=checked_at) for link_id, status, checked_at in results]
+    Links.objects.bulk_update(links, ['status', 'last_checked'])
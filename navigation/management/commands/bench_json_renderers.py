@@ -0,0 +1,133 @@
+import datetime
+import decimal
+import io
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from navigation.models import Links
+from navigation.serializers import LinksSerializer
+from utils.fastjson import FastJSONParser, FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = '比较 DRF 默认 JSONRenderer/JSONParser 与 FastJSONRenderer/FastJSONParser 的编码和解析耗时（只读，不修改数据）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='导出负载的行数')
+        parser.add_argument('--page-size', type=int, default=100, help='链接列表负载的条数')
+        parser.add_argument('--number', type=int, default=50, help='每项测试的重复次数')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('⚠️ 未安装 orjson，FastJSONRenderer 会回退到标准库 json'))
+
+        payloads = {
+            '链接列表': self._links_page(options['page_size']),
+            '导出数据': self._export_rows(options['rows']),
+            '边界数值': self._edge_numbers(options['rows']),
+        }
+        number = options['number']
+        mismatched = 0
+
+        # NaN、Infinity 在严格模式下两者都应拒绝编码
+        for value in (float('nan'), float('inf'), decimal.Decimal('NaN')):
+            if not self._rejects(FastJSONRenderer(), value):
+                mismatched += 1
+                self.stdout.write(self.style.ERROR(f'❌ {value}: FastJSONRenderer 没有像 JSONRenderer 一样拒绝编码'))
+
+        for label, data in payloads.items():
+            baseline = JSONRenderer().render(data)
+            fast = FastJSONRenderer().render(data)
+            if baseline != fast:
+                mismatched += 1
+                self.stdout.write(self.style.ERROR(f'❌ {label}: 输出与 JSONRenderer 不一致'))
+
+            self._compare(
+                f'{label} 渲染 ({len(baseline)} 字节)',
+                lambda: JSONRenderer().render(data),
+                lambda: FastJSONRenderer().render(data),
+                number,
+            )
+            self._compare(
+                f'{label} 解析',
+                lambda: JSONParser().parse(io.BytesIO(baseline)),
+                lambda: FastJSONParser().parse(io.BytesIO(baseline)),
+                number,
+            )
+
+        if mismatched:
+            self.stdout.write(self.style.ERROR(f'❌ {mismatched} 个负载的输出不一致'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✨ 所有负载的输出与 JSONRenderer 逐字节一致'))
+
+    def _rejects(self, renderer, value):
+        try:
+            renderer.render({'value': value})
+        except ValueError:
+            return True
+        return False
+
+    def _compare(self, label, baseline, fast, number):
+        baseline_time = min(timeit.repeat(baseline, number=number, repeat=3)) / number
+        fast_time = min(timeit.repeat(fast, number=number, repeat=3)) / number
+        self.stdout.write(
+            f'{label}: JSON {baseline_time * 1000:.3f}ms, Fast {fast_time * 1000:.3f}ms, '
+            f'加速 {baseline_time / fast_time:.1f}x'
+        )
+
+    def _links_page(self, page_size):
+        links = list(Links.objects.prefetch_related('tags').order_by('id')[:page_size])
+        if links:
+            return {'count': len(links), 'next': None, 'previous': None,
+                    'results': LinksSerializer(links, many=True).data}
+
+        # 没有数据时按 LinksSerializer 的输出结构构造
+        now = timezone.now().isoformat().replace('+00:00', 'Z')
+        return {
+            'count': page_size,
+            'next': None,
+            'previous': None,
+            'results': [
+                {
+                    'id': i,
+                    'tags': [{'id': j, 'name': f'标签{j}'} for j in range(3)],
+                    'title': f'链接{i}',
+                    'url': f'https://example.com/{i}',
+                    'description': '示例链接描述\u2028第二行',
+                    'icon': None,
+                    'click_count': i * 7,
+                    'is_recommend': i % 2 == 0,
+                    'is_show': True,
+                    'sort_order': i,
+                    'created_at': now,
+                    'updated_at': now,
+                }
+                for i in range(page_size)
+            ],
+        }
+
+    def _export_rows(self, rows):
+        # 未经序列化器转换的值：datetime、Decimal 和模型 verbose_name 中的惰性翻译字符串
+        now = timezone.now()
+        verbose_name = gettext_lazy(Links._meta.get_field('title').verbose_name)
+        return [
+            {
+                'id': i,
+                'title': f'链接{i}',
+                'label': verbose_name,
+                'created_at': now - datetime.timedelta(minutes=i),
+                'day': now.date(),
+                'score': decimal.Decimal(i) / 8,
+            }
+            for i in range(rows)
+        ]
+
+    def _edge_numbers(self, rows):
+        # repr 使用指数形式的浮点数和大 Decimal：orjson 的写法不同，FastJSONRenderer 会回退到 JSONRenderer
+        values = [1e16, 1.2345678901234568e17, 1e-5, 1e-7, 5e-324, decimal.Decimal('1E+20'), decimal.Decimal('-1E-7')]
+        return [{'id': i, 'value': values[i % len(values)], 'ratio': i / 7} for i in range(rows)]
@@ -0,0 +1,62 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+
+
+class Command(BaseCommand):
+    help = '比较同步WSGI与异步ASGI处理导航数据读取请求的吞吐量（只读，不修改数据）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='每种模式的请求总数')
+        parser.add_argument('--concurrency', type=int, default=50, help='并发请求数')
+        parser.add_argument('--path', action='append', dest='paths', help='请求路径，可重复指定')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/api/v1/links', '/api/v1/tags']
+        total = options['requests']
+        concurrency = options['concurrency']
+        urls = [paths[i % len(paths)] for i in range(total)]
+
+        mode = '异步视图' if settings.ASYNC_NAVIGATION_READS else 'DRF同步视图'
+        self.stdout.write(f'ASGI 模式下使用{mode}（由 ASYNC_NAVIGATION_READS 控制）')
+
+        elapsed, errors = self._run_wsgi(urls, concurrency)
+        self._report('WSGI (线程池)', total, elapsed, errors)
+
+        elapsed, errors = asyncio.run(self._run_asgi(urls, concurrency))
+        self._report('ASGI (事件循环)', total, elapsed, errors)
+
+    def _run_wsgi(self, urls, concurrency):
+        def fetch(url):
+            try:
+                return Client().get(url).status_code
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            statuses = list(executor.map(fetch, urls))
+        return time.perf_counter() - started, sum(status != 200 for status in statuses)
+
+    async def _run_asgi(self, urls, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(url):
+            async with semaphore:
+                response = await client.get(url)
+                return response.status_code
+
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(fetch(url) for url in urls))
+        return time.perf_counter() - started, sum(status != 200 for status in statuses)
+
+    def _report(self, label, total, elapsed, errors):
+        self.stdout.write(
+            f'{label}: {total} 个请求, 耗时 {elapsed:.2f}s, 吞吐量 {total / elapsed:.0f} req/s, 非200响应 {errors} 个'
+        )
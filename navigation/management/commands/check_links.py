@@ -0,0 +1,60 @@
+import asyncio
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from navigation.linkcheck import STATUS_UNREACHABLE, LinkChecker, is_alive, links_due, save_results
+
+
+class Command(BaseCommand):
+    help = '并发检查链接是否可以访问，结果分批写入链接的 status 和 last_checked；中断后重新执行会从未检查的链接继续'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.LINK_CHECK_CONCURRENCY,
+                            help='同时检查的链接数')
+        parser.add_argument('--per-host', type=int, default=settings.LINK_CHECK_PER_HOST,
+                            help='每个主机同时使用的连接数')
+        parser.add_argument('--timeout', type=float, default=settings.LINK_CHECK_TIMEOUT,
+                            help='单个链接的超时秒数')
+        parser.add_argument('--interval-hours', type=int, default=settings.LINK_CHECK_INTERVAL_HOURS,
+                            help='只检查从未检查过或距上次检查超过该小时数的链接，0 表示检查全部')
+        parser.add_argument('--limit', type=int, default=None, help='本次最多检查的链接数')
+        parser.add_argument('--batch-size', type=int, default=200, help='每批写入的检查结果数')
+        parser.add_argument('--insecure', action='store_true', help='不校验 HTTPS 证书')
+
+    def handle(self, *args, **options):
+        queryset = links_due(options['interval_hours']).values_list('id', 'url')
+        if options['limit'] is not None:
+            queryset = queryset[:options['limit']]
+        items = list(queryset)
+        urls = dict(items)
+        self.stdout.write(f'✅ 待检查链接: {len(items)} 个')
+        if not items:
+            return
+
+        checker = LinkChecker(
+            concurrency=options['concurrency'],
+            per_host=options['per_host'],
+            timeout=options['timeout'],
+            verify_ssl=not options['insecure'],
+        )
+        summary = Counter()
+        write = sync_to_async(save_results)
+
+        async def on_batch(batch):
+            await write(batch)
+            for link_id, status, _ in batch:
+                if is_alive(status):
+                    summary['alive'] += 1
+                    continue
+                summary['dead'] += 1
+                reason = '无法连接或超时' if status == STATUS_UNREACHABLE else f'HTTP {status}'
+                self.stdout.write(self.style.WARNING(f'⚠️ #{link_id} {urls[link_id]}: {reason}'))
+            self.stdout.write(f'✅ 已检查: {summary["alive"] + summary["dead"]}/{len(items)}')
+
+        asyncio.run(checker.run(items, on_batch, batch_size=options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(
+            f'✨ 检查完成! 正常: {summary["alive"]} 个, 失效: {summary["dead"]} 个'
+        ))
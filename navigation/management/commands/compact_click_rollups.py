@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from navigation.analytics import DAY, HOUR, click_aggregator
+from navigation.models import LinkClickRollup
+
+
+class Command(BaseCommand):
+    help = '分批清理超过保留期的点击汇总，可选回收数据库空间'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hourly-days', type=int, default=settings.CLICK_HOURLY_RETENTION_DAYS,
+                            help='小时粒度汇总的保留天数')
+        parser.add_argument('--daily-days', type=int, default=settings.CLICK_DAILY_RETENTION_DAYS,
+                            help='天粒度汇总的保留天数')
+        parser.add_argument('--batch-size', type=int, default=5000, help='每批删除的记录数')
+        parser.add_argument('--vacuum', action='store_true', help='清理后回收数据库空间并更新统计信息')
+
+    def handle(self, *args, **options):
+        # 先写入本进程缓冲的点击，保证统计的剩余行数准确
+        click_aggregator.flush()
+
+        now = timezone.now()
+        total = 0
+        for granularity, days in ((HOUR, options['hourly_days']), (DAY, options['daily_days'])):
+            deleted = self._prune(granularity, now - timedelta(days=days), options['batch_size'])
+            total += deleted
+            self.stdout.write(f'✅ {granularity} 粒度: 删除 {deleted} 条（保留 {days} 天）')
+
+        if options['vacuum']:
+            self._vacuum()
+
+        remaining = LinkClickRollup.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'✨ 清理完成! 删除汇总: {total} 条, 剩余: {remaining} 条'))
+
+    def _prune(self, granularity, cutoff, batch_size):
+        expired = LinkClickRollup.objects.filter(granularity=granularity, bucket__lt=cutoff)
+        deleted = 0
+        while True:
+            # 按 (granularity, bucket) 索引分批删除，避免长时间持有写锁阻塞点击写入
+            ids = list(expired.order_by('bucket').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            count, _ = LinkClickRollup.objects.filter(pk__in=ids).delete()
+            deleted += count
+        return deleted
+
+    def _vacuum(self):
+        if connection.vendor == 'sqlite':
+            statement = 'VACUUM'
+        elif connection.vendor == 'postgresql':
+            statement = f'VACUUM ANALYZE {connection.ops.quote_name(LinkClickRollup._meta.db_table)}'
+        else:
+            self.stdout.write(self.style.WARNING(f'⚠️ 不支持回收 {connection.vendor} 数据库的空间，已跳过'))
+            return
+        # VACUUM 不能在事务中执行
+        with connection.cursor() as cursor:
+            cursor.execute(statement)
+        self.stdout.write(f'✅ 已执行 {statement}')
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from navigation.changes import compact, pruned_through
+from navigation.models import NavigationChange
+
+
+class Command(BaseCommand):
+    help = '合并导航变更日志中同一对象的旧记录，并清理超过保留期的记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=settings.CHANGE_LOG_RETENTION_DAYS,
+                            help='变更记录的保留天数，更早游标的客户端需要重新全量同步')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批删除的记录数')
+
+    def handle(self, *args, **options):
+        merged, pruned = compact(options['retention_days'], options['batch_size'])
+        remaining = NavigationChange.objects.count()
+        self.stdout.write(f'✅ 合并旧记录: {merged} 条, 清理过期记录: {pruned} 条')
+        self.stdout.write(self.style.SUCCESS(
+            f'✨ 压缩完成! 剩余: {remaining} 条, 已清理到游标: {pruned_through()}'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from navigation.bookmarks import BOOKMARK_RENDERERS
+
+
+class Command(BaseCommand):
+    help = '将链接导出为浏览器书签文件，标签树对应书签文件夹'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='输出文件路径')
+        parser.add_argument('--format', choices=list(BOOKMARK_RENDERERS), default='html',
+                            help='文件格式: html（Netscape 书签文件，默认）或 json（Chrome 书签格式）')
+
+    def handle(self, *args, **options):
+        size = 0
+        try:
+            with open(options['path'], 'w', encoding='utf-8') as f:
+                for chunk in BOOKMARK_RENDERERS[options['format']]():
+                    f.write(chunk)
+                    size += len(chunk)
+        except OSError as e:
+            raise CommandError(f'无法写入文件: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'✨ 导出完成! 已写入 {options["path"]}（{size} 个字符）'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from navigation.duplicates import find_duplicates, rehash
+
+
+class Command(BaseCommand):
+    help = '列出规范化地址相同（忽略协议、主机大小写、末尾斜杠和跟踪参数）的重复链接'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='最多列出的分组数')
+        parser.add_argument('--rehash', action='store_true', help='先重新计算所有链接的 url_hash（调整规范化规则后使用）')
+
+    def handle(self, *args, **options):
+        if options['rehash']:
+            self.stdout.write(f'✅ 重新计算哈希: 更新 {rehash()} 个链接')
+
+        groups = find_duplicates(limit=options['limit'])
+        for group in groups:
+            self.stdout.write(self.style.WARNING(f'⚠️ {group["normalized_url"]}（{group["count"]} 个）'))
+            for link in group['links']:
+                self.stdout.write(f'    #{link["id"]} {link["title"]}: {link["url"]}')
+
+        if groups:
+            self.stdout.write(self.style.SUCCESS(f'✨ 检查完成! 共 {len(groups)} 组重复链接'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✨ 检查完成! 没有重复链接'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from navigation.bookmarks import BOOKMARK_PARSERS, guess_bookmark_format, import_bookmarks
+
+
+class Command(BaseCommand):
+    help = '从浏览器导出的书签文件（Netscape HTML、Chrome 或 Firefox JSON）批量导入链接，文件夹导入为标签'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='书签文件路径')
+        parser.add_argument('--format', choices=list(BOOKMARK_PARSERS), help='文件格式，默认根据扩展名判断')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批处理的书签数')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or guess_bookmark_format(options['path'])
+
+        try:
+            with open(options['path'], 'rb') as f:
+                result = import_bookmarks(f, fmt, batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(f'无法读取文件: {e}')
+        except ValueError as e:
+            raise CommandError(f'书签文件解析失败: {e}')
+
+        for index, message in result.errors:
+            self.stdout.write(self.style.WARNING(f'⚠️ 第 {index} 个书签: {message}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✨ 导入完成! 新建链接: {result.created} 个, 已存在: {result.existing} 个, '
+            f'新建标签: {result.tags_created} 个, 失败: {len(result.errors)} 个'
+        ))
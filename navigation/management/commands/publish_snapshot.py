@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from navigation.snapshot import brotli, publish, snapshot_root
+
+
+class Command(BaseCommand):
+    help = '立即生成并发布导航快照（原始、gzip 和 brotli 版本），内容未变化时不写入新版本'
+
+    def handle(self, *args, **options):
+        if brotli is None:
+            self.stdout.write(self.style.WARNING('⚠️ 未安装 brotli，只生成 gzip 版本'))
+
+        version, written = publish()
+        if written:
+            self.stdout.write(self.style.SUCCESS(f'✨ 发布完成! 版本: {version}, 目录: {snapshot_root()}'))
+        else:
+            self.stdout.write(f'✅ 内容未变化，当前版本: {version}')
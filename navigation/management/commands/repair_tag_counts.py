@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from navigation.tag_counts import find_drift, repair
+
+
+class Command(BaseCommand):
+    help = '按标签关联重新计算标签的链接数和含下级标签的链接数，修复与增量维护结果的偏差'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='只检查并列出偏差，不写入数据库')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = find_drift()
+            for tag, link_count, subtree_link_count in drifted:
+                self.stdout.write(self.style.WARNING(
+                    f'⚠️ {tag.name}: 链接数 {tag.link_count} -> {link_count}, '
+                    f'含下级标签 {tag.subtree_link_count} -> {subtree_link_count}'
+                ))
+
+            if not drifted:
+                self.stdout.write(self.style.SUCCESS('✨ 检查完成! 所有标签的计数全部正确'))
+                return
+            if options['dry_run']:
+                self.stdout.write(self.style.ERROR(f'❌ {len(drifted)} 个标签的计数存在偏差（--dry-run，未修复）'))
+                return
+            repair(drifted)
+        self.stdout.write(self.style.SUCCESS(f'✨ 修复完成! 已修复 {len(drifted)} 个标签的计数'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('navigation', '0004_remove_links_parent_tags_parent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='links',
+            index=models.Index(condition=models.Q(('is_show', True)), fields=['sort_order'], name='links_show_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='links',
+            index=models.Index(condition=models.Q(('is_recommend', True), ('is_show', True)), fields=['sort_order'], name='links_show_rec_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tags',
+            index=models.Index(condition=models.Q(('is_show', True)), fields=['sort_order'], name='tags_show_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tags',
+            index=models.Index(fields=['parent', 'sort_order'], name='tags_parent_sort_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('navigation', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='links',
+            name='popularity',
+            field=models.FloatField(default=0, verbose_name='热度'),
+        ),
+        migrations.AddIndex(
+            model_name='links',
+            index=models.Index(condition=models.Q(('is_show', True)), fields=['-popularity'], name='links_show_popularity_idx'),
+        ),
+    ]
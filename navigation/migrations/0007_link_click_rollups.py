@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('navigation', '0006_links_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkClickRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', '小时'), ('day', '天')], max_length=4, verbose_name='粒度')),
+                ('bucket', models.DateTimeField(verbose_name='时间段起点')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='点击次数')),
+                ('link', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='click_rollups', to='navigation.links', verbose_name='链接')),
+            ],
+            options={
+                'verbose_name': '链接点击汇总',
+                'verbose_name_plural': '链接点击汇总',
+                'db_table': 'link_click_rollups',
+                'indexes': [models.Index(fields=['granularity', 'bucket'], name='link_click_rollup_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'link', 'bucket'), name='link_click_rollup_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:55
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def populate_counts(apps, schema_editor):
+    """按现有的标签关联计算初始计数，逻辑与 navigation.tag_counts.compute_counts 相同"""
+    Tags = apps.get_model('navigation', 'Tags')
+    Links = apps.get_model('navigation', 'Links')
+    parents = dict(Tags.objects.values_list('id', 'parent_id'))
+    link_tags = {}
+    for link_id, tag_id in Links.tags.through.objects.values_list('links_id', 'tags_id').iterator():
+        link_tags.setdefault(link_id, set()).add(tag_id)
+
+    link_counts = Counter()
+    subtree_counts = Counter()
+    for tags in link_tags.values():
+        link_counts.update(tags)
+        closure = set()
+        for tag_id in tags:
+            while tag_id is not None and tag_id not in closure:
+                closure.add(tag_id)
+                tag_id = parents.get(tag_id)
+        subtree_counts.update(closure)
+
+    tags = [
+        Tags(id=tag_id, link_count=link_counts[tag_id], subtree_link_count=subtree_counts[tag_id])
+        for tag_id in subtree_counts
+    ]
+    Tags.objects.bulk_update(tags, ['link_count', 'subtree_link_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('navigation', '0007_link_click_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tags',
+            name='link_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='链接数'),
+        ),
+        migrations.AddField(
+            model_name='tags',
+            name='subtree_link_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='含下级标签的链接数'),
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('navigation', '0008_tags_link_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NavigationChangeHorizon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pruned_through', models.BigIntegerField(default=0, verbose_name='已清理到的游标')),
+            ],
+            options={
+                'verbose_name': '导航变更清理位置',
+                'verbose_name_plural': '导航变更清理位置',
+                'db_table': 'navigation_change_horizon',
+            },
+        ),
+        migrations.CreateModel(
+            name='NavigationChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('link', '链接'), ('tag', '标签')], max_length=4, verbose_name='对象类型')),
+                ('object_id', models.BigIntegerField(verbose_name='对象ID')),
+                ('action', models.CharField(choices=[('upsert', '新建或修改'), ('delete', '删除')], max_length=6, verbose_name='操作')),
+                ('changed_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='变更时间')),
+            ],
+            options={
+                'verbose_name': '导航变更',
+                'verbose_name_plural': '导航变更',
+                'db_table': 'navigation_changes',
+                'indexes': [models.Index(fields=['kind', 'object_id', 'id'], name='navigation_change_object_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:07
+
+from django.db import migrations, models
+
+from utils.urlnorm import url_hash
+
+
+def populate_url_hash(apps, schema_editor):
+    Links = apps.get_model('navigation', 'Links')
+    batch = []
+    for link in Links.objects.only('id', 'url').order_by('id').iterator(chunk_size=2000):
+        link.url_hash = url_hash(link.url)
+        batch.append(link)
+        if len(batch) >= 500:
+            Links.objects.bulk_update(batch, ['url_hash'])
+            batch = []
+    Links.objects.bulk_update(batch, ['url_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('navigation', '0009_navigation_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='links',
+            name='url_hash',
+            field=models.CharField(default='', editable=False, max_length=16, verbose_name='规范化链接哈希'),
+        ),
+        migrations.RunPython(populate_url_hash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='links',
+            index=models.Index(fields=['url_hash'], name='links_url_hash_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('navigation', '0010_links_url_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='links',
+            name='last_checked',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='最近检查时间'),
+        ),
+        migrations.AddField(
+            model_name='links',
+            name='status',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='检查状态码'),
+        ),
+        migrations.AddIndex(
+            model_name='links',
+            index=models.Index(fields=['last_checked', 'id'], name='links_last_checked_idx'),
+        ),
+    ]
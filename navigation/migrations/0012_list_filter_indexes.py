@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('navigation', '0011_links_check_status'),
+    ]
+
+    operations = [
+        # 由下面的复合索引代替，查询需要写成 is_show__in=[True]
+        migrations.RemoveIndex(
+            model_name='links',
+            name='links_show_sort_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='links',
+            name='links_show_rec_sort_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tags',
+            name='tags_show_sort_idx',
+        ),
+        migrations.AddIndex(
+            model_name='links',
+            index=models.Index(fields=['sort_order', 'id'], name='links_order_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='links',
+            index=models.Index(fields=['click_count', 'id'], name='links_order_click_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='links',
+            index=models.Index(fields=['created_at', 'id'], name='links_order_ctime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='links',
+            index=models.Index(fields=['updated_at', 'id'], name='links_order_mtime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='links',
+            index=models.Index(fields=['is_show', 'sort_order', 'id'], name='links_show_order_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='links',
+            index=models.Index(fields=['is_show', 'created_at', 'id'], name='links_show_order_ctime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='links',
+            index=models.Index(fields=['is_show', 'is_recommend', 'sort_order', 'id'], name='links_show_rec_order_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tags',
+            index=models.Index(fields=['sort_order', 'id'], name='tags_order_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tags',
+            index=models.Index(fields=['created_at', 'id'], name='tags_order_ctime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tags',
+            index=models.Index(fields=['updated_at', 'id'], name='tags_order_mtime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tags',
+            index=models.Index(fields=['is_show', 'sort_order', 'id'], name='tags_show_order_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tags',
+            index=models.Index(fields=['is_show', 'created_at', 'id'], name='tags_show_order_ctime_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('navigation', '0012_list_filter_indexes'),
+    ]
+
+    operations = [
+        # 已有的热度都以 POPULARITY_EPOCH 为基准，即第 0 个周期
+        migrations.AddField(
+            model_name='links',
+            name='popularity_period',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='热度基准周期'),
+        ),
+    ]
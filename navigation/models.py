@@ -1,5 +1,7 @@
 from django.db import models
 
+from utils.urlnorm import HASH_LENGTH, url_hash
+
 # Create your models here.
 class Tags(models.Model):
     name = models.CharField(max_length=50, unique=True,verbose_name='标签名称')
@@ -11,29 +13,170 @@ class Tags(models.Model):
     is_show = models.BooleanField(default=True ,verbose_name='是否显示')
     parent = models.ForeignKey('self', on_delete=models.SET_NULL, related_name="children", blank=True, null=True,
                                verbose_name='父级标签')
+    # 由 navigation.tag_counts 增量维护，repair_tag_counts 命令校验并修复
+    link_count = models.PositiveIntegerField(default=0, verbose_name='链接数')
+    subtree_link_count = models.PositiveIntegerField(default=0, verbose_name='含下级标签的链接数')
     created_at = models.DateTimeField(auto_now_add=True ,verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True ,verbose_name='更新时间')
     class Meta:
         db_table = 'tags'
         verbose_name = '标签'
         verbose_name_plural = '标签'
+        indexes = [
+            models.Index(fields=['parent', 'sort_order'], name='tags_parent_sort_idx'),
+            # 列表接口的过滤和排序（utils.filters.IndexedFilterBackend）：(过滤字段..., 排序字段, id)
+            # 不过滤的三种排序供后台管理使用；显示的标签按排序展示（也用于快照），以及按创建时间列出最新标签。
+            # 按 is_show=True 的查询需要写成 is_show__in=[True] 才会使用这些索引（navigation.tests 中有检查）
+            models.Index(fields=['sort_order', 'id'], name='tags_order_sort_idx'),
+            models.Index(fields=['created_at', 'id'], name='tags_order_ctime_idx'),
+            models.Index(fields=['updated_at', 'id'], name='tags_order_mtime_idx'),
+            models.Index(fields=['is_show', 'sort_order', 'id'], name='tags_show_order_sort_idx'),
+            models.Index(fields=['is_show', 'created_at', 'id'], name='tags_show_order_ctime_idx'),
+        ]
+    # 只能通过 F() 表达式增量更新的字段，save() 时不写入，避免用实例中的旧值覆盖
+    COUNTER_FIELDS = ('link_count', 'subtree_link_count')
+
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        if self.pk is None:
+            # 新建（包括 pk = None 复制已有标签）时还没有关联的链接
+            self.link_count = self.subtree_link_count = 0
+        elif not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
 class Links(models.Model):
     title = models.CharField(max_length=50,unique=True,verbose_name='链接标题')
     url = models.URLField(unique=True,verbose_name='链接地址')
+    # 规范化地址的哈希，用于查找重复链接，见 utils.urlnorm；批量写入时需要调用 set_url_hash
+    url_hash = models.CharField(max_length=HASH_LENGTH, default='', editable=False, verbose_name='规范化链接哈希')
     description = models.TextField(blank=True, null=True,verbose_name='链接描述')
     icon = models.CharField(max_length=50, blank=True, null=True,verbose_name='链接图标')
     click_count = models.IntegerField(default=0,verbose_name='点击次数')
+    # 按时间衰减的点击热度，以 popularity_period 周期的基准时间累加，见 navigation.popularity
+    popularity = models.FloatField(default=0,verbose_name='热度')
+    popularity_period = models.PositiveIntegerField(default=0, editable=False, verbose_name='热度基准周期')
     is_recommend = models.BooleanField(default=False,verbose_name='是否推荐')
     is_show = models.BooleanField(default=True,verbose_name='是否显示')
     sort_order = models.IntegerField(blank=True, null=True,verbose_name='链接排序')
     tags = models.ManyToManyField(Tags, blank=True,related_name="links" ,verbose_name='标签')
+    # 由 check_links 命令维护：最近一次检查的时间和 HTTP 状态码，0 表示无法连接或超时
+    last_checked = models.DateTimeField(blank=True, null=True, verbose_name='最近检查时间')
+    status = models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='检查状态码')
     created_at = models.DateTimeField(auto_now_add=True,verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True,verbose_name='更新时间')
     class Meta:
         db_table = 'links'
         verbose_name = '链接'
         verbose_name_plural = '链接'
+        # 布尔字段的等值过滤会被编译为 WHERE "is_show"，使用部分索引才能命中
+        indexes = [
+            models.Index(fields=['-popularity'], condition=models.Q(is_show=True), name='links_show_popularity_idx'),
+            models.Index(fields=['url_hash'], name='links_url_hash_idx'),
+            # check_links 按检查时间从旧到新选取待检查的链接
+            models.Index(fields=['last_checked', 'id'], name='links_last_checked_idx'),
+            # 列表接口的过滤和排序（utils.filters.IndexedFilterBackend）：(过滤字段..., 排序字段, id)
+            # 不过滤的四种排序供后台管理使用；前台只按排序展示显示的（推荐）链接（也用于快照），
+            # 以及按创建时间列出最新链接。click_count 每次点击汇总都会更新，只保留一个索引；
+            # 显示链接的热门榜单使用 links_show_popularity_idx。
+            # 按 is_show=True 的查询需要写成 is_show__in=[True] 才会使用这些索引（navigation.tests 中有检查）
+            models.Index(fields=['sort_order', 'id'], name='links_order_sort_idx'),
+            models.Index(fields=['click_count', 'id'], name='links_order_click_idx'),
+            models.Index(fields=['created_at', 'id'], name='links_order_ctime_idx'),
+            models.Index(fields=['updated_at', 'id'], name='links_order_mtime_idx'),
+            models.Index(fields=['is_show', 'sort_order', 'id'], name='links_show_order_sort_idx'),
+            models.Index(fields=['is_show', 'created_at', 'id'], name='links_show_order_ctime_idx'),
+            models.Index(fields=['is_show', 'is_recommend', 'sort_order', 'id'], name='links_show_rec_order_sort_idx'),
+        ]
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+    def set_url_hash(self):
+        self.url_hash = url_hash(self.url)
+
+    def save(self, *args, **kwargs):
+        self.set_url_hash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'url' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'url_hash'}
+        super().save(*args, **kwargs)
+
+class LinkClickRollup(models.Model):
+    """
+    链接点击的分时段汇总
+
+    点击先在内存中按 (链接, 粒度, 时间段) 聚合，再批量累加写入，不保存逐次点击的明细。
+    """
+    GRANULARITY_HOUR = 'hour'
+    GRANULARITY_DAY = 'day'
+    GRANULARITY_CHOICES = [
+        (GRANULARITY_HOUR, '小时'),
+        (GRANULARITY_DAY, '天'),
+    ]
+
+    link = models.ForeignKey(Links, on_delete=models.CASCADE, related_name='click_rollups', verbose_name='链接')
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES, verbose_name='粒度')
+    bucket = models.DateTimeField(verbose_name='时间段起点')
+    count = models.PositiveIntegerField(default=0, verbose_name='点击次数')
+    class Meta:
+        db_table = 'link_click_rollups'
+        verbose_name = '链接点击汇总'
+        verbose_name_plural = '链接点击汇总'
+        constraints = [
+            # 同时作为单个链接按时间范围查询的索引
+            models.UniqueConstraint(fields=['granularity', 'link', 'bucket'], name='link_click_rollup_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'bucket'], name='link_click_rollup_bucket_idx'),
+        ]
+
+
+class NavigationChange(models.Model):
+    """
+    导航数据的变更日志
+
+    自增主键就是同步游标。链接、标签的新建、修改（包括标签关联变化）和删除各追加一行，
+    增量同步接口按游标读取，compact_navigation_changes 命令合并同一对象的旧记录并清理过期记录。
+    """
+    KIND_LINK = 'link'
+    KIND_TAG = 'tag'
+    KIND_CHOICES = [
+        (KIND_LINK, '链接'),
+        (KIND_TAG, '标签'),
+    ]
+    ACTION_UPSERT = 'upsert'
+    ACTION_DELETE = 'delete'
+    ACTION_CHOICES = [
+        (ACTION_UPSERT, '新建或修改'),
+        (ACTION_DELETE, '删除'),
+    ]
+
+    kind = models.CharField(max_length=4, choices=KIND_CHOICES, verbose_name='对象类型')
+    object_id = models.BigIntegerField(verbose_name='对象ID')
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES, verbose_name='操作')
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='变更时间')
+    class Meta:
+        db_table = 'navigation_changes'
+        verbose_name = '导航变更'
+        verbose_name_plural = '导航变更'
+        indexes = [
+            # 合并同一对象的旧记录
+            models.Index(fields=['kind', 'object_id', 'id'], name='navigation_change_object_idx'),
+        ]
+
+
+class NavigationChangeHorizon(models.Model):
+    """
+    变更日志的清理位置（单行）
+
+    游标不超过 pruned_through 的记录可能已被清理，使用更早游标的客户端需要重新全量同步。
+    """
+    pruned_through = models.BigIntegerField(default=0, verbose_name='已清理到的游标')
+    class Meta:
+        db_table = 'navigation_change_horizon'
+        verbose_name = '导航变更清理位置'
+        verbose_name_plural = '导航变更清理位置'
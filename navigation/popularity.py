@@ -0,0 +1,234 @@
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When, Window
+from django.db.models.functions import Power, RowNumber
+from django.utils import timezone
+
+from navigation.analytics import click_aggregator
+from navigation.models import Links
+from navigation.serializers import LOOKUP_BATCH_SIZE
+from utils.streaming import iter_batches
+
+# 榜单中每个链接需要的展示字段
+DETAIL_FIELDS = ('id', 'title', 'url', 'icon')
+# 热度的基准时间每隔这么多个半衰期前移一次，点击权重始终在 [1, 2^64) 之间
+PERIOD_HALF_LIVES = 64
+# 落后超过这么多个周期的热度已小于 2^-512 倍，换算时直接记为 0，避免浮点下溢
+MAX_PERIODS_BEHIND = 8
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def popularity_epoch():
+    epoch = _setting('POPULARITY_EPOCH', '2024-01-01T00:00:00+00:00')
+    return datetime.fromisoformat(epoch).astimezone(dt_timezone.utc)
+
+
+def half_life_seconds():
+    return _setting('POPULARITY_HALF_LIFE_HOURS', 168) * 3600
+
+
+def popularity_period(at=None):
+    """时间所在的热度周期：第 n 个周期的基准时间为 POPULARITY_EPOCH 之后 n * PERIOD_HALF_LIVES 个半衰期"""
+    at = at or timezone.now()
+    half_lives = (at - popularity_epoch()).total_seconds() / half_life_seconds()
+    return max(0, math.floor(half_lives / PERIOD_HALF_LIVES))
+
+
+def click_weight(at=None, period=None):
+    """
+    一次点击相对周期基准时间的权重
+
+    热度按半衰期指数衰减。同一周期内所有链接的分数都以周期的基准时间累加 2^((t - 基准时间) / 半衰期)，
+    不同时间点的比较只差一个公共因子，因此点击时只需累加，不必定期改写全表。
+    基准时间每 PERIOD_HALF_LIVES 个半衰期前移一次，半衰期再短权重也不会溢出；
+    链接记录自己的分数所在的周期（popularity_period），跨周期时按 rebased_popularity 换算。
+    """
+    at = at or timezone.now()
+    period = popularity_period(at) if period is None else period
+    half_lives = (at - popularity_epoch()).total_seconds() / half_life_seconds()
+    return 2.0 ** (half_lives - period * PERIOD_HALF_LIVES)
+
+
+def rebased_popularity(period):
+    """换算到 period 周期基准的热度表达式：每落后一个周期乘以 2^-PERIOD_HALF_LIVES"""
+    return Case(
+        When(popularity_period=period, then=F('popularity')),
+        When(
+            popularity_period__gte=period - MAX_PERIODS_BEHIND,
+            then=F('popularity') * Power(Value(2.0), (F('popularity_period') - period) * PERIOD_HALF_LIVES),
+        ),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def rebase_popularity(period=None):
+    """
+    把周期早于 period 的链接热度换算到 period 周期
+
+    每个进程的热度榜单在周期变化后的第一次刷新时调用；与 record_click 一样是单条 UPDATE，
+    多个进程同时执行也只会换算一次。
+
+    返回:
+        换算的链接数
+    """
+    period = popularity_period() if period is None else period
+    return Links.objects.filter(popularity_period__lt=period).update(
+        popularity=rebased_popularity(period),
+        popularity_period=period,
+    )
+
+
+def record_click(link_id):
+    """
+    记录一次点击：在数据库中累加点击次数和热度，并增量更新本进程的热度榜单和点击汇总缓冲区
+
+    返回:
+        更新后的链接字段，链接不存在时返回 None
+    """
+    at = timezone.now()
+    period = popularity_period(at)
+    updated = Links.objects.filter(pk=link_id).update(
+        click_count=F('click_count') + 1,
+        popularity=rebased_popularity(period) + click_weight(at, period),
+        popularity_period=period,
+    )
+    if not updated:
+        return None
+    click_aggregator.add(link_id)
+    row = Links.objects.filter(pk=link_id).values(
+        *DETAIL_FIELDS, 'click_count', 'popularity', 'popularity_period', 'is_show'
+    ).get()
+    if row['is_show']:
+        tag_ids = list(Links.tags.through.objects.filter(links_id=link_id).values_list('tags_id', flat=True))
+        popularity_ranking.offer(row, tag_ids)
+    return row
+
+
+class PopularityRanking:
+    """
+    进程内的热度榜单（全局和每个标签各一份）
+
+    后台定期从数据库加载每个范围内热度最高的候选链接（数量为榜单长度的两倍，留出淘汰余量），
+    本进程处理的点击通过 offer 增量更新候选集，读取榜单时只在内存中排序，不访问数据库。
+    其他进程处理的点击在下一次后台刷新后体现。热度周期变化后的第一次读取同步换算并重新加载。
+
+    参数:
+        size: 每个榜单返回的最大条数
+        refresh_interval: 后台刷新的间隔（秒）
+    """
+
+    def __init__(self, size=50, refresh_interval=60):
+        self.size = size
+        self.capacity = size * 2
+        self.refresh_interval = refresh_interval
+        self._scores = {None: {}}
+        self._details = {}
+        self._refreshed_at = None
+        self._period = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def top(self, tag_id=None, limit=None):
+        """
+        返回热度最高的链接，按分数降序排列
+
+        分数换算到当前时刻，相当于多少次“刚刚发生”的点击。
+        """
+        self.maybe_refresh()
+        limit = min(limit or self.size, self.size)
+        with self._lock:
+            scores = self._scores.get(tag_id, {})
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            details = [self._details[link_id] for link_id, _ in ranked]
+            period = self._period
+
+        weight = click_weight(period=period)
+        return [
+            dict(detail, score=round(score / weight, 4))
+            for detail, (_, score) in zip(details, ranked)
+        ]
+
+    def offer(self, row, tag_ids):
+        """用一条点击后的最新数据更新候选集，分数所在的周期与榜单不同时留给下一次加载"""
+        detail = {field: row[field] for field in DETAIL_FIELDS}
+        with self._lock:
+            if row.get('popularity_period', self._period) != self._period:
+                return
+            self._details[row['id']] = detail
+            for scope in (None, *tag_ids):
+                scores = self._scores.setdefault(scope, {})
+                scores[row['id']] = row['popularity']
+                if len(scores) > self.capacity:
+                    del scores[min(scores, key=scores.get)]
+
+    def maybe_refresh(self):
+        now = time.monotonic()
+        if self._refreshed_at is None or self._period != popularity_period():
+            # 首次读取时同步加载；周期变化后内存中的分数与新的权重不可比较，同样同步加载
+            self.refresh()
+            return
+        if now - self._refreshed_at < self.refresh_interval or self._refreshing:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        finally:
+            connections.close_all()
+
+    def refresh(self):
+        """从数据库重新加载全局和每个标签的候选链接"""
+        try:
+            period = popularity_period()
+            if period != self._period:
+                rebase_popularity(period)
+            visible = Q(is_show=True, popularity__gt=0)
+            global_rows = list(
+                Links.objects.filter(visible).order_by('-popularity').values(*DETAIL_FIELDS, 'popularity')[:self.capacity]
+            )
+
+            # 每个标签内按热度编号，一次查询取出所有标签的前 capacity 个链接
+            through = Links.tags.through.objects.filter(
+                links__is_show=True, links__popularity__gt=0
+            ).annotate(
+                rank=Window(RowNumber(), partition_by=F('tags_id'), order_by=F('links__popularity').desc())
+            ).filter(rank__lte=self.capacity)
+            tag_rows = list(through.values_list('tags_id', 'links_id', 'links__popularity'))
+
+            missing = {link_id for _, link_id, _ in tag_rows} - {row['id'] for row in global_rows}
+            detail_rows = list(global_rows)
+            for batch in iter_batches(missing, LOOKUP_BATCH_SIZE):
+                detail_rows += Links.objects.filter(pk__in=batch).values(*DETAIL_FIELDS)
+
+            scores = {None: {row['id']: row['popularity'] for row in global_rows}}
+            for tag_id, link_id, popularity in tag_rows:
+                scores.setdefault(tag_id, {})[link_id] = popularity
+            details = {row['id']: {field: row[field] for field in DETAIL_FIELDS} for row in detail_rows}
+
+            with self._lock:
+                self._scores = scores
+                self._details = details
+                self._period = period
+        finally:
+            self._refreshed_at = time.monotonic()
+            self._refreshing = False
+
+
+popularity_ranking = PopularityRanking(
+    size=_setting('POPULARITY_TOP_N', 50),
+    refresh_interval=_setting('POPULARITY_REFRESH_SECONDS', 60),
+)
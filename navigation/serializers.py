@@ -1,31 +1,367 @@
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
+from rest_framework.settings import api_settings
 
+from navigation import changes
+from navigation.duplicates import find_by_url, hash_holders
 from navigation.models import Tags, Links
+from utils.fieldsets import SparseFieldsetMixin
+from utils.projection import ProjectionSerializer
+from utils.streaming import iter_batches
+from utils.urlnorm import url_hash
+
+# IN 查询每次携带的参数个数，避免超过 SQLite 的变量数上限
+LOOKUP_BATCH_SIZE = 900
+# bulk_create / bulk_update 每条语句写入的行数
+WRITE_BATCH_SIZE = 500
 
 
-class TagsSerializer(ModelSerializer):
+class TagsSerializer(SparseFieldsetMixin, ModelSerializer):
     class Meta:
         model = Tags
         fields = "__all__"
-        read_only_fields = ("id",)
-class LinksSerializer(ModelSerializer):
+        read_only_fields = ("id", "link_count", "subtree_link_count")
+class LinksSerializer(SparseFieldsetMixin, ModelSerializer):
     tags = serializers.PrimaryKeyRelatedField(
         many=True,
         queryset=Tags.objects.all(),
         # 允许通过ID列表进行写入
     )
+    # ?expand=tags 时输出标签的id和name，否则只输出标签ID
+    expandable_fields = {'tags': ('name',)}
+    default_expand = ('tags',)
+
     class Meta:
         model = Links
-        fields = "__all__"
-        read_only_fields = ("id",)
+        # 热度由点击接口维护，不对外读写
+        exclude = ("popularity",)
+        # 检查结果由 check_links 命令写入
+        read_only_fields = ("id", "last_checked", "status")
+
+    def validate_url(self, value):
+        # 协议、大小写、末尾斜杠或跟踪参数不同的地址视为同一链接
+        duplicates = find_by_url(value)
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        title = duplicates.values_list('title', flat=True).first()
+        if title is not None:
+            raise serializers.ValidationError(f'与已有链接“{title}”的地址重复')
+        return value
 
     def to_representation(self, instance):
         # 调用父类方法获取原始序列化数据
         representation = super().to_representation(instance)
         # 将tags字段替换为包含id和name的字典
-        representation['tags'] = [
-            {'id': tag.id, 'name': tag.name}
-            for tag in instance.tags.all()
-        ]
+        if self.is_expanded('tags'):
+            representation['tags'] = [
+                {'id': tag.id, 'name': tag.name}
+                for tag in instance.tags.all()
+            ]
         return representation
+
+
+class LinksProjection(ProjectionSerializer):
+    """LinksSerializer 的 values() 投影，展开的标签每页只 JOIN 查询一次关联表"""
+    overrides_representation = True
+
+    def load_related(self, name, model_field, pks):
+        if name != 'tags' or not self.serializer.is_expanded('tags'):
+            return super().load_related(name, model_field, pks)
+
+        tags = {}
+        for batch in iter_batches(pks, LOOKUP_BATCH_SIZE):
+            through = Links.tags.through.objects.filter(links_id__in=batch).order_by('links_id', 'tags_id')
+            for link_id, tag_id, tag_name in through.values_list('links_id', 'tags_id', 'tags__name'):
+                tags.setdefault(link_id, []).append({'id': tag_id, 'name': tag_name})
+        return tags
+
+
+class LinksBulkListSerializer(serializers.ListSerializer):
+    """
+    批量创建/更新链接
+
+    所有校验都是批量完成的：标签ID、待更新的链接ID以及 title/url 唯一性
+    各自只需按 LOOKUP_BATCH_SIZE 分块的 IN 查询，不会逐条查询数据库。
+    url 按规范化地址的哈希判断重复，见 utils.urlnorm。
+    """
+
+    def to_internal_value(self, data):
+        # 逐条字段校验通过后再做批量校验，错误按条目顺序以列表返回
+        attrs = super().to_internal_value(data)
+        errors = [{} for _ in attrs]
+
+        # 请求内部的重复
+        seen = {'id': {}, 'title': {}, 'url': {}}
+        for index, item in enumerate(attrs):
+            for field in seen:
+                value = item.get(field)
+                if value is None:
+                    continue
+                if field == 'url':
+                    value = url_hash(value)
+                if value in seen[field]:
+                    errors[index][field] = [f'与第 {seen[field][value] + 1} 条数据重复']
+                else:
+                    seen[field][value] = index
+
+        # 待更新的链接必须存在
+        ids = list(seen['id'])
+        existing_ids = set()
+        for chunk in iter_batches(ids, LOOKUP_BATCH_SIZE):
+            existing_ids.update(Links.objects.filter(id__in=chunk).values_list('id', flat=True))
+
+        # 引用的标签必须存在
+        tag_ids = list({tag_id for item in attrs for tag_id in item.get('tags', [])})
+        existing_tags = set()
+        for chunk in iter_batches(tag_ids, LOOKUP_BATCH_SIZE):
+            existing_tags.update(Tags.objects.filter(id__in=chunk).values_list('id', flat=True))
+
+        # title/url 不能与数据库中的其他链接冲突
+        holders = {'title': {}, 'url': hash_holders(seen['url'])}
+        for chunk in iter_batches(list(seen['title']), LOOKUP_BATCH_SIZE):
+            for title, holder in Links.objects.filter(title__in=chunk).values_list('title', 'id'):
+                holders['title'][title] = {holder}
+
+        for index, item in enumerate(attrs):
+            link_id = item.get('id')
+            if link_id is not None and link_id not in existing_ids:
+                errors[index].setdefault('id', [f'链接 {link_id} 不存在'])
+            missing = [tag_id for tag_id in item.get('tags', []) if tag_id not in existing_tags]
+            if missing:
+                errors[index]['tags'] = [f'标签不存在: {", ".join(map(str, missing))}']
+            for field, value in (('title', item['title']), ('url', url_hash(item['url']))):
+                if holders[field].get(value, set()) - {link_id}:
+                    verbose_name = Links._meta.get_field(field).verbose_name
+                    errors[index].setdefault(field, [f'具有 {verbose_name} 的链接已存在。'])
+
+        if any(errors):
+            # 与 DRF 对逐条校验错误使用的格式保持一致
+            if getattr(api_settings, 'LIST_SERIALIZER_ERRORS_AS_DICT', False):
+                errors = {index: error for index, error in enumerate(errors) if error}
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data):
+        """在一个事务内批量写入链接及其标签关联，返回 (新建的链接, 更新的链接)"""
+        # tag_counts、snapshot 依赖本模块的 LOOKUP_BATCH_SIZE，在函数内导入避免循环导入
+        from navigation import snapshot, tag_counts
+
+        Through = Links.tags.through
+        now = timezone.now()
+        to_create, to_update, tag_sets = [], [], []
+        # 按提交的字段分组更新，未提交的字段保持数据库中的值
+        update_groups = {}
+
+        for item in validated_data:
+            item = dict(item)
+            tags = item.pop('tags', None)
+            if item.get('id') is None:
+                item.pop('id', None)
+                link = Links(**item)
+                link.set_url_hash()
+                to_create.append(link)
+            else:
+                link = Links(**item, updated_at=now)
+                fields = tuple(sorted(field for field in item if field != 'id')) + ('updated_at',)
+                if 'url' in item:
+                    link.set_url_hash()
+                    fields += ('url_hash',)
+                update_groups.setdefault(fields, []).append(link)
+                to_update.append(link)
+            tag_sets.append((link, tags))
+
+        with transaction.atomic():
+            for fields, links in update_groups.items():
+                Links.objects.bulk_update(links, fields, batch_size=WRITE_BATCH_SIZE)
+            # 更新时提交了 tags 的链接，先清空原有的标签关联
+            replaced = [link.id for link, tags in tag_sets if link.pk is not None and tags is not None]
+            # 批量写入关联表不发送 m2m_changed，标签计数在这里按前后差异更新
+            tags_before = tag_counts.load_link_tags(replaced)
+            for chunk in iter_batches(replaced, LOOKUP_BATCH_SIZE):
+                Through.objects.filter(links_id__in=chunk).delete()
+            if to_create:
+                Links.objects.bulk_create(to_create, batch_size=WRITE_BATCH_SIZE)
+            Through.objects.bulk_create(
+                [
+                    Through(links_id=link.id, tags_id=tag_id)
+                    for link, tags in tag_sets if tags
+                    for tag_id in dict.fromkeys(tags)
+                ],
+                batch_size=WRITE_BATCH_SIZE
+            )
+            tag_counts.apply_changes(
+                tags_before,
+                {link.id: set(tags) for link, tags in tag_sets if tags is not None},
+            )
+            # bulk_create / bulk_update 不发送信号
+            changes.record(changes.LINK, [link.id for link, _ in tag_sets])
+            snapshot.catalog_changed()
+        return to_create, to_update
+
+
+class LinksBulkSerializer(ModelSerializer):
+    """批量接口中的单条链接，带 id 时表示更新该链接"""
+    id = serializers.IntegerField(required=False)
+    tags = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    class Meta:
+        model = Links
+        fields = [
+            'id', 'title', 'url', 'description', 'icon', 'click_count',
+            'is_recommend', 'is_show', 'sort_order', 'tags'
+        ]
+        list_serializer_class = LinksBulkListSerializer
+        # 唯一性由 LinksBulkListSerializer 批量校验
+        extra_kwargs = {
+            'title': {'validators': []},
+            'url': {'validators': []},
+        }
+
+
+
+class ReorderSerializer(serializers.Serializer):
+    """
+    按提交顺序重新编排排序值
+
+    ids 中第 i 个对象的 sort_order 设为 i。所有ID在一次查询中校验，只写入有变化的行，
+    在一个事务内以 bulk_update 完成，共用同一个 updated_at。
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+    model = None
+    # 变更日志中的对象类型
+    change_kind = None
+    # 校验时读取的列
+    loaded_fields = ('id', 'sort_order')
+
+    def validate_ids(self, ids):
+        duplicated = sorted(pk for pk, count in Counter(ids).items() if count > 1)
+        if duplicated:
+            raise serializers.ValidationError(f'ID重复: {", ".join(map(str, duplicated))}')
+        return ids
+
+    def validate(self, attrs):
+        self.current = {}
+        for chunk in iter_batches(attrs['ids'], LOOKUP_BATCH_SIZE):
+            self.current.update(
+                (obj.pk, obj) for obj in self.model.objects.filter(pk__in=chunk).only(*self.loaded_fields)
+            )
+        missing = [pk for pk in attrs['ids'] if pk not in self.current]
+        if missing:
+            raise serializers.ValidationError({'ids': [f'不存在: {", ".join(map(str, missing))}']})
+        return attrs
+
+    def changed_objects(self):
+        """返回 (需要写入的对象, 写入的字段)"""
+        changed = []
+        for position, pk in enumerate(self.validated_data['ids']):
+            obj = self.current[pk]
+            if obj.sort_order != position:
+                obj.sort_order = position
+                changed.append(obj)
+        return changed, ['sort_order']
+
+    def save(self):
+        """写入并返回有变化的对象"""
+        # snapshot 依赖本模块的 LOOKUP_BATCH_SIZE，在函数内导入避免循环导入
+        from navigation import snapshot
+
+        changed, fields = self.changed_objects()
+        now = timezone.now()
+        for obj in changed:
+            obj.updated_at = now
+        with transaction.atomic():
+            self.model.objects.bulk_update(changed, [*fields, 'updated_at'], batch_size=WRITE_BATCH_SIZE)
+            self.after_update(changed)
+            if changed:
+                changes.record(self.change_kind, [obj.pk for obj in changed])
+                snapshot.catalog_changed()
+        return changed
+
+    def after_update(self, changed):
+        """在写入的事务内执行"""
+
+
+class LinksReorderSerializer(ReorderSerializer):
+    model = Links
+    change_kind = changes.LINK
+
+
+class TagReorderItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    # 未提交时保持原父级标签，null 表示移到顶层
+    parent = serializers.IntegerField(required=False, allow_null=True)
+
+
+class TagsReorderSerializer(ReorderSerializer):
+    """
+    按提交顺序重新编排标签的排序值，并可同时修改父级标签
+
+    items 中的项带 parent 时移动到该父级标签下。校验需要完整的层级关系，
+    因此一次读取全部标签（标签数量有限），并检查父级标签存在且移动后不会形成环。
+    被移动标签的链接计数在同一事务内更新。
+    """
+    ids = None
+    items = TagReorderItemSerializer(many=True, allow_empty=False)
+
+    model = Tags
+    change_kind = changes.TAG
+    loaded_fields = ('id', 'sort_order', 'parent_id')
+
+    def validate_items(self, items):
+        self.validate_ids([item['id'] for item in items])
+        return items
+
+    def validate(self, attrs):
+        # tag_counts 依赖本模块的 LOOKUP_BATCH_SIZE，在函数内导入避免循环导入
+        from navigation import tag_counts
+
+        items = attrs['items']
+        self.current = {tag.pk: tag for tag in Tags.objects.only(*self.loaded_fields)}
+        missing = [item['id'] for item in items if item['id'] not in self.current]
+        if missing:
+            raise serializers.ValidationError({'items': [f'标签不存在: {", ".join(map(str, missing))}']})
+
+        self.parents_before = {pk: tag.parent_id for pk, tag in self.current.items()}
+        parents = dict(self.parents_before)
+        errors = [{} for _ in items]
+        for index, item in enumerate(items):
+            parent = item.get('parent')
+            if parent is not None and parent not in self.current:
+                errors[index]['parent'] = [f'标签 {parent} 不存在']
+            elif 'parent' in item:
+                parents[item['id']] = parent
+        for index, item in enumerate(items):
+            if item.get('parent') is not None and item['id'] in tag_counts.ancestors([item['parent']], parents):
+                errors[index].setdefault('parent', ['不能移动到自身或下级标签下'])
+        if any(errors):
+            raise serializers.ValidationError({'items': errors})
+        self.parents_after = parents
+        return attrs
+
+    def changed_objects(self):
+        changed = []
+        for position, item in enumerate(self.validated_data['items']):
+            tag = self.current[item['id']]
+            parent = item.get('parent', tag.parent_id)
+            if tag.sort_order != position or tag.parent_id != parent:
+                tag.sort_order = position
+                tag.parent_id = parent
+                changed.append(tag)
+        return changed, ['sort_order', 'parent']
+
+    def after_update(self, changed):
+        # bulk_update 不发送信号，被移动标签子树的链接计数按层级前后差异更新
+        from navigation import tag_counts
+
+        subtree = set()
+        for tag in changed:
+            if self.parents_before[tag.pk] != tag.parent_id:
+                subtree |= tag_counts.descendants(tag.pk, self.parents_after)
+        if subtree:
+            link_tags = tag_counts.load_link_tags(tag_counts.tagged_link_ids(subtree))
+            tag_counts.apply_changes(link_tags, link_tags, self.parents_before, self.parents_after)
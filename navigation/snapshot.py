@@ -0,0 +1,210 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from navigation.models import Links, Tags
+from navigation.serializers import LOOKUP_BATCH_SIZE
+from utils.fastjson import FastJSONRenderer
+from utils.streaming import iter_batches
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 未安装时只生成 gzip 版本
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+TAG_FIELDS = ('id', 'name', 'slug', 'description', 'icon', 'color', 'sort_order', 'parent_id',
+              'link_count', 'subtree_link_count')
+# 点击次数和热度变化频繁，不进入快照
+LINK_FIELDS = ('id', 'title', 'url', 'description', 'icon', 'is_recommend', 'sort_order')
+
+POINTER_NAME = 'latest.json'
+# 文件扩展名对应的 Content-Encoding，按优先级排列
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def snapshot_root():
+    return Path(_setting('SNAPSHOT_ROOT', settings.BASE_DIR / 'snapshots'))
+
+
+def snapshot_name(version):
+    return f'catalog-{version}.json'
+
+
+def build_catalog():
+    """
+    读取公开的导航数据：显示的标签树和显示的链接
+
+    上级标签隐藏时，其下的标签也不出现在树中。链接的 tags 只包含树中的标签。
+    """
+    tags = {}
+    # is_show__in 才会使用 (is_show, sort_order, id) 复合索引，见 Tags.Meta.indexes
+    for row in Tags.objects.filter(is_show__in=[True]).order_by('sort_order', 'id').values(*TAG_FIELDS):
+        row['parent'] = row.pop('parent_id')
+        row['children'] = []
+        tags[row['id']] = row
+
+    roots = []
+    for row in tags.values():
+        parent = tags.get(row['parent'])
+        if row['parent'] is None:
+            roots.append(row)
+        elif parent is not None:
+            parent['children'].append(row)
+
+    reachable = set()
+    stack = list(roots)
+    while stack:
+        row = stack.pop()
+        reachable.add(row['id'])
+        stack.extend(row['children'])
+
+    links = list(Links.objects.filter(is_show__in=[True]).order_by('sort_order', 'id').values(*LINK_FIELDS))
+    tag_ids = {row['id']: [] for row in links}
+    for batch in iter_batches(list(tag_ids), LOOKUP_BATCH_SIZE):
+        through = Links.tags.through.objects.filter(links_id__in=batch).order_by('links_id', 'tags_id')
+        for link_id, tag_id in through.values_list('links_id', 'tags_id'):
+            if tag_id in reachable:
+                tag_ids[link_id].append(tag_id)
+    for row in links:
+        row['tags'] = tag_ids[row['id']]
+
+    return {'tags': roots, 'links': links}
+
+
+def _write_atomic(path, data):
+    """先写入同目录下的临时文件再重命名，读取方不会看到写了一半的文件"""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def current_version(root=None):
+    """读取版本指针，没有发布过快照时返回 None"""
+    try:
+        pointer = (Path(root or snapshot_root()) / POINTER_NAME).read_bytes()
+    except FileNotFoundError:
+        return None
+    return json.loads(pointer).get('version')
+
+
+def publish(root=None, keep=None):
+    """
+    生成并发布快照
+
+    版本号是快照内容的哈希，内容未变化时不写入新文件。先写入原始、gzip 和 brotli（已安装时）
+    三个版本的文件，最后替换版本指针，再删除超出保留数量的旧版本。
+
+    返回:
+        (版本号, 是否写入了新版本)
+    """
+    root = Path(root or snapshot_root())
+    keep = keep or _setting('SNAPSHOT_KEEP', 5)
+    root.mkdir(parents=True, exist_ok=True)
+
+    body = FastJSONRenderer().render(build_catalog())
+    version = hashlib.blake2b(body, digest_size=8).hexdigest()
+    if current_version(root) == version:
+        return version, False
+
+    name = snapshot_name(version)
+    _write_atomic(root / name, body)
+    _write_atomic(root / f'{name}.gz', gzip.compress(body, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write_atomic(root / f'{name}.br', brotli.compress(body, quality=11))
+
+    pointer = {
+        'version': version,
+        'generated_at': timezone.now(),
+        'size': len(body),
+        'path': name,
+    }
+    _write_atomic(root / POINTER_NAME, FastJSONRenderer().render(pointer))
+    _prune(root, keep, version)
+    return version, True
+
+
+def _prune(root, keep, version):
+    """按修改时间保留最近的 keep 个版本，正在读取旧版本的客户端在保留期内仍可完成请求"""
+    originals = sorted(root.glob('catalog-*.json'), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in originals[keep:]:
+        if path.name == snapshot_name(version):
+            continue
+        for suffix in ('', *(extension for _, extension in ENCODINGS)):
+            Path(f'{path}{suffix}').unlink(missing_ok=True)
+
+
+class SnapshotPublisher:
+    """
+    写入后在后台重新发布快照
+
+    schedule 在事务提交后调用；第一次调用后等待 debounce 秒再发布，期间的写入合并为一次发布。
+    发布过程中又有写入时，发布完成后再等待一个周期重新发布。
+
+    参数:
+        debounce: 写入后等待的秒数
+    """
+
+    def __init__(self, debounce=2):
+        self.debounce = debounce
+        self._timer = None
+        self._running = False
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def schedule(self):
+        with self._lock:
+            self._dirty = True
+            if self._timer is not None or self._running:
+                return
+            self._start_timer()
+
+    def _start_timer(self):
+        self._timer = threading.Timer(self.debounce, self._run)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _run(self):
+        with self._lock:
+            self._timer = None
+            self._running = True
+            self._dirty = False
+        try:
+            publish()
+        except Exception:
+            logger.exception('发布导航快照失败')
+        finally:
+            connections.close_all()
+            with self._lock:
+                self._running = False
+                if self._dirty:
+                    self._start_timer()
+
+
+snapshot_publisher = SnapshotPublisher(debounce=_setting('SNAPSHOT_DEBOUNCE_SECONDS', 2))
+
+
+def catalog_changed(*args, **kwargs):
+    """信号处理：导航数据变化，事务提交后安排重新发布"""
+    if _setting('SNAPSHOT_AUTO_PUBLISH', True):
+        transaction.on_commit(snapshot_publisher.schedule)
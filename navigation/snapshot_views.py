@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified, JsonResponse
+from django.views.decorators.http import require_safe
+
+from navigation.snapshot import ENCODINGS, POINTER_NAME, snapshot_name, snapshot_root
+
+# 快照文件名带内容哈希，内容不会变化
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def accepted_encodings(header):
+    """解析 Accept-Encoding，返回 q 值大于 0 的编码"""
+    encodings = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def _not_found():
+    return JsonResponse({'detail': '快照尚未发布'}, status=404)
+
+
+@require_safe
+def snapshot_pointer(request):
+    """
+    返回当前快照的版本指针
+
+    只读取磁盘上的指针文件，不访问数据库；缓存时间较短，客户端据此请求带版本号的快照。
+    """
+    try:
+        pointer = open(snapshot_root() / POINTER_NAME, 'rb')
+    except FileNotFoundError:
+        return _not_found()
+    response = FileResponse(pointer, content_type='application/json')
+    response['Cache-Control'] = f'public, max-age={settings.SNAPSHOT_POINTER_MAX_AGE}'
+    return response
+
+
+@require_safe
+def snapshot_file(request, version):
+    """
+    返回指定版本的快照
+
+    按 Accept-Encoding 依次选择 brotli、gzip 或原始文件，直接发送预先压缩好的文件，
+    响应可被浏览器和 CDN 长期缓存。
+    """
+    name = snapshot_name(version)
+    accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    candidates = [(encoding, f'{name}{extension}') for encoding, extension in ENCODINGS if encoding in accepted]
+
+    for encoding, filename in [*candidates, (None, name)]:
+        try:
+            file = open(snapshot_root() / filename, 'rb')
+        except FileNotFoundError:
+            continue
+        etag = f'"{version}-{encoding or "identity"}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            file.close()
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(file, content_type='application/json')
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response['Vary'] = 'Accept-Encoding'
+        return response
+    return _not_found()
@@ -0,0 +1,257 @@
+from collections import Counter
+from itertools import chain
+
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from navigation import changes
+from navigation.models import Links, Tags
+from navigation.serializers import LOOKUP_BATCH_SIZE, WRITE_BATCH_SIZE
+from utils.streaming import iter_batches
+
+Through = Links.tags.through
+# tag_pre_save 未记录原父级标签时的占位值
+_UNSET = object()
+
+
+def load_parents(tag_ids=None):
+    """
+    返回 {标签ID: 父级标签ID}
+
+    提供 tag_ids 时只读取这些标签及其所有上级标签，每层一次查询；未提供时读取所有标签
+    """
+    if tag_ids is None:
+        return dict(Tags.objects.values_list('id', 'parent_id'))
+    parents = {}
+    pending = set(tag_ids) - {None}
+    while pending:
+        level = {}
+        for batch in iter_batches(list(pending), LOOKUP_BATCH_SIZE):
+            level.update(Tags.objects.filter(pk__in=batch).values_list('id', 'parent_id'))
+        parents.update(level)
+        pending = {parent_id for parent_id in level.values() if parent_id is not None} - parents.keys()
+    return parents
+
+
+def load_descendants(tag_id):
+    """从数据库读取标签及其所有下级标签的ID集合，每层一次查询"""
+    result = {tag_id}
+    pending = [tag_id]
+    while pending:
+        children = set()
+        for batch in iter_batches(pending, LOOKUP_BATCH_SIZE):
+            children.update(Tags.objects.filter(parent_id__in=batch).values_list('id', flat=True))
+        pending = list(children - result)
+        result.update(pending)
+    return result
+
+
+def ancestors(tag_ids, parents):
+    """标签及其所有上级标签的ID集合（父级关系出现环时在环上停止）"""
+    result = set()
+    for tag_id in tag_ids:
+        while tag_id is not None and tag_id not in result:
+            result.add(tag_id)
+            tag_id = parents.get(tag_id)
+    return result
+
+
+def descendants(tag_id, parents):
+    """标签及其所有下级标签的ID集合"""
+    children = {}
+    for child_id, parent_id in parents.items():
+        children.setdefault(parent_id, []).append(child_id)
+    result = set()
+    stack = [tag_id]
+    while stack:
+        current = stack.pop()
+        if current in result:
+            continue
+        result.add(current)
+        stack.extend(children.get(current, ()))
+    return result
+
+
+def load_link_tags(link_ids):
+    """返回 {链接ID: {标签ID, ...}}，没有标签的链接对应空集合"""
+    link_tags = {link_id: set() for link_id in link_ids}
+    for batch in iter_batches(list(link_tags), LOOKUP_BATCH_SIZE):
+        for link_id, tag_id in Through.objects.filter(links_id__in=batch).values_list('links_id', 'tags_id'):
+            link_tags[link_id].add(tag_id)
+    return link_tags
+
+
+def tagged_link_ids(tag_ids):
+    """带有这些标签中任意一个的链接ID"""
+    link_ids = set()
+    for batch in iter_batches(list(tag_ids), LOOKUP_BATCH_SIZE):
+        link_ids.update(Through.objects.filter(tags_id__in=batch).values_list('links_id', flat=True))
+    return link_ids
+
+
+def _add(field, delta):
+    # 计数已有偏差时（例如批量写入后尚未 repair）减到负数会违反 PositiveIntegerField 的约束，
+    # 使整个写入失败；在 0 处截断，偏差由 repair_tag_counts 修复
+    if delta < 0:
+        return Greatest(F(field) + delta, 0)
+    return F(field) + delta
+
+
+def apply_changes(before, after, parents_before=None, parents_after=None):
+    """
+    按链接标签（或标签层级）变化前后的状态增量更新计数
+
+    link_count 是直接带有该标签的链接数；subtree_link_count 是带有该标签或其任一下级标签的链接数，
+    同一个链接只计一次。对每个链接比较变化前后“标签及其上级标签”的集合，集合之差就是需要加减的标签，
+    所有链接的增量合并后按增量值分组，每组一条 UPDATE。
+
+    参数:
+        before / after: {链接ID: {标签ID, ...}}，缺少的链接视为没有标签
+        parents_before / parents_after: 变化前后的 {标签ID: 父级标签ID}，需要包含涉及的标签及其所有上级标签，
+            未提供时读取这些标签当前的层级
+    """
+    if parents_before is None:
+        if parents_after is None:
+            parents_after = load_parents(chain.from_iterable([*before.values(), *after.values()]))
+        parents_before = parents_after
+    if parents_after is None:
+        parents_after = parents_before
+
+    link_deltas = Counter()
+    subtree_deltas = Counter()
+    for link_id in before.keys() | after.keys():
+        old_tags = before.get(link_id, set())
+        new_tags = after.get(link_id, set())
+        link_deltas.update(new_tags - old_tags)
+        link_deltas.subtract(old_tags - new_tags)
+        old_closure = ancestors(old_tags, parents_before)
+        new_closure = ancestors(new_tags, parents_after)
+        subtree_deltas.update(new_closure - old_closure)
+        subtree_deltas.subtract(old_closure - new_closure)
+
+    groups = {}
+    for tag_id in link_deltas.keys() | subtree_deltas.keys():
+        key = (link_deltas[tag_id], subtree_deltas[tag_id])
+        if key != (0, 0):
+            groups.setdefault(key, []).append(tag_id)
+    for (link_delta, subtree_delta), tag_ids in groups.items():
+        for batch in iter_batches(tag_ids, LOOKUP_BATCH_SIZE):
+            Tags.objects.filter(pk__in=batch).update(
+                link_count=_add('link_count', link_delta),
+                subtree_link_count=_add('subtree_link_count', subtree_delta),
+            )
+    # 计数是标签数据的一部分，记入增量同步的变更日志
+    changes.record(changes.TAG, [tag_id for tag_ids in groups.values() for tag_id in tag_ids])
+
+
+def compute_counts():
+    """
+    从关联表重新计算所有标签的计数
+
+    返回:
+        {标签ID: (link_count, subtree_link_count)}
+    """
+    parents = load_parents()
+    link_counts = Counter()
+    subtree_counts = Counter()
+    link_tags = {}
+    for link_id, tag_id in Through.objects.order_by('links_id').values_list('links_id', 'tags_id').iterator():
+        link_tags.setdefault(link_id, set()).add(tag_id)
+    for tags in link_tags.values():
+        link_counts.update(tags)
+        subtree_counts.update(ancestors(tags, parents))
+    return {tag_id: (link_counts[tag_id], subtree_counts[tag_id]) for tag_id in parents}
+
+
+def find_drift():
+    """
+    找出计数与关联表不一致的标签
+
+    返回:
+        [(标签, 正确的 link_count, 正确的 subtree_link_count)]，标签对象仍为数据库中的计数
+    """
+    expected = compute_counts()
+    drifted = []
+    for tag in Tags.objects.only('id', 'name', 'link_count', 'subtree_link_count').order_by('id'):
+        link_count, subtree_link_count = expected.get(tag.id, (0, 0))
+        if (tag.link_count, tag.subtree_link_count) != (link_count, subtree_link_count):
+            drifted.append((tag, link_count, subtree_link_count))
+    return drifted
+
+
+def repair(drifted=None):
+    """
+    将偏差的计数改为正确值，并为这些标签记录变更
+
+    批量写入关联（bulk_create、导入）不发送信号，写入后整体重新计算一次比逐条增量更新更快。
+
+    返回:
+        修复的标签数
+    """
+    if drifted is None:
+        drifted = find_drift()
+    tags = []
+    for tag, link_count, subtree_link_count in drifted:
+        tag.link_count = link_count
+        tag.subtree_link_count = subtree_link_count
+        tags.append(tag)
+    Tags.objects.bulk_update(tags, ['link_count', 'subtree_link_count'], batch_size=WRITE_BATCH_SIZE)
+    changes.record(changes.TAG, [tag.pk for tag in tags])
+    return len(tags)
+
+
+# 信号处理：变化前记录受影响链接的标签，变化后再读取一次并比较
+
+def _affected_links(instance, reverse, pk_set):
+    if not reverse:
+        return {instance.pk}
+    if pk_set is not None:
+        return set(pk_set)
+    # 从标签一侧清空时，受影响的是该标签当前的所有链接
+    return tagged_link_ids([instance.pk])
+
+
+def link_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('pre_add', 'pre_remove', 'pre_clear'):
+        instance._tag_counts_before = load_link_tags(_affected_links(instance, reverse, pk_set))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        before = instance.__dict__.pop('_tag_counts_before', None)
+        if before:
+            apply_changes(before, load_link_tags(before))
+
+
+def link_deleted(sender, instance, **kwargs):
+    # 在删除事务内、关联行被级联删除之前执行
+    before = load_link_tags([instance.pk])
+    apply_changes(before, {})
+
+
+def tag_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None or (update_fields is not None and 'parent' not in update_fields):
+        return
+    instance._tag_counts_old_parent = (
+        Tags.objects.filter(pk=instance.pk).values_list('parent_id', flat=True).first()
+    )
+
+
+def tag_post_save(sender, instance, created, raw=False, **kwargs):
+    old_parent = instance.__dict__.pop('_tag_counts_old_parent', _UNSET)
+    if raw or created or old_parent is _UNSET or old_parent == instance.parent_id:
+        return
+    link_tags = load_link_tags(tagged_link_ids(load_descendants(instance.pk)))
+    # 链接的其他标签与移动的标签可能有共同的上级标签，层级需要包含所有标签的上级
+    parents = load_parents([instance.pk, old_parent, *chain.from_iterable(link_tags.values())])
+    parents_before = {**parents, instance.pk: old_parent}
+    apply_changes(link_tags, link_tags, parents_before, parents)
+
+
+def tag_deleted(sender, instance, **kwargs):
+    # 删除后该标签的关联被级联删除，子标签的 parent 被置空（均不发送信号），在删除前一并计入
+    before = load_link_tags(tagged_link_ids(load_descendants(instance.pk)))
+    parents = load_parents([instance.pk, *chain.from_iterable(before.values())])
+    after = {link_id: tags - {instance.pk} for link_id, tags in before.items()}
+    parents_after = {
+        tag_id: None if parent_id == instance.pk else parent_id
+        for tag_id, parent_id in parents.items() if tag_id != instance.pk
+    }
+    apply_changes(before, after, parents, parents_after)
@@ -1,3 +1,962 @@
-from django.test import TestCase
+import asyncio
+import decimal
+import gzip
+import io
+import json
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from navigation import changes, snapshot, tag_counts
+from navigation.analytics import DAY, HOUR, bucket_start, click_aggregator, upsert_rollups
+from navigation.async_views import AsyncLinksReadView, AsyncTagsReadView
+from navigation.bookmarks import BookmarkImporter, import_bookmarks, iter_html_bookmarks
+from navigation.duplicates import find_duplicates
+from navigation.linkcheck import STATUS_UNREACHABLE, LinkChecker, links_due, save_results
+from navigation.models import LinkClickRollup, Links, NavigationChange, NavigationChangeHorizon, Tags
+from navigation.popularity import (
+    PERIOD_HALF_LIVES, PopularityRanking, click_weight, popularity_epoch, popularity_period, popularity_ranking,
+    rebase_popularity,
+)
+from navigation.serializers import LinksProjection, LinksSerializer
+from rbac.models import User
+from utils.fastjson import FastJSONRenderer, _may_be_incompatible
+from utils.jsonstream import iter_json_events
+from utils.query_plans import find_plan_issues
+from utils.urlnorm import normalize_url
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """链接检查测试用的 HTTP 服务，路径决定响应"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _handle(self):
+        server = self.server
+        server.requests.append((self.command, self.path))
+        server.connections.add(self.client_address)
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if self.path == '/ok':
+                self._respond(200)
+            elif self.path == '/no-head':
+                self._respond(405 if self.command == 'HEAD' else 200)
+            elif self.path == '/redirect':
+                self._respond(301, {'Location': '/ok'})
+            elif self.path == '/loop':
+                self._respond(302, {'Location': '/loop'})
+            elif self.path.startswith('/slow'):
+                time.sleep(server.slow_seconds)
+                self._respond(200)
+            elif self.path == '/hang':
+                time.sleep(2)
+                self._respond(200)
+            else:
+                self._respond(404)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    do_HEAD = _handle
+    do_GET = _handle
+
+
+class LinkCheckerTests(SimpleTestCase):
+    """LinkChecker 对本地 HTTP 服务的检查结果"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.connections = set()
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.slow_seconds = 0.2
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def check_all(self, paths, **options):
+        """检查一组路径，返回 {路径: 状态码}"""
+        items = [(index, self.base + path) for index, path in enumerate(paths)]
+        results = {}
+
+        async def on_batch(batch):
+            for link_id, status, _ in batch:
+                results[paths[link_id]] = status
+
+        asyncio.run(LinkChecker(**options).run(items, on_batch, batch_size=2))
+        return results
+
+    def test_head_ok(self):
+        self.assertEqual(self.check_all(['/ok']), {'/ok': 200})
+        self.assertEqual(self.server.requests, [('HEAD', '/ok')])
+
+    def test_head_falls_back_to_get(self):
+        self.assertEqual(self.check_all(['/no-head']), {'/no-head': 200})
+        self.assertEqual(self.server.requests, [('HEAD', '/no-head'), ('GET', '/no-head')])
+
+    def test_not_found(self):
+        self.assertEqual(self.check_all(['/missing']), {'/missing': 404})
+
+    def test_follows_redirects(self):
+        self.assertEqual(self.check_all(['/redirect']), {'/redirect': 200})
+        self.assertEqual(self.server.requests, [('HEAD', '/redirect'), ('HEAD', '/ok')])
+
+    def test_redirect_limit(self):
+        self.assertEqual(self.check_all(['/loop'], max_redirects=2), {'/loop': 302})
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_timeout(self):
+        started = time.monotonic()
+        self.assertEqual(self.check_all(['/hang'], timeout=0.3), {'/hang': STATUS_UNREACHABLE})
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_unreachable(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.assertEqual(self.check_all(['/ok']), {'/ok': STATUS_UNREACHABLE})
+
+    def test_per_host_limit(self):
+        paths = [f'/slow/{index}' for index in range(6)]
+        results = self.check_all(paths, concurrency=6, per_host=2)
+        self.assertEqual(results, dict.fromkeys(paths, 200))
+        self.assertEqual(self.server.max_in_flight, 2)
+
+    def test_waiting_for_host_slot_does_not_count_towards_timeout(self):
+        # 每个请求 0.2 秒、每主机 1 个连接：排在最后的链接要等待 1 秒，但自身的请求没有超时
+        paths = [f'/slow/{index}' for index in range(6)]
+        results = self.check_all(paths, concurrency=6, per_host=1, timeout=0.5)
+        self.assertEqual(results, dict.fromkeys(paths, 200))
+        self.assertEqual(self.server.max_in_flight, 1)
+
+    def test_reuses_connections(self):
+        self.check_all(['/ok'] * 5, concurrency=1)
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(len(self.server.connections), 1)
+
+
+class LinkCheckResultsTests(TestCase):
+    """检查结果的写入和待检查链接的选取"""
+
+    def test_save_results_and_links_due(self):
+        now = timezone.now()
+        checked = Links.objects.create(title='checked', url='https://checked.example.com')
+        stale = Links.objects.create(title='stale', url='https://stale.example.com')
+        fresh = Links.objects.create(title='fresh', url='https://fresh.example.com')
+        updated_at = Links.objects.get(pk=checked.pk).updated_at
+
+        save_results([
+            (checked.pk, 200, now),
+            (stale.pk, STATUS_UNREACHABLE, now - timedelta(hours=48)),
+        ])
+        checked.refresh_from_db()
+        self.assertEqual((checked.status, checked.last_checked), (200, now))
+        self.assertEqual(checked.updated_at, updated_at)
+
+        due = list(links_due(interval_hours=24, now=now).values_list('id', flat=True))
+        self.assertCountEqual(due, [fresh.pk, stale.pk])
+
+
+class ChangesSinceTests(TestCase):
+    """增量同步的游标"""
+
+    def test_incremental_pages(self):
+        link = Links.objects.create(title='a', url='https://a.example.com')
+        reset = changes.changes_since(None, 10)
+        self.assertTrue(reset['reset'])
+        cursor = reset['cursor']
+
+        tag = Tags.objects.create(name='T', slug='t')
+        link.tags.add(tag)
+        link.title = 'b'
+        link.save()
+        page = changes.changes_since(cursor, 10)
+        self.assertFalse(page['reset'])
+        self.assertEqual([obj.pk for obj in page['links']], [link.pk])
+        self.assertEqual([obj.pk for obj in page['tags']], [tag.pk])
+
+        link_id = link.pk
+        link.delete()
+        page = changes.changes_since(page['cursor'], 10)
+        self.assertEqual(page['deleted']['links'], [link_id])
+        self.assertEqual(changes.changes_since(page['cursor'], 10)['links'], [])
+
+    def test_has_more(self):
+        for index in range(3):
+            Links.objects.create(title=f'l{index}', url=f'https://l{index}.example.com')
+        page = changes.changes_since(0, 2)
+        self.assertTrue(page['has_more'])
+        self.assertEqual(len(page['links']), 2)
+        page = changes.changes_since(page['cursor'], 2)
+        self.assertFalse(page['has_more'])
+        self.assertEqual(len(page['links']), 1)
+
+    def test_reset_cursor_after_log_fully_pruned(self):
+        Links.objects.create(title='a', url='https://a.example.com')
+        NavigationChange.objects.update(changed_at=timezone.now() - timedelta(days=60))
+        changes.compact(retention_days=30)
+        self.assertFalse(NavigationChange.objects.exists())
+        horizon = NavigationChangeHorizon.objects.get().pruned_through
+        self.assertGreater(horizon, 0)
+
+        for since in (None, 0):
+            result = changes.changes_since(since, 10)
+            self.assertTrue(result['reset'])
+            self.assertEqual(result['cursor'], horizon)
+        # 从返回的游标继续时不再要求全量同步
+        self.assertFalse(changes.changes_since(horizon, 10)['reset'])
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """FastJSONRenderer 的输出与 JSONRenderer 逐字节一致"""
+
+    def assertSameOutput(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data), data)
+
+    def test_common_values(self):
+        now = timezone.now()
+        self.assertSameOutput({
+            'id': 1,
+            'title': '链接\u2028标题',
+            'created_at': now,
+            'day': now.date(),
+            'score': decimal.Decimal('12.5'),
+            'ratio': 0.1,
+            'tags': [{'id': 2, 'name': None}],
+        })
+
+    def test_floats_with_exponent(self):
+        for value in (1e16, -1e16, 1.2345678901234568e17, 1e22, 1e-5, 1e-7, -2.5e-5, 5e-324, 1.5e300):
+            self.assertSameOutput({'value': value})
+            self.assertSameOutput([value])
+            self.assertSameOutput(value)
+        for value in (1e15, 0.0001, 0.001, -0.0, 10.00001):
+            self.assertSameOutput({'value': value})
+
+    def test_large_decimals(self):
+        for value in ('1E+20', '123456789012345678901234567890', '0.00000123', '-1E-7'):
+            self.assertSameOutput({'value': decimal.Decimal(value)})
+
+    def test_non_finite_values_raise_like_json_renderer(self):
+        for value in (float('nan'), float('inf'), -float('inf'), decimal.Decimal('NaN'), decimal.Decimal('Infinity')):
+            for data in ({'value': value}, [1, [value]], {'a': None, 'b': (value,)}):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render(data)
+                with self.assertRaises(ValueError):
+                    FastJSONRenderer().render(data)
+
+    def test_output_check_skips_common_payloads(self):
+        # 没有空值和可疑数字的负载只检查 orjson 的输出，不在 Python 中遍历数据
+        common = {'id': 1, 'title': '链接', 'created_at': timezone.now(), 'score': decimal.Decimal('12.5'), 'ratio': 0.1}
+        self.assertFalse(_may_be_incompatible(FastJSONRenderer().render(common)))
+        # orjson 对 None、NaN、1e16、1e-5、1e-7 的写法
+        for ret in (b'[null]', b'[1e16]', b'[0.00001]', b'[1e-7]'):
+            self.assertTrue(_may_be_incompatible(ret), ret)
+
+    def test_strings_resembling_exponents(self):
+        self.assertSameOutput({'text': ',1e5', 'uuid': '3e4f0000-0000-0000-0000-000000000000'})
+
+
+class JSONStreamTests(SimpleTestCase):
+    """流式 JSON 解析的事件和语法检查"""
+
+    def events(self, text, read_size=3):
+        return list(iter_json_events(io.BytesIO(text.encode()), read_size))
+
+    def test_events(self):
+        self.assertEqual(self.events('{"a": [1, 2.5, "x"], "b": {"c": null, "d": true}}', read_size=1), [
+            ('start_map', None), ('map_key', 'a'), ('start_array', None), ('number', 1), ('number', 2.5),
+            ('string', 'x'), ('end_array', None), ('map_key', 'b'), ('start_map', None), ('map_key', 'c'),
+            ('null', None), ('map_key', 'd'), ('boolean', True), ('end_map', None), ('end_map', None),
+        ])
+        self.assertEqual(self.events('[[], {}]'), [
+            ('start_array', None), ('start_array', None), ('end_array', None),
+            ('start_map', None), ('end_map', None), ('end_array', None),
+        ])
+
+    def test_rejects_missing_or_stray_separators(self):
+        for text in ('[1 2]', '{"a" "b"}', '{"a": 1 "b": 2}', '[1,]', '[,1]', '[1,,2]', '{"a": 1,}', '{,}',
+                     '[1: 2]', '{"a", 1}', '{1: 2}', '{"a":}', '[1]]', '[1] 2', '[1', ''):
+            for read_size in (1, 64):
+                with self.subTest(text=text, read_size=read_size), self.assertRaises(ValueError):
+                    self.events(text, read_size)
+
+
+BOOKMARKS_HTML = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<DL><p>
+    <DT><H3>Dev</H3>
+    <DL><p>
+        <DT><A HREF="https://docs.python.org/">Python</A>
+        <DT><H3>Web</H3>
+        <DL><p>
+            <DT><A HREF="https://www.djangoproject.com/">Django</A>
+        </DL><p>
+    </DL><p>
+    <DT><A HREF="https://example.com/">Example</A>
+    <DT><A HREF="not a url">Broken</A>
+</DL><p>
+"""
+
+
+class BookmarkImportTests(TestCase):
+    """书签导入"""
+
+    def test_import_html(self):
+        result = import_bookmarks(io.BytesIO(BOOKMARKS_HTML.encode()), 'html', batch_size=2)
+        self.assertEqual((result.created, result.existing, result.tags_created), (3, 0, 2))
+        self.assertEqual([number for number, _ in result.errors], [4])
+
+        dev = Tags.objects.get(name='Dev')
+        web = Tags.objects.get(name='Web')
+        self.assertEqual(web.parent_id, dev.pk)
+        self.assertEqual((dev.link_count, dev.subtree_link_count), (1, 2))
+        self.assertEqual(set(Links.objects.get(title='Django').tags.all()), {web})
+        self.assertEqual(tag_counts.find_drift(), [])
+
+        # 计数按导入触及的标签增量更新，不重新计算其他标签
+        other = Tags.objects.create(name='other', slug='other')
+        Tags.objects.filter(pk=other.pk).update(link_count=5)
+        link = Links.objects.get(title='Python')
+        link.tags.add(other)
+        import_bookmarks(io.BytesIO(BOOKMARKS_HTML.encode()), 'html')
+        self.assertEqual([(tag.pk, link_count) for tag, link_count, _ in tag_counts.find_drift()], [(other.pk, 1)])
+        Tags.objects.filter(pk=other.pk).update(link_count=1)
+
+        # 再次导入时地址已存在的链接只补充标签
+        result = import_bookmarks(io.BytesIO(BOOKMARKS_HTML.encode()), 'html')
+        self.assertEqual((result.created, result.existing, result.tags_created), (0, 3, 0))
+        self.assertEqual(Links.objects.count(), 3)
+
+    def test_syntax_error_writes_nothing(self):
+        text = '{"roots": {"bookmark_bar": {"children": [{"type": "url", "name": "A", "url": "https://a.example.com"}'
+        with self.assertRaises(ValueError):
+            import_bookmarks(io.BytesIO((text + ' "oops"]}}}').encode()), 'json', batch_size=1)
+        self.assertFalse(Links.objects.exists())
+
+    def test_counts_repaired_when_import_fails_midway(self):
+        tag = Tags.objects.create(name='Dev', slug='dev')
+
+        def events():
+            # 第一个文件夹完整导入，第二个文件夹中途出错
+            yield from iter_html_bookmarks(io.BytesIO(BOOKMARKS_HTML.encode()))
+            yield 'folder_start', 100, None
+            yield 'bookmark', 100, 10, {'url': 'https://late.example.com', 'title': 'Late', 'description': None,
+                                         'icon': None}
+            raise ValueError('文件被截断')
+
+        with self.assertRaises(ValueError):
+            BookmarkImporter(batch_size=1).run(events())
+        self.assertTrue(Links.objects.filter(title='Late').exists())
+        tag.refresh_from_db()
+        self.assertEqual((tag.link_count, tag.subtree_link_count), (1, 2))
+        self.assertEqual(tag_counts.find_drift(), [])
+
+
+# 点击汇总不在后台线程写入：后台线程使用自己的数据库连接，无法写入测试事务中的数据
+@override_settings(CLICK_FLUSH_SECONDS=3600)
+class LinkClickTests(TestCase):
+    """点击记录接口"""
+
+    def setUp(self):
+        # 点击汇总在进程内缓冲，测试数据库销毁前写入
+        click_aggregator.flush()
+        self.addCleanup(click_aggregator.flush)
+
+    def test_click(self):
+        link = Links.objects.create(title='a', url='https://a.example.com')
+        response = self.client.post(f'/api/v1/links/{link.pk}/click')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'id': link.pk, 'click_count': 1})
+        self.assertEqual(self.client.post(f'/api/v1/links/{link.pk + 1}/click').status_code, 404)
+
+        self.assertEqual(click_aggregator.pending(), 2)
+        self.assertEqual(click_aggregator.flush(), 2)
+        self.assertEqual(
+            sorted(LinkClickRollup.objects.filter(link=link).values_list('granularity', 'count')),
+            [(DAY, 1), (HOUR, 1)],
+        )
+
+    def test_settings_read_lazily(self):
+        self.assertEqual(click_aggregator.flush_interval, 3600)
+        with self.settings(CLICK_FLUSH_MAX_KEYS=1):
+            self.assertEqual(click_aggregator.max_keys, 1)
+
+    def test_non_numeric_pk_is_not_found(self):
+        self.assertEqual(self.client.post('/api/v1/links/abc/click').status_code, 404)
+
+
+class ClickRollupTests(TestCase):
+    """点击的分时段汇总"""
+
+    def setUp(self):
+        self.link = Links.objects.create(title='a', url='https://a.example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_upsert_accumulates(self):
+        now = timezone.now()
+        key = (self.link.pk, DAY, bucket_start(now, DAY))
+        upsert_rollups({key: 2})
+        upsert_rollups({key: 3, (self.link.pk, HOUR, bucket_start(now, HOUR)): 1})
+        self.assertEqual(LinkClickRollup.objects.get(granularity=DAY).count, 5)
+        self.assertEqual(LinkClickRollup.objects.get(granularity=HOUR).count, 1)
+
+    def test_click_series(self):
+        upsert_rollups({(self.link.pk, HOUR, bucket_start(timezone.now(), HOUR)): 4})
+        response = self.client.get(f'/api/v1/links/{self.link.pk}/clicks', {'granularity': HOUR, 'days': 1})
+        self.assertEqual(response.status_code, 200)
+        series = response.json()
+        self.assertEqual(series[-1]['clicks'], 4)
+        self.assertEqual(sum(item['clicks'] for item in series), 4)
+
+    def test_click_series_errors(self):
+        self.assertEqual(self.client.get(f'/api/v1/links/{self.link.pk + 1}/clicks').status_code, 404)
+        self.assertEqual(self.client.get('/api/v1/links/abc/clicks').status_code, 404)
+        response = self.client.get(f'/api/v1/links/{self.link.pk}/clicks', {'granularity': 'week'})
+        self.assertEqual(response.status_code, 400)
+
+
+class IndexedFilterTests(TestCase):
+    """列表接口只允许有索引支持的过滤和排序"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        for index, (is_show, is_recommend) in enumerate([(True, True), (False, True), (True, False), (True, True)]):
+            Links.objects.create(
+                title=f'link{index}', url=f'https://{index}.example.com', sort_order=3 - index,
+                is_show=is_show, is_recommend=is_recommend,
+            )
+
+    def titles(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        return [item['title'] for item in body.get('results', body)]
+
+    def test_default_ordering(self):
+        expected = ['link3', 'link2', 'link0']
+        self.assertEqual(self.titles('/api/v1/links', is_show='true'), expected)
+        self.assertEqual(self.titles('/api/v1/links', ordering='-sort_order', is_show='true'), expected[::-1])
+
+    def test_is_recommend_implies_is_show(self):
+        self.assertEqual(self.titles('/api/v1/links', is_recommend='true'), ['link3', 'link0'])
+        self.assertEqual(self.titles('/api/v1/links', is_recommend='true', is_show='false'), ['link1'])
+
+    def test_unsupported_combination(self):
+        response = self.client.get('/api/v1/links', {'is_recommend': 'true', 'ordering': 'click_count'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('is_recommend+is_show: sort_order', response.json()['detail'])
+
+    def test_tags_filter_keeps_index_ordering(self):
+        tag = Tags.objects.create(name='tag', slug='tag')
+        for link in Links.objects.exclude(title='link3'):
+            link.tags.add(tag)
+        self.assertEqual(self.titles('/api/v1/links', tags=tag.pk, ordering='-sort_order'), ['link0', 'link1', 'link2'])
+        self.assertEqual(self.titles('/api/v1/links', tags=tag.pk, is_recommend='true'), ['link0'])
+
+    def assert_filtered_by_index(self, run):
+        """
+        run 执行的每个按 is_show 过滤的查询都通过复合索引定位（SEARCH ... (is_show=?)）
+
+        直接写 is_show=True 会编译为 WHERE "is_show"，SQLite 改为顺序读取不过滤的排序索引，
+        执行计划中既没有全表扫描也没有临时B树，只能通过是否按 is_show 定位发现。
+        """
+        with CaptureQueriesContext(connection) as context:
+            run()
+        queries = [query['sql'] for query in context.captured_queries if '"is_show"' in query['sql']]
+        self.assertTrue(queries)
+        with connection.cursor() as cursor:
+            for sql in queries:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = '\n'.join(str(row[-1]) for row in cursor.fetchall())
+                self.assertEqual(find_plan_issues(plan, connection.vendor), [], sql)
+                self.assertRegex(plan, r'SEARCH (links|tags) USING (COVERING )?INDEX \w+ \(is_show=', sql)
+
+    def test_visible_lists_use_filter_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('执行计划的格式只适用于 SQLite')
+        tag = Tags.objects.create(name='tag', slug='tag')
+        Links.objects.get(title='link0').tags.add(tag)
+        for path, params in [
+            ('/api/v1/links', {'is_show': 'true'}),
+            ('/api/v1/links', {'is_show': 'false', 'ordering': '-created_at'}),
+            ('/api/v1/links', {'is_recommend': 'true', 'tags': tag.pk}),
+            ('/api/v1/tags', {'is_show': 'true'}),
+        ]:
+            self.assert_filtered_by_index(lambda: self.assertEqual(self.client.get(path, params).status_code, 200))
+        request = AsyncRequestFactory().get('/api/v1/links', {'is_show': 'true'})
+        self.assert_filtered_by_index(lambda: async_to_sync(AsyncLinksReadView.as_view())(request))
+        self.assert_filtered_by_index(snapshot.build_catalog)
+
+        # 检查本身能发现直接写 is_show=True 的查询
+        with self.assertRaises(AssertionError):
+            self.assert_filtered_by_index(lambda: list(Links.objects.filter(is_show=True).order_by('sort_order', 'id')))
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get('/api/v1/links', {'ordering': 'title'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/links', {'is_show': 'maybe'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/links', {'tags': 'abc'}).status_code, 400)
+
+
+class TagCountsTests(TestCase):
+    """标签链接数的增量维护"""
+
+    def setUp(self):
+        self.root = Tags.objects.create(name='root', slug='root')
+        self.child = Tags.objects.create(name='child', slug='child', parent=self.root)
+        self.leaf = Tags.objects.create(name='leaf', slug='leaf', parent=self.child)
+        self.other = Tags.objects.create(name='other', slug='other')
+        self.link = Links.objects.create(title='a', url='https://a.example.com')
+
+    def counts(self, tag):
+        tag.refresh_from_db()
+        return tag.link_count, tag.subtree_link_count
+
+    def test_incremental_counts(self):
+        self.link.tags.add(self.leaf, self.child)
+        self.assertEqual(self.counts(self.root), (0, 1))
+        self.assertEqual(self.counts(self.child), (1, 1))
+        self.link.tags.remove(self.child)
+        self.assertEqual(self.counts(self.child), (0, 1))
+        self.leaf.parent = self.other
+        self.leaf.save()
+        self.assertEqual(self.counts(self.root), (0, 0))
+        self.assertEqual(self.counts(self.other), (0, 1))
+        self.other.delete()
+        self.assertEqual(self.counts(self.leaf), (1, 1))
+        self.assertEqual(tag_counts.find_drift(), [])
+
+    def test_decrement_is_clamped_at_zero(self):
+        self.link.tags.add(self.leaf)
+        Tags.objects.update(link_count=0, subtree_link_count=0)
+        self.link.tags.remove(self.leaf)
+        self.assertEqual(self.counts(self.leaf), (0, 0))
+        self.assertEqual(self.counts(self.root), (0, 0))
+
+    def test_load_parents_reads_only_ancestors(self):
+        with self.assertNumQueries(3):
+            parents = tag_counts.load_parents([self.leaf.pk])
+        self.assertEqual(parents, {self.leaf.pk: self.child.pk, self.child.pk: self.root.pk, self.root.pk: None})
+        self.assertEqual(tag_counts.load_descendants(self.root.pk), {self.root.pk, self.child.pk, self.leaf.pk})
+
+    def test_copy_with_pk_none(self):
+        self.link.tags.add(self.leaf)
+        self.leaf.refresh_from_db()
+        self.leaf.pk = None
+        self.leaf.name = self.leaf.slug = 'copy'
+        self.leaf.save()
+        self.assertEqual(self.counts(self.leaf), (0, 0))
+        self.assertEqual(Tags.objects.filter(parent=self.child).count(), 2)
+
+
+class LinksProjectionTests(TestCase):
+    """链接列表的投影序列化与 LinksSerializer 输出逐字节一致"""
+
+    def setUp(self):
+        tags = [Tags.objects.create(name=f'tag{index}', slug=f'tag{index}') for index in range(3)]
+        for index in range(5):
+            link = Links.objects.create(
+                title=f'link{index}', url=f'https://{index}.example.com', click_count=index,
+                description=None if index % 2 else f'第 {index} 个', sort_order=index if index % 3 else None,
+            )
+            link.tags.set(tags[index % 3:])
+
+    def assert_matches(self, **fieldset):
+        queryset = Links.objects.order_by('id')
+        serializer = LinksSerializer(**fieldset)
+        projection = LinksProjection.for_serializer(serializer)
+        self.assertIsNotNone(projection)
+        renderer = JSONRenderer()
+        expected = renderer.render(LinksSerializer(list(serializer.project_queryset(queryset)), many=True, **fieldset).data)
+        self.assertEqual(renderer.render(projection.to_representation(projection.project(queryset))), expected)
+
+    def test_all_fields(self):
+        self.assert_matches()
+
+    def test_sparse_fieldsets(self):
+        self.assert_matches(fields=['id', 'tags'])
+        self.assert_matches(fields=['id', 'title', 'url', 'icon'])
+
+    def test_list_endpoint(self):
+        response = self.client.get('/api/v1/links', {'ordering': 'created_at'})
+        self.assertEqual(response.status_code, 200)
+        expected = LinksSerializer(Links.objects.order_by('created_at', 'id')[:10], many=True).data
+        self.assertEqual(response.json()['results'], json.loads(JSONRenderer().render(expected)))
+
+
+class LinkExportTests(TestCase):
+    """链接的流式导出"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        tags = [Tags.objects.create(name=f'tag{index}', slug=f'tag{index}') for index in range(2)]
+        Links.objects.create(title='a', url='https://a.example.com', description='逗号, "引号"').tags.set(tags)
+        Links.objects.create(title='b', url='https://b.example.com')
+
+    def test_ndjson(self):
+        response = self.client.get('/api/v1/links/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(row['title'], len(row['tags'])) for row in rows], [('a', 2), ('b', 0)])
+        self.assertEqual(rows[0]['description'], '逗号, "引号"')
+
+    def test_csv(self):
+        response = self.client.get('/api/v1/links/export', {'fmt': 'csv'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="links.csv"')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('id,title,url,description'))
+        self.assertIn('"逗号, ""引号"""', lines[1])
+        self.assertEqual(len(lines), 3)
+
+    def test_unsupported_format(self):
+        self.assertEqual(self.client.get('/api/v1/links/export', {'fmt': 'xml'}).status_code, 400)
+
+
+class LinkBulkTests(TestCase):
+    """批量创建和更新链接"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.tags = [Tags.objects.create(name=f'tag{index}', slug=f'tag{index}') for index in range(2)]
+        self.link = Links.objects.create(title='old', url='https://old.example.com')
+        self.link.tags.add(self.tags[0])
+
+    def post(self, items):
+        return self.client.post('/api/v1/links/bulk', items, format='json')
+
+    def test_create_and_update(self):
+        response = self.post([
+            {'title': 'new', 'url': 'https://new.example.com', 'tags': [self.tags[0].pk, self.tags[1].pk]},
+            {'id': self.link.pk, 'title': 'renamed', 'url': 'https://old.example.com', 'tags': [self.tags[1].pk]},
+        ])
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body['updated'], [self.link.pk])
+        created = Links.objects.get(pk=body['created'][0])
+        self.assertEqual(set(created.tags.values_list('pk', flat=True)), {tag.pk for tag in self.tags})
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.title, 'renamed')
+        self.assertEqual(list(self.link.tags.values_list('pk', flat=True)), [self.tags[1].pk])
+        self.assertEqual(tag_counts.find_drift(), [])
+        self.assertEqual(
+            set(NavigationChange.objects.filter(kind=changes.LINK).values_list('object_id', flat=True)),
+            {self.link.pk, created.pk},
+        )
+
+    def test_validation_errors_write_nothing(self):
+        response = self.post([
+            {'title': 'a', 'url': 'https://a.example.com', 'tags': [0]},
+            {'title': 'a', 'url': 'https://A.example.com/'},
+            {'title': 'old', 'url': 'https://b.example.com'},
+            {'id': 0, 'title': 'c', 'url': 'https://c.example.com'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(
+            {index: sorted(error) for index, error in errors.items()},
+            {'0': ['tags'], '1': ['title', 'url'], '2': ['title'], '3': ['id']},
+        )
+        self.assertEqual(Links.objects.count(), 1)
+
+
+class AsyncReadViewTests(TestCase):
+    """异步只读视图与视图集的 list/retrieve 输出一致"""
+
+    def setUp(self):
+        tags = [Tags.objects.create(name=f'tag{index}', slug=f'tag{index}', sort_order=index) for index in range(2)]
+        for index in range(12):
+            Links.objects.create(title=f'link{index}', url=f'https://{index}.example.com', sort_order=index).tags.set(tags)
+
+    def get_async(self, view, path, params=None):
+        response = async_to_sync(view.as_view())(AsyncRequestFactory().get(path, params or {}))
+        return response.status_code, json.loads(response.content)
+
+    def test_list_matches_viewset(self):
+        for params in ({}, {'page': 2, 'is_show': 'true'}, {'fields': 'id,title'}):
+            status, data = self.get_async(AsyncLinksReadView, '/api/v1/links', params)
+            self.assertEqual(status, 200)
+            self.assertEqual(data, self.client.get('/api/v1/links', params).json())
+        status, data = self.get_async(AsyncTagsReadView, '/api/v1/tags')
+        self.assertEqual(data, self.client.get('/api/v1/tags').json())
+
+    def test_retrieve_and_errors(self):
+        link = Links.objects.get(title='link3')
+        request = AsyncRequestFactory().get(f'/api/v1/links/{link.pk}')
+        response = async_to_sync(AsyncLinksReadView.as_view(detail=True))(request, pk=link.pk)
+        self.assertEqual(json.loads(response.content), self.client.get(f'/api/v1/links/{link.pk}').json())
+        self.assertEqual(self.get_async(AsyncLinksReadView, '/api/v1/links', {'page': 3})[0], 404)
+        self.assertEqual(self.get_async(AsyncLinksReadView, '/api/v1/links', {'ordering': 'title'})[0], 400)
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields= 和 ?expand= 稀疏字段集"""
+
+    def setUp(self):
+        self.tag = Tags.objects.create(name='tag', slug='tag')
+        self.link = Links.objects.create(title='a', url='https://a.example.com')
+        self.link.tags.add(self.tag)
+
+    def test_default_output_expands_tags(self):
+        item = self.client.get('/api/v1/links').json()['results'][0]
+        self.assertEqual(item['tags'], [{'id': self.tag.pk, 'name': 'tag'}])
+        self.assertNotIn('popularity', item)
+
+    def test_fields_and_expand(self):
+        item = self.client.get('/api/v1/links', {'fields': 'id,title,unknown'}).json()['results'][0]
+        self.assertEqual(item, {'id': self.link.pk, 'title': 'a'})
+        item = self.client.get('/api/v1/links', {'fields': 'id,tags'}).json()['results'][0]
+        self.assertEqual(item['tags'], [self.tag.pk])
+        item = self.client.get(f'/api/v1/links/{self.link.pk}', {'fields': 'tags', 'expand': 'tags'}).json()
+        self.assertEqual(item, {'tags': [{'id': self.tag.pk, 'name': 'tag'}]})
+        item = self.client.get(f'/api/v1/tags/{self.tag.pk}', {'fields': 'slug,link_count'}).json()
+        self.assertEqual(item, {'slug': 'tag', 'link_count': 1})
+
+    def test_project_queryset_reads_only_requested_columns(self):
+        serializer = LinksSerializer(fields=['id', 'title'])
+        queryset = serializer.project_queryset(Links.objects.all())
+        self.assertEqual(queryset.query.deferred_loading, ({'id', 'title'}, False))
+        # 没有请求标签时不预取关联表
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/api/v1/links', {'fields': 'id,title'}).status_code, 200)
+
+
+class ReorderTests(TestCase):
+    """链接和标签的批量排序与移动"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_reorder_links(self):
+        links = [Links.objects.create(title=f'link{index}', url=f'https://{index}.example.com', sort_order=index)
+                 for index in range(3)]
+        ids = [links[0].pk, links[2].pk, links[1].pk]
+        response = self.client.post('/api/v1/links/reorder', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['updated']), sorted([links[1].pk, links[2].pk]))
+        self.assertEqual(list(Links.objects.order_by('sort_order').values_list('pk', flat=True)), ids)
+
+        for ids in ([links[0].pk, links[0].pk], [links[0].pk, 0]):
+            response = self.client.post('/api/v1/links/reorder', {'ids': ids}, format='json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_move_tags(self):
+        root = Tags.objects.create(name='root', slug='root')
+        other = Tags.objects.create(name='other', slug='other')
+        child = Tags.objects.create(name='child', slug='child', parent=root)
+        Links.objects.create(title='a', url='https://a.example.com').tags.add(child)
+
+        items = [{'id': other.pk}, {'id': child.pk, 'parent': other.pk}, {'id': root.pk}]
+        response = self.client.post('/api/v1/tags/reorder', {'items': items}, format='json')
+        self.assertEqual(response.status_code, 200)
+        child.refresh_from_db()
+        self.assertEqual((child.parent_id, child.sort_order), (other.pk, 1))
+        self.assertEqual(Tags.objects.get(pk=other.pk).subtree_link_count, 1)
+        self.assertEqual(Tags.objects.get(pk=root.pk).subtree_link_count, 0)
+        self.assertEqual(tag_counts.find_drift(), [])
+
+        # 不能移动到自身的下级标签下
+        response = self.client.post('/api/v1/tags/reorder', {'items': [{'id': other.pk, 'parent': child.pk}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class SnapshotTests(TestCase):
+    """导航数据的静态快照"""
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings = override_settings(SNAPSHOT_ROOT=root.name, SNAPSHOT_KEEP=1)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.visible = Tags.objects.create(name='visible', slug='visible')
+        self.hidden = Tags.objects.create(name='hidden', slug='hidden', is_show=False)
+        # 上级标签隐藏时，下级标签也不出现
+        Tags.objects.create(name='orphan', slug='orphan', parent=self.hidden)
+        link = Links.objects.create(title='a', url='https://a.example.com')
+        link.tags.add(self.visible, self.hidden)
+        Links.objects.create(title='b', url='https://b.example.com', is_show=False)
+
+    def test_build_catalog(self):
+        catalog = snapshot.build_catalog()
+        self.assertEqual([tag['name'] for tag in catalog['tags']], ['visible'])
+        self.assertEqual([(link['title'], link['tags']) for link in catalog['links']], [('a', [self.visible.pk])])
+
+    def test_publish_and_serve(self):
+        version, written = snapshot.publish()
+        self.assertTrue(written)
+        self.assertEqual(snapshot.publish(), (version, False))
+
+        pointer = json.loads(b''.join(self.client.get('/api/v1/navigation/snapshot').streaming_content))
+        self.assertEqual(pointer['version'], version)
+        response = self.client.get(f'/api/v1/navigation/snapshot/{version}', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        catalog = json.loads(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(catalog, json.loads(FastJSONRenderer().render(snapshot.build_catalog())))
+        response = self.client.get(
+            f'/api/v1/navigation/snapshot/{version}', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+        # 内容变化后发布新版本，旧版本超出保留数量后删除
+        self.hidden.is_show = True
+        self.hidden.save()
+        new_version, written = snapshot.publish()
+        self.assertTrue(written)
+        self.assertNotEqual(new_version, version)
+        self.assertEqual(self.client.get(f'/api/v1/navigation/snapshot/{version}').status_code, 404)
+        response = self.client.get(f'/api/v1/navigation/snapshot/{new_version}')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+
+class NormalizeURLTests(SimpleTestCase):
+    """链接地址的规范化"""
+
+    def test_equivalent_urls(self):
+        for url in ('http://A.com/', 'https://a.com', 'a.com/?utm_source=x', 'https://a.com:443/#section'):
+            self.assertEqual(normalize_url(url), 'a.com')
+
+    def test_significant_differences(self):
+        self.assertEqual(normalize_url('https://a.com/p?b=2&a=1&fbclid=x'), 'a.com/p?a=1&b=2')
+        self.assertEqual(normalize_url('https://a.com:8443/app/#/route'), 'a.com:8443/app#/route')
+        self.assertEqual(normalize_url('ftp://a.com/file'), 'ftp://a.com/file')
+
+
+class DuplicateLinkTests(TestCase):
+    """按规范化地址查找重复链接"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        # 绕过序列化器的查重校验写入重复数据
+        self.links = [
+            Links.objects.create(title='a', url='https://a.example.com/'),
+            Links.objects.create(title='a2', url='http://A.example.com?utm_source=x'),
+            Links.objects.create(title='b', url='https://b.example.com'),
+        ]
+
+    def test_lookup_and_report(self):
+        response = self.client.get('/api/v1/links/lookup', {'url': 'a.example.com'})
+        self.assertEqual([item['id'] for item in response.json()], [self.links[0].pk, self.links[1].pk])
+        groups = find_duplicates()
+        self.assertEqual([(group['normalized_url'], group['count']) for group in groups], [('a.example.com', 2)])
+        self.assertEqual(self.client.get('/api/v1/links/duplicates').json()[0]['count'], 2)
+
+    def test_url_hash_follows_updates(self):
+        link = self.links[2]
+        link.url = 'https://c.example.com'
+        link.save(update_fields=['url'])
+        self.assertEqual(Links.objects.filter(url_hash=link.url_hash).get().pk, link.pk)
+
+    def test_create_rejects_equivalent_url(self):
+        response = self.client.post('/api/v1/links', {'title': 'c', 'url': 'https://B.example.com/'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('url', response.json())
+
+
+@override_settings(CLICK_FLUSH_SECONDS=3600)
+class PopularityRankingTests(TestCase):
+    """按时间衰减的热度榜单"""
+
+    def setUp(self):
+        click_aggregator.flush()
+        self.addCleanup(click_aggregator.flush)
+        self.tag = Tags.objects.create(name='tag', slug='tag')
+        self.links = [
+            Links.objects.create(title=f'link{index}', url=f'https://{index}.example.com', popularity=index)
+            for index in range(4)
+        ]
+        self.links[3].is_show = False
+        self.links[3].save()
+        for link in self.links[:2]:
+            link.tags.add(self.tag)
+
+    def test_click_weight_halves_per_half_life(self):
+        with self.settings(POPULARITY_HALF_LIFE_HOURS=1):
+            self.assertEqual(click_weight(popularity_epoch() + timedelta(hours=2)), 4.0)
+
+    def test_short_half_life(self):
+        # 36 秒的半衰期下，距基准时间的半衰期数远超浮点数的指数范围
+        with self.settings(POPULARITY_HALF_LIFE_HOURS=0.01):
+            period = popularity_period()
+            self.assertGreater(period, 1000)
+            self.assertTrue(1 <= click_weight(period=period) < 2.0 ** PERIOD_HALF_LIVES)
+
+            response = self.client.post(f'/api/v1/links/{self.links[0].pk}/click')
+            self.assertEqual(response.status_code, 200)
+            link = Links.objects.get(pk=self.links[0].pk)
+            self.assertIn(link.popularity_period, (period, popularity_period()))
+            self.assertTrue(1 <= link.popularity < 2.0 ** PERIOD_HALF_LIVES)
+
+            # 第一次读取榜单时换算旧周期的热度，种子数据落后太多，记为 0
+            popular = self.client.get('/api/v1/links/popular').json()
+            self.assertEqual([row['id'] for row in popular], [self.links[0].pk])
+            self.assertAlmostEqual(popular[0]['score'], 1, places=2)
+            self.assertFalse(Links.objects.exclude(pk=self.links[0].pk).filter(popularity__gt=0).exists())
+
+    def test_rebase_popularity(self):
+        Links.objects.filter(pk=self.links[1].pk).update(popularity=2.0 ** 70, popularity_period=2)
+        self.assertEqual(rebase_popularity(3), 4)
+        popularity = dict(Links.objects.values_list('pk', 'popularity'))
+        self.assertEqual(popularity[self.links[1].pk], 2.0 ** 6)
+        self.assertEqual(popularity[self.links[2].pk], 2 * 2.0 ** (-3 * PERIOD_HALF_LIVES))
+        self.assertEqual(rebase_popularity(3), 0)
+
+        # 落后太多的周期记为 0，不会下溢
+        rebase_popularity(20)
+        popularity = dict(Links.objects.values_list('pk', 'popularity'))
+        self.assertEqual(popularity[self.links[1].pk], 0)
+        self.assertEqual(set(Links.objects.values_list('popularity_period', flat=True)), {20})
+
+    def test_refresh_and_offer(self):
+        ranking = PopularityRanking(size=2)
+        ranking.refresh()
+        self.assertEqual([row['title'] for row in ranking.top()], ['link2', 'link1'])
+        self.assertEqual([row['title'] for row in ranking.top(self.tag.pk)], ['link1'])
+        self.assertEqual(ranking.top(limit=1)[0]['id'], self.links[2].pk)
+
+        # 点击后候选集增量更新，不需要重新读取数据库
+        ranking.offer({'id': self.links[0].pk, 'title': 'link0', 'url': '', 'icon': None, 'popularity': 10}, [self.tag.pk])
+        self.assertEqual([row['title'] for row in ranking.top()], ['link0', 'link2'])
+        self.assertEqual([row['title'] for row in ranking.top(self.tag.pk)], ['link0', 'link1'])
+
+    def test_click_updates_shared_ranking(self):
+        popularity_ranking.refresh()
+        self.client.post(f'/api/v1/links/{self.links[0].pk}/click')
+        # 刚发生的一次点击的分数为 1，远高于测试数据中按基准时间累加的热度
+        popular = self.client.get('/api/v1/links/popular', {'limit': 2}).json()
+        self.assertEqual([row['id'] for row in popular], [self.links[0].pk, self.links[2].pk])
+        self.assertAlmostEqual(popular[0]['score'], 1, places=2)
+        popular = self.client.get(f'/api/v1/tags/{self.tag.slug}/popular').json()
+        self.assertEqual([row['id'] for row in popular], [self.links[0].pk, self.links[1].pk])
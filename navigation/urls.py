@@ -1,12 +1,33 @@
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
 
-from navigation.views import TagsView, LinksView
+from navigation.snapshot_views import snapshot_file, snapshot_pointer
+from navigation.views import TagsView, LinksView, NavigationChangesView
 
 router = DefaultRouter(trailing_slash=False)
 router.register(r'tags', TagsView, basename='tags')
 router.register(r'links', LinksView, basename='links')
 
 urlpatterns = [
+    # 按游标增量同步导航数据的变更
+    path('navigation/changes', NavigationChangesView.as_view(), name='navigation-changes'),
+    # 预先生成的导航快照，只读取磁盘文件
+    path('navigation/snapshot', snapshot_pointer, name='navigation-snapshot'),
+    re_path(r'^navigation/snapshot/(?P<version>[0-9a-f]{16})$', snapshot_file, name='navigation-snapshot-file'),
+]
+
+# ASGI 部署时启用，链接和标签的 list/retrieve 由异步视图处理
+if settings.ASYNC_NAVIGATION_READS:
+    from navigation.async_views import AsyncLinksReadView, AsyncTagsReadView
+
+    urlpatterns += [
+        path('links', AsyncLinksReadView.as_view(), name='links-list-async'),
+        path('links/<int:pk>', AsyncLinksReadView.as_view(detail=True), name='links-detail-async'),
+        path('tags', AsyncTagsReadView.as_view(), name='tags-list-async'),
+        path('tags/<int:pk>', AsyncTagsReadView.as_view(detail=True), name='tags-detail-async'),
+    ]
+
+urlpatterns += [
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,44 +1,545 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import permissions
+from drf_yasg import openapi
+from rest_framework import permissions, status
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
-from navigation.models import Links, Tags
-from navigation.serializers import LinksSerializer, TagsSerializer
-from utils.swagger import api_docs
+from navigation.analytics import DAY, HOUR, clicks_by_link, link_click_series
+from navigation.bookmarks import (
+    BOOKMARK_FORMATS, BOOKMARK_PARSERS, BOOKMARK_RENDERERS, guess_bookmark_format, import_bookmarks,
+)
+from navigation.changes import changes_since
+from navigation.duplicates import find_by_url, find_duplicates
+from navigation.models import LinkClickRollup, Links, Tags
+from navigation.popularity import popularity_ranking, record_click
+from navigation.serializers import (
+    LinksSerializer, TagsSerializer, LinksBulkSerializer, LinksProjection, LinksReorderSerializer,
+    TagsReorderSerializer,
+)
+from rbac.decorators import has_permission
+from utils.db import ReplicaReadMixin
+from utils.fieldsets import SparseFieldsetViewMixin
+from utils.filters import IndexedFilterBackend
+from utils.projection import ProjectionListMixin
+from utils.streaming import export_response
+from utils.swagger import api_docs, EXPORT_FORMAT_PARAMETER
+
+
+POPULAR_LIMIT_PARAMETER = openapi.Parameter(
+    'limit',
+    openapi.IN_QUERY,
+    description='返回条数，不超过 POPULARITY_TOP_N',
+    type=openapi.TYPE_INTEGER
+)
+
+POPULAR_LINKS_RESPONSE = openapi.Response(
+    description='获取成功',
+    schema=openapi.Schema(
+        type=openapi.TYPE_ARRAY,
+        items=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'id': openapi.Schema(type=openapi.TYPE_INTEGER, description='链接ID'),
+                'title': openapi.Schema(type=openapi.TYPE_STRING, description='链接标题'),
+                'url': openapi.Schema(type=openapi.TYPE_STRING, description='链接地址'),
+                'icon': openapi.Schema(type=openapi.TYPE_STRING, description='链接图标'),
+                'score': openapi.Schema(type=openapi.TYPE_NUMBER, description='当前热度'),
+            }
+        )
+    )
+)
+
+
+CLICK_DAYS_PARAMETER = openapi.Parameter(
+    'days',
+    openapi.IN_QUERY,
+    description='统计最近多少天，默认 30，不超过对应粒度汇总的保留天数',
+    type=openapi.TYPE_INTEGER
+)
+
+CLICK_GRANULARITY_PARAMETER = openapi.Parameter(
+    'granularity',
+    openapi.IN_QUERY,
+    description='时间段粒度',
+    type=openapi.TYPE_STRING,
+    enum=[DAY, HOUR],
+    default=DAY
+)
+
+
+BOOKMARK_FORMAT_PARAMETER = openapi.Parameter(
+    'fmt',
+    openapi.IN_QUERY,
+    description='书签格式: html（Netscape 书签文件，默认）或 json（Chrome 书签格式）',
+    type=openapi.TYPE_STRING,
+    enum=['html', 'json']
+)
+
+
+REORDER_RESPONSE = openapi.Response(
+    description='保存成功',
+    schema=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            'updated': openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                description='排序或父级有变化的ID'
+            ),
+        }
+    )
+)
+
+
+def popular_limit(request):
+    try:
+        return max(1, int(request.query_params.get('limit')))
+    except (TypeError, ValueError):
+        return None
+
+
+def click_days(request, granularity=DAY):
+    """读取 ?days=，限制在对应粒度汇总的保留期内"""
+    retention = settings.CLICK_DAILY_RETENTION_DAYS if granularity == DAY else settings.CLICK_HOURLY_RETENTION_DAYS
+    try:
+        days = int(request.query_params.get('days', 30))
+    except (TypeError, ValueError):
+        days = 30
+    return min(max(1, days), retention)
+
+
+def attach_tag_ids(rows):
+    """为一块链接数据批量补充标签ID列表，每块只查询一次关联表"""
+    tag_ids = {row['id']: [] for row in rows}
+    through = Links.tags.through.objects.filter(links_id__in=list(tag_ids)).order_by('links_id', 'tags_id')
+    for link_id, tag_id in through.values_list('links_id', 'tags_id'):
+        tag_ids[link_id].append(tag_id)
+    for row in rows:
+        row['tags'] = tag_ids[row['id']]
 
 
 # Create your views here.
 @api_docs(summary="链接相关操作")
-class LinksView(ModelViewSet):
+class LinksView(ProjectionListMixin, SparseFieldsetViewMixin, ReplicaReadMixin, ModelViewSet):
     queryset = Links.objects.all().prefetch_related('tags')  # 预取tags
     serializer_class = LinksSerializer
+    # list 直接从 values() 构造响应，标签按页批量查询
+    projection_class = LinksProjection
+    replica_read_actions = (
+        'list', 'retrieve', 'export', 'popular', 'clicks', 'click_series', 'lookup', 'duplicates'
+    )
     permission_classes = [permissions.AllowAny]
-    # filterset_fields = ["is_show", "is_recommend", "tags"]
-    # search_fields = ["title", "url", "description"]
-    # ordering_fields = ["sort_order", "click_count", "created_at", "updated_at"]
-    # def get_queryset(self):
-    #     queryset = super().get_queryset()
-    #     is_show = self.request.query_params.get('is_show')
-    #     is_recommend = self.request.query_params.get('is_recommend')
-    #     if is_show is not None:
-    #         queryset = queryset.filter(is_show=is_show)
-    #
-    #     if is_recommend is not None:
-    #         queryset = queryset.filter(is_recommend=is_recommend)
-    #     return queryset
+    # 详情路由只匹配数字ID，click 等动作直接用 pk 查询，非数字的 pk 返回 404 而不是 500
+    lookup_value_regex = r'\d+'
+    # 列表的过滤和排序，组合必须有 Links.Meta.indexes 中对应的复合索引
+    filter_backends = [IndexedFilterBackend]
+    index_filter_fields = ('is_show', 'is_recommend')
+    # is_recommend 的索引都以 is_show 开头，推荐链接默认只查可见的
+    implied_filters = {'is_recommend': {'is_show': True}}
+    related_filter_fields = ('tags',)
+    ordering_fields = ('sort_order', 'click_count', 'created_at', 'updated_at')
+    ordering = 'sort_order'
+
+    @api_docs(
+        summary='导出链接',
+        description='以NDJSON或CSV流式导出全部链接及其标签ID，需要link_view权限',
+        manual_parameters=[EXPORT_FORMAT_PARAMETER]
+    )
+    @action(detail=False, methods=['get'])
+    @has_permission('link_view')
+    def export(self, request):
+        columns = [
+            'id', 'title', 'url', 'description', 'icon', 'click_count', 'is_recommend',
+            'is_show', 'sort_order', 'created_at', 'updated_at', 'tags'
+        ]
+        queryset = Links.objects.order_by('id').values(*columns[:-1])
+        return export_response(request, queryset, columns, 'links', enrich=attach_tag_ids)
+
+    @api_docs(
+        summary='批量创建/更新链接',
+        description='提交链接数组，带id的条目更新对应链接，其余条目新建。标签和唯一性约束批量校验，'
+                    '全部通过后在一个事务内写入，需要link_create和link_update权限',
+        request_body=LinksBulkSerializer(many=True),
+        responses={
+            201: openapi.Response(
+                description='写入成功',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'created': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                            description='新建的链接ID，与请求中新建条目的顺序一致'
+                        ),
+                        'updated': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                            description='更新的链接ID'
+                        ),
+                    }
+                )
+            )
+        }
+    )
+    @action(detail=False, methods=['post'])
+    @has_permission('link_create')
+    @has_permission('link_update')
+    def bulk(self, request):
+        serializer = LinksBulkSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        created, updated = serializer.save()
+        return Response({
+            'created': [link.id for link in created],
+            'updated': [link.id for link in updated],
+        }, status=status.HTTP_201_CREATED)
+
+    @api_docs(
+        summary='调整链接排序',
+        description='按提交的ID顺序重新设置 sort_order，一次请求保存整个列表，需要link_update权限',
+        request_body=LinksReorderSerializer,
+        responses={200: REORDER_RESPONSE}
+    )
+    @action(detail=False, methods=['post'])
+    @has_permission('link_update')
+    def reorder(self, request):
+        serializer = LinksReorderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'updated': [link.id for link in serializer.save()]})
+
+    @api_docs(
+        summary='导出书签',
+        description='以浏览器书签格式流式导出链接，标签树对应书签文件夹，需要link_view权限',
+        manual_parameters=[BOOKMARK_FORMAT_PARAMETER]
+    )
+    @action(detail=False, methods=['get'], parser_classes=[MultiPartParser])
+    @has_permission('link_view')
+    def bookmarks(self, request):
+        fmt = request.query_params.get('fmt', 'html')
+        if fmt not in BOOKMARK_FORMATS:
+            return Response(
+                {'detail': f'不支持的书签格式: {fmt}，可选: {", ".join(BOOKMARK_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        response = StreamingHttpResponse(
+            BOOKMARK_RENDERERS[fmt](), content_type=f'{BOOKMARK_FORMATS[fmt]}; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="bookmarks.{fmt}"'
+        return response
+
+    @api_docs(
+        summary='导入书签',
+        description='上传浏览器导出的书签文件（Netscape HTML、Chrome 或 Firefox JSON），流式解析并批量创建链接，'
+                    '文件夹导入为标签。地址已存在的链接只补充标签，出错的书签会被跳过并在结果中列出，需要link_create权限',
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True, description='书签文件'),
+            openapi.Parameter('fmt', openapi.IN_FORM, type=openapi.TYPE_STRING, enum=list(BOOKMARK_FORMATS),
+                              description='文件格式，默认根据扩展名判断'),
+        ],
+        responses={
+            200: openapi.Response(
+                description='导入完成',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'created': openapi.Schema(type=openapi.TYPE_INTEGER, description='新建链接数'),
+                        'existing': openapi.Schema(type=openapi.TYPE_INTEGER, description='地址已存在或重复的书签数'),
+                        'tags_created': openapi.Schema(type=openapi.TYPE_INTEGER, description='新建标签数'),
+                        'errors': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'index': openapi.Schema(type=openapi.TYPE_INTEGER, description='书签序号'),
+                                    'detail': openapi.Schema(type=openapi.TYPE_STRING, description='错误信息'),
+                                }
+                            )
+                        ),
+                    }
+                )
+            )
+        }
+    )
+    @bookmarks.mapping.post
+    @has_permission('link_create')
+    def import_bookmarks(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'detail': '请上传书签文件'}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.data.get('fmt') or guess_bookmark_format(upload.name)
+        if fmt not in BOOKMARK_PARSERS:
+            return Response({'detail': f'不支持的书签格式: {fmt}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = import_bookmarks(upload.file, fmt)
+        except ValueError as exc:
+            # 上传的文件先完整解析一遍，格式错误时不会写入任何数据
+            return Response({'detail': f'书签文件解析失败: {exc}'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'created': result.created,
+            'existing': result.existing,
+            'tags_created': result.tags_created,
+            'errors': [{'index': index, 'detail': message} for index, message in result.errors]
+        })
+
+    @api_docs(
+        summary='记录链接点击',
+        description='点击次数加一并更新按时间衰减的热度',
+        security=False,
+        responses={
+            200: openapi.Response(
+                description='记录成功',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'id': openapi.Schema(type=openapi.TYPE_INTEGER, description='链接ID'),
+                        'click_count': openapi.Schema(type=openapi.TYPE_INTEGER, description='累计点击次数'),
+                    }
+                )
+            )
+        }
+    )
+    @action(detail=True, methods=['post'])
+    def click(self, request, pk=None):
+        row = record_click(pk)
+        if row is None:
+            raise NotFound()
+        return Response({'id': row['id'], 'click_count': row['click_count']})
+
+    @api_docs(
+        summary='热门链接',
+        description='按时间衰减的点击热度排序的链接，由预先计算的榜单提供',
+        security=False,
+        manual_parameters=[POPULAR_LIMIT_PARAMETER],
+        responses={200: POPULAR_LINKS_RESPONSE}
+    )
+    @action(detail=False, methods=['get'])
+    def popular(self, request):
+        return Response(popularity_ranking.top(limit=popular_limit(request)))
+
+    @api_docs(
+        summary='链接点击统计',
+        description='最近若干天每个链接的点击次数，按点击次数降序排列，只读取天粒度的点击汇总',
+        manual_parameters=[CLICK_DAYS_PARAMETER, POPULAR_LIMIT_PARAMETER],
+        responses={
+            200: openapi.Response(
+                description='获取成功',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'id': openapi.Schema(type=openapi.TYPE_INTEGER, description='链接ID'),
+                            'title': openapi.Schema(type=openapi.TYPE_STRING, description='链接标题'),
+                            'url': openapi.Schema(type=openapi.TYPE_STRING, description='链接地址'),
+                            'clicks': openapi.Schema(type=openapi.TYPE_INTEGER, description='点击次数'),
+                        }
+                    )
+                )
+            )
+        }
+    )
+    @action(detail=False, methods=['get'])
+    @has_permission('link_view')
+    def clicks(self, request):
+        return Response(clicks_by_link(click_days(request), limit=popular_limit(request)))
+
+    @api_docs(
+        summary='链接点击趋势',
+        description='某个链接最近若干天按小时或天的点击次数，没有点击的时间段为 0，只读取点击汇总',
+        manual_parameters=[CLICK_DAYS_PARAMETER, CLICK_GRANULARITY_PARAMETER],
+        responses={
+            200: openapi.Response(
+                description='获取成功',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'bucket': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME,
+                                                     description='时间段起点'),
+                            'clicks': openapi.Schema(type=openapi.TYPE_INTEGER, description='点击次数'),
+                        }
+                    )
+                )
+            )
+        }
+    )
+    @action(detail=True, methods=['get'], url_path='clicks')
+    @has_permission('link_view')
+    def click_series(self, request, pk=None):
+        granularity = request.query_params.get('granularity', DAY)
+        if granularity not in dict(LinkClickRollup.GRANULARITY_CHOICES):
+            return Response({'detail': f'granularity 只能是 {DAY} 或 {HOUR}'}, status=status.HTTP_400_BAD_REQUEST)
+        if not Links.objects.filter(pk=pk).exists():
+            raise NotFound()
+        return Response(link_click_series(pk, click_days(request, granularity), granularity))
+
+    @api_docs(
+        summary='按地址查找链接',
+        description='返回规范化后与 url 相同的链接（忽略协议、主机大小写、末尾斜杠和跟踪参数），按哈希索引查询',
+        manual_parameters=[
+            openapi.Parameter('url', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True, description='链接地址'),
+        ],
+        responses={200: LinksSerializer(many=True)}
+    )
+    @action(detail=False, methods=['get'])
+    def lookup(self, request):
+        url = request.query_params.get('url', '').strip()
+        if not url:
+            return Response({'detail': '请提供 url 参数'}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = find_by_url(url).prefetch_related('tags').order_by('id')
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    @api_docs(
+        summary='重复链接报告',
+        description='列出规范化地址相同的链接分组，按重复数从多到少排列，需要link_view权限',
+        manual_parameters=[POPULAR_LIMIT_PARAMETER],
+        responses={
+            200: openapi.Response(
+                description='获取成功',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'url_hash': openapi.Schema(type=openapi.TYPE_STRING, description='规范化链接哈希'),
+                            'normalized_url': openapi.Schema(type=openapi.TYPE_STRING, description='规范化地址'),
+                            'count': openapi.Schema(type=openapi.TYPE_INTEGER, description='链接数'),
+                            'links': openapi.Schema(
+                                type=openapi.TYPE_ARRAY,
+                                items=openapi.Schema(
+                                    type=openapi.TYPE_OBJECT,
+                                    properties={
+                                        'id': openapi.Schema(type=openapi.TYPE_INTEGER, description='链接ID'),
+                                        'title': openapi.Schema(type=openapi.TYPE_STRING, description='链接标题'),
+                                        'url': openapi.Schema(type=openapi.TYPE_STRING, description='链接地址'),
+                                        'created_at': openapi.Schema(type=openapi.TYPE_STRING,
+                                                                     format=openapi.FORMAT_DATETIME,
+                                                                     description='创建时间'),
+                                    }
+                                )
+                            ),
+                        }
+                    )
+                )
+            )
+        }
+    )
+    @action(detail=False, methods=['get'])
+    @has_permission('link_view')
+    def duplicates(self, request):
+        return Response(find_duplicates(limit=popular_limit(request)))
+
 
 @api_docs(summary="标签相关操作")
-class TagsView(ModelViewSet):
+class TagsView(SparseFieldsetViewMixin, ReplicaReadMixin, ModelViewSet):
     queryset = Tags.objects.all()
     serializer_class = TagsSerializer
+    replica_read_actions = ('list', 'retrieve', 'popular')
     permission_classes = [permissions.AllowAny]
-    # filterset_fields = ["is_show"]
-    # search_fields = ["name", "slug", "description"]
-    # ordering_fields = ["sort_order", "created_at", "updated_at"]
-    # def get_queryset(self):
-    #     queryset = super().get_queryset()
-    #     is_show = self.request.query_params.get('is_show')
-    #     if is_show is not None:
-    #         queryset = queryset.filter(is_show=is_show)
-    #     return queryset
+    # 列表的过滤和排序，组合必须有 Tags.Meta.indexes 中对应的复合索引
+    filter_backends = [IndexedFilterBackend]
+    index_filter_fields = ('is_show',)
+    ordering_fields = ('sort_order', 'created_at', 'updated_at')
+    ordering = 'sort_order'
+
+    @api_docs(
+        summary='调整标签排序和层级',
+        description='按提交的顺序重新设置 sort_order，带 parent 的项同时移动到新的父级标签下，'
+                    '一次请求保存整个列表，需要tag_update权限',
+        request_body=TagsReorderSerializer,
+        responses={200: REORDER_RESPONSE}
+    )
+    @action(detail=False, methods=['post'])
+    @has_permission('tag_update')
+    def reorder(self, request):
+        serializer = TagsReorderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'updated': [tag.id for tag in serializer.save()]})
+
+    @api_docs(
+        summary='标签下的热门链接',
+        description='某个标签下按时间衰减的点击热度排序的链接，由预先计算的榜单提供',
+        security=False,
+        manual_parameters=[POPULAR_LIMIT_PARAMETER],
+        responses={200: POPULAR_LINKS_RESPONSE}
+    )
+    @action(detail=False, methods=['get'], url_path=r'(?P<slug>[-\w]+)/popular')
+    def popular(self, request, slug=None):
+        tag_id = Tags.objects.filter(slug=slug).values_list('id', flat=True).first()
+        if tag_id is None:
+            raise NotFound()
+        return Response(popularity_ranking.top(tag_id, limit=popular_limit(request)))
+
+
+class NavigationChangesView(APIView):
+    """
+    导航数据增量同步API
+
+    按游标返回之后新建、修改或删除的链接和标签，读取量只与变更数量有关
+    """
+    permission_classes = [permissions.AllowAny]
+    # 每页变更记录数的默认值和上限
+    default_limit = 200
+    max_limit = 1000
+
+    @api_docs(
+        summary='导航数据增量同步',
+        description='返回游标之后有变化的链接和标签（当前数据）以及被删除的ID。未提供游标或游标早于已清理的位置时'
+                    '返回 reset=true 和当前游标，客户端应重新全量获取后从该游标继续；has_more 为 true 时用返回的游标继续请求',
+        security=False,
+        manual_parameters=[
+            openapi.Parameter('since', openapi.IN_QUERY, description='上次同步返回的游标', type=openapi.TYPE_INTEGER),
+            openapi.Parameter('limit', openapi.IN_QUERY, description='每页变更记录数，默认 200，最多 1000',
+                              type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: openapi.Response(
+                description='获取成功',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'cursor': openapi.Schema(type=openapi.TYPE_INTEGER, description='下次请求使用的游标'),
+                        'has_more': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='是否还有更多变更'),
+                        'reset': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='是否需要重新全量同步'),
+                        'links': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                                                description='有变化的链接，格式与链接详情一致'),
+                        'tags': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                                               description='有变化的标签，格式与标签详情一致'),
+                        'deleted': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'links': openapi.Schema(type=openapi.TYPE_ARRAY,
+                                                        items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                                'tags': openapi.Schema(type=openapi.TYPE_ARRAY,
+                                                       items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                            },
+                            description='已删除的ID'
+                        ),
+                    }
+                )
+            )
+        }
+    )
+    def get(self, request):
+        try:
+            since = request.query_params.get('since')
+            since = None if since in (None, '') else int(since)
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return Response({'detail': 'since 和 limit 必须是整数'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(1, limit), self.max_limit)
+
+        result = changes_since(since, limit)
+        context = {'request': request}
+        result['links'] = LinksSerializer(result['links'], many=True, context=context).data
+        result['tags'] = TagsSerializer(result['tags'], many=True, context=context).data
+        return Response(result)
@@ -0,0 +1,72 @@
+import json
+
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from utils.fastjson import FastJSONRenderer
+
+from .auth_pool import get_credential_pool
+from .views import perform_login, perform_token_obtain
+
+
+class AsyncCredentialView(View):
+    """
+    登录类接口的异步视图
+
+    在事件循环中解析请求体，再把密码哈希交给有界的凭据校验线程池并异步等待，
+    等待期间事件循环可以继续处理其他请求；线程池已满时返回503和 Retry-After。
+    响应格式与对应的同步视图一致。
+    """
+    http_method_names = ['post', 'options']
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # 与 DRF 视图一致，登录接口不做 CSRF 校验
+        view.csrf_exempt = True
+        return view
+
+    async def post(self, request):
+        try:
+            data = self.parse_body(request)
+            payload, status_code = await self.perform(data)
+        except APIException as exc:
+            response = self.render({'detail': exc.detail}, status=exc.status_code)
+            if getattr(exc, 'wait', None):
+                response['Retry-After'] = str(int(exc.wait))
+            return response
+        return self.render(payload, status=status_code)
+
+    async def perform(self, data):
+        raise NotImplementedError
+
+    def parse_body(self, request):
+        if request.content_type == 'application/json':
+            try:
+                return json.loads(request.body or b'{}')
+            except ValueError as exc:
+                raise ParseError(f'JSON parse error - {exc}')
+        return request.POST
+
+    def render(self, data, status=200):
+        return HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+class AsyncLoginView(AsyncCredentialView):
+    """异步版本的 POST /users/login"""
+
+    async def perform(self, data):
+        return await get_credential_pool().acall(perform_login, data)
+
+
+class AsyncTokenObtainPairView(AsyncCredentialView):
+    """异步版本的 POST /token"""
+
+    async def perform(self, data):
+        serializer_class = import_string(jwt_settings.TOKEN_OBTAIN_SERIALIZER)
+        payload = await get_credential_pool().acall(perform_token_obtain, serializer_class, data)
+        return payload, status.HTTP_200_OK
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class LoginOverloaded(APIException):
+    """登录请求排队过多时快速拒绝，避免登录高峰拖垮其他接口"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = '登录请求过多，请稍后重试'
+    default_code = 'login_overloaded'
+
+    def __init__(self, detail=None, code=None, wait=1):
+        super().__init__(detail, code)
+        # DRF 的异常处理会据此设置 Retry-After 响应头
+        self.wait = wait
+
+
+def _run_in_worker(fn, args, kwargs):
+    # 工作线程复用数据库连接，执行前后按 CONN_MAX_AGE 清理过期连接
+    close_old_connections()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+class CredentialPool:
+    """
+    有界的凭据校验线程池
+
+    PBKDF2 在 hashlib 中计算时会释放 GIL，放到独立线程池中既能利用多核，
+    又能把并发的哈希计算限制在 max_workers 以内。正在执行和排队的任务总数
+    达到 max_pending 时直接抛出 LoginOverloaded（503），而不是继续排队。
+
+    参数:
+        max_workers: 工作线程数
+        max_pending: 允许同时存在（执行中 + 排队中）的任务数上限
+    """
+
+    def __init__(self, max_workers, max_pending):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='credential')
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise LoginOverloaded()
+            self._pending += 1
+        try:
+            future = self._executor.submit(_run_in_worker, fn, args, kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def call(self, fn, *args, **kwargs):
+        """在线程池中执行并同步等待结果，供 WSGI 下的同步视图使用"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def acall(self, fn, *args, **kwargs):
+        """在线程池中执行并异步等待结果，等待期间不占用事件循环"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_credential_pool():
+    """获取进程内共享的凭据校验线程池，首次使用时根据配置创建"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = getattr(settings, 'LOGIN_POOL_WORKERS', None) or os.cpu_count() or 1
+                max_pending = getattr(settings, 'LOGIN_POOL_MAX_PENDING', None) or workers * 4
+                _pool = CredentialPool(workers, max_pending)
+    return _pool
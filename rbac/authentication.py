@@ -0,0 +1,134 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class _Shard:
+    __slots__ = ('entries', 'lock', 'hits', 'misses')
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+
+class VerifiedTokenCache:
+    """
+    已验证 JWT 的有界 LRU 缓存
+
+    以令牌原文的摘要为键，缓存令牌类型和验签后的载荷，条目在令牌的 exp 时刻失效。
+    按摘要分片，每个分片各自加锁并维护 LRU 顺序和命中计数，
+    并发请求只会争用同一分片的锁，热路径上没有全局锁。
+
+    参数:
+        max_size: 缓存条目总数上限，平均分配到各分片
+        shards: 分片数
+    """
+
+    def __init__(self, max_size=10000, shards=16):
+        self.max_size = max_size
+        self._shards = [_Shard() for _ in range(shards)]
+        self._shard_size = max(1, max_size // shards)
+
+    @staticmethod
+    def digest(raw_token):
+        if isinstance(raw_token, str):
+            raw_token = raw_token.encode()
+        return hashlib.blake2b(raw_token, digest_size=20).digest()
+
+    def _shard(self, key):
+        return self._shards[key[0] % len(self._shards)]
+
+    def get(self, key, now=None):
+        """返回 (令牌类, 载荷)，未命中或已过期时返回 None"""
+        now = time.time() if now is None else now
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    shard.entries.move_to_end(key)
+                    shard.hits += 1
+                    return entry[1], entry[2]
+                del shard.entries[key]
+            shard.misses += 1
+        return None
+
+    def set(self, key, token_class, payload, expires_at):
+        shard = self._shard(key)
+        with shard.lock:
+            shard.entries[key] = (expires_at, token_class, payload)
+            shard.entries.move_to_end(key)
+            while len(shard.entries) > self._shard_size:
+                shard.entries.popitem(last=False)
+
+    def clear(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.hits = shard.misses = 0
+
+    def stats(self):
+        """汇总各分片的条目数和命中计数"""
+        size = hits = misses = 0
+        for shard in self._shards:
+            with shard.lock:
+                size += len(shard.entries)
+                hits += shard.hits
+                misses += shard.misses
+        total = hits + misses
+        return {
+            'size': size,
+            'max_size': self.max_size,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+        }
+
+
+token_cache = VerifiedTokenCache(
+    max_size=getattr(settings, 'JWT_CACHE_SIZE', 10000),
+    shards=getattr(settings, 'JWT_CACHE_SHARDS', 16),
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    带验签缓存的 JWT 认证
+
+    前端在访问令牌有效期内会反复携带同一个令牌，首次验签成功后缓存载荷，
+    之后的请求直接用缓存的载荷构造令牌对象，跳过 base64 解码、JSON 解析和 HMAC 校验。
+    验签失败的令牌不缓存，每次都按原流程报错。
+    """
+    cache = token_cache
+
+    def get_validated_token(self, raw_token):
+        if not self.cache.max_size:
+            return super().get_validated_token(raw_token)
+
+        key = self.cache.digest(raw_token)
+        cached = self.cache.get(key)
+        if cached is not None:
+            token_class, payload = cached
+            return self._rebuild(token_class, raw_token, payload)
+
+        validated_token = super().get_validated_token(raw_token)
+        expires_at = validated_token.payload.get('exp')
+        if expires_at is not None:
+            self.cache.set(key, type(validated_token), dict(validated_token.payload), expires_at)
+        return validated_token
+
+    @staticmethod
+    def _rebuild(token_class, raw_token, payload):
+        # 绕过 __init__ 中的解码和校验，每次返回独立的载荷副本
+        token = token_class.__new__(token_class)
+        token.token = raw_token
+        token.current_time = aware_utcnow()
+        token.payload = dict(payload)
+        return token
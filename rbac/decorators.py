@@ -2,6 +2,8 @@ from functools import wraps
 from rest_framework.response import Response
 from rest_framework import status
 
+from .registry import permission_registry, get_permission_mask
+
 def has_permission(permission_code):
     """
     检查用户是否拥有指定权限的装饰器
@@ -13,8 +15,13 @@ def has_permission(permission_code):
     
     参数:
         permission_code (str): 要检查的权限代码
+
+    装饰时会把权限代码登记到 permission_registry，供权限同步和注册表接口使用。
     """
     def decorator(view_func):
+        # 装饰时登记权限代码，并预先计算对应的权限位
+        permission_bit = 1 << permission_registry.register(permission_code, view_func)
+
         @wraps(view_func)
         def _wrapped_view(self, request, *args, **kwargs):
             # 未认证用户直接拒绝
@@ -28,40 +35,23 @@ def has_permission(permission_code):
             if request.user.is_superuser:
                 return view_func(self, request, *args, **kwargs)
                 
-            # 使用模型导入到函数内部，避免循环引用
-            from .models import UserRole, RolePermission
-            
-            # 获取用户的所有角色
-            user_roles = UserRole.objects.filter(user=request.user)
-            role_ids = [user_role.role_id for user_role in user_roles]
-            
-            # 添加调试信息
-            print(f"Checking permission: {permission_code}")
-            print(f"User roles: {role_ids}")
+            # 用户角色拥有的权限位掩码，同一请求内只查询一次
+            mask = get_permission_mask(request)
             
-            # 检查用户角色是否具有所需权限
-            role_permissions = RolePermission.objects.filter(
-                role_id__in=role_ids,
-                permission__codename=permission_code
-            )
-            
-            # 打印查询到的权限
-            print(f"Found permissions: {[rp.permission.codename for rp in role_permissions]}")
-            
-            has_perm = role_permissions.exists()
-            
-            if has_perm:
+            if mask & permission_bit:
                 return view_func(self, request, *args, **kwargs)
             else:
+                # 使用模型导入到函数内部，避免循环引用
+                from .models import UserRole
+
+                role_ids = UserRole.objects.filter(user=request.user).values_list('role_id', flat=True)
                 # 添加更详细的错误信息
                 return Response({
                     "detail": f"您没有 '{permission_code}' 权限执行此操作",
                     "debug_info": {
                         "user_roles": list(role_ids),
                         "required_permission": permission_code,
-                        "available_permissions": list(RolePermission.objects.filter(
-                            role_id__in=role_ids
-                        ).values_list('permission__codename', flat=True))
+                        "available_permissions": permission_registry.codenames_in(mask)
                     }
                 }, status=status.HTTP_403_FORBIDDEN)
         return _wrapped_view
@@ -0,0 +1,26 @@
+from utils.query_plans import hot_query
+
+from .models import RolePermission, UserRole
+
+# 执行计划只依赖查询结构，示例参数不需要真实存在
+SAMPLE_USER_ID = 1
+
+
+@hot_query('rbac.permission_mask', '@has_permission 加载用户权限位掩码')
+def permission_mask():
+    return RolePermission.objects.filter(
+        role_id__in=UserRole.objects.filter(user_id=SAMPLE_USER_ID).values('role_id')
+    ).values_list('permission__codename', flat=True)
+
+
+@hot_query('rbac.permission_check', '按角色和权限代码检查权限')
+def permission_check():
+    return RolePermission.objects.filter(
+        role_id__in=[1, 2, 3],
+        permission__codename='user_view'
+    )
+
+
+@hot_query('rbac.user_roles', '查询用户的角色')
+def user_roles():
+    return UserRole.objects.filter(user_id=SAMPLE_USER_ID).values_list('role_id', flat=True)
@@ -0,0 +1,235 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from utils.streaming import iter_batches
+
+from .models import Role, User, UserRole
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on', '是'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off', '否', ''}
+
+
+@dataclass
+class UserImportResult:
+    """
+    用户导入结果
+
+    errors 中的每一项为 (行号, 错误信息)，出错的行会被跳过，不影响其他行的导入。
+    """
+    created: int = 0
+    errors: list = field(default_factory=list)
+
+
+def _init_hash_worker():
+    # 以 spawn 方式启动的子进程需要重新加载 Django 配置才能读取 PASSWORD_HASHERS
+    django.setup()
+
+
+def _parse_bool(value, default):
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f'无法识别的布尔值: {value}')
+
+
+def _parse_roles(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(';')
+    return [str(name).strip() for name in value if str(name).strip()]
+
+
+class UserImporter:
+    """
+    批量导入用户
+
+    记录按批次处理：每批只用一次 IN 查询校验用户名和邮箱是否已存在，
+    在进程池中并行计算密码哈希，然后在一个事务内通过 bulk_create 写入用户及其角色。
+
+    参数:
+        batch_size: 每批处理的记录数
+        workers: 计算密码哈希的进程数，默认使用全部 CPU；为 0 时在当前进程内计算
+    """
+
+    def __init__(self, batch_size=1000, workers=None):
+        self.batch_size = batch_size
+        self.workers = os.cpu_count() if workers is None else workers
+        self._role_ids = {}
+        self._seen_usernames = set()
+        self._seen_emails = set()
+
+    def run(self, records):
+        """
+        导入记录
+
+        参数:
+            records: utils.streaming.iter_records 产出的 (行号, 记录, 错误) 序列
+
+        返回:
+            UserImportResult
+        """
+        result = UserImportResult()
+        self._role_ids = dict(Role.objects.values_list('name', 'id'))
+
+        if self.workers:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_hash_worker)
+        else:
+            executor = nullcontext()
+
+        with executor:
+            for batch in iter_batches(records, self.batch_size):
+                self._import_batch(batch, executor, result)
+        result.errors.sort(key=lambda error: error[0])
+        return result
+
+    def _hash_passwords(self, passwords, executor):
+        if not self.workers:
+            return [make_password(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+    def _clean(self, record):
+        """校验单条记录，返回 (清洗后的数据, 错误列表)"""
+        errors = []
+        username = str(record.get('username') or '').strip()
+        email = str(record.get('email') or '').strip()
+        password = record.get('password')
+
+        if not username:
+            errors.append('用户名不能为空')
+        elif len(username) > 50:
+            errors.append('用户名不能超过50个字符')
+        elif username in self._seen_usernames:
+            errors.append(f'用户名 {username} 在导入文件中重复')
+
+        if not email:
+            errors.append('邮箱不能为空')
+        else:
+            email = User.objects.normalize_email(email)
+            try:
+                validate_email(email)
+            except ValidationError:
+                errors.append(f'邮箱格式不正确: {email}')
+            if len(email) > 100:
+                errors.append('邮箱不能超过100个字符')
+            elif email in self._seen_emails:
+                errors.append(f'邮箱 {email} 在导入文件中重复')
+
+        if not password:
+            errors.append('密码不能为空')
+
+        cleaned = {
+            'username': username,
+            'email': email,
+            'password': str(password or ''),
+            'first_name': str(record.get('first_name') or ''),
+            'last_name': str(record.get('last_name') or ''),
+        }
+        for name in ('first_name', 'last_name'):
+            if len(cleaned[name]) > 30:
+                errors.append(f'{name} 不能超过30个字符')
+
+        try:
+            cleaned['is_active'] = _parse_bool(record.get('is_active'), True)
+        except ValueError as e:
+            errors.append(str(e))
+
+        role_names = _parse_roles(record.get('roles'))
+        unknown = [name for name in role_names if name not in self._role_ids]
+        if unknown:
+            errors.append(f'角色不存在: {", ".join(unknown)}')
+        cleaned['role_ids'] = list(dict.fromkeys(self._role_ids.get(name) for name in role_names))
+
+        if not errors:
+            self._seen_usernames.add(username)
+            self._seen_emails.add(email)
+        return cleaned, errors
+
+    def _import_batch(self, batch, executor, result):
+        rows = []
+        for line_no, record, error in batch:
+            if error:
+                result.errors.append((line_no, error))
+                continue
+            cleaned, errors = self._clean(record)
+            if errors:
+                result.errors.append((line_no, '; '.join(errors)))
+                continue
+            rows.append((line_no, cleaned))
+
+        if not rows:
+            return
+
+        # 每批只查询一次已存在的用户名和邮箱
+        taken_usernames = set(User.objects.filter(
+            username__in=[row['username'] for _, row in rows]
+        ).values_list('username', flat=True))
+        taken_emails = set(User.objects.filter(
+            email__in=[row['email'] for _, row in rows]
+        ).values_list('email', flat=True))
+
+        valid = []
+        for line_no, row in rows:
+            errors = []
+            if row['username'] in taken_usernames:
+                errors.append(f'用户名 {row["username"]} 已存在')
+            if row['email'] in taken_emails:
+                errors.append(f'邮箱 {row["email"]} 已存在')
+            if errors:
+                result.errors.append((line_no, '; '.join(errors)))
+            else:
+                valid.append((line_no, row))
+
+        if not valid:
+            return
+
+        hashed = self._hash_passwords([row['password'] for _, row in valid], executor)
+        users = [
+            User(
+                username=row['username'],
+                email=row['email'],
+                password=password,
+                first_name=row['first_name'],
+                last_name=row['last_name'],
+                is_active=row['is_active'],
+            )
+            for (_, row), password in zip(valid, hashed)
+        ]
+
+        try:
+            with transaction.atomic():
+                users = User.objects.bulk_create(users)
+                if any(user.pk is None for user in users):
+                    # 数据库不支持 bulk_create 返回主键时，按用户名回查
+                    ids = dict(User.objects.filter(
+                        username__in=[user.username for user in users]
+                    ).values_list('username', 'id'))
+                    for user in users:
+                        user.pk = ids[user.username]
+                UserRole.objects.bulk_create([
+                    UserRole(user_id=user.pk, role_id=role_id)
+                    for user, (_, row) in zip(users, valid)
+                    for role_id in row['role_ids']
+                ])
+        except IntegrityError as e:
+            # 并发写入导致唯一约束冲突时，整批标记为失败
+            for line_no, _ in valid:
+                result.errors.append((line_no, f'写入失败: {e}'))
+            return
+
+        result.created += len(users)
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from utils.query_plans import autodiscover, find_plan_issues, hot_queries, PLAN_ISSUE_PATTERNS
+
+
+class Command(BaseCommand):
+    help = '对登记的热点查询执行EXPLAIN，标记全表扫描和临时排序'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='要检查的数据库别名')
+        parser.add_argument('--verbose-plan', action='store_true', help='输出完整的执行计划')
+        parser.add_argument('--fail-on-issues', action='store_true', help='发现问题时以非零状态退出，便于在CI中使用')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        vendor = connections[alias].vendor
+        if vendor not in PLAN_ISSUE_PATTERNS:
+            raise CommandError(f'暂不支持分析 {vendor} 的执行计划')
+
+        autodiscover()
+        flagged = 0
+
+        for name, func, description in hot_queries.items():
+            queryset = func().using(alias)
+            plan = queryset.explain()
+            issues = find_plan_issues(plan, vendor)
+
+            if issues:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(f'⚠️ {name}: {description}'))
+                for label, line in issues:
+                    self.stdout.write(f'    {label}: {line}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'✅ {name}: {description}'))
+
+            if options['verbose_plan']:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    | {line}')
+
+        summary = f'检查完成! 共 {len(hot_queries.items())} 个查询, 存在问题: {flagged} 个'
+        if flagged and options['fail_on_issues']:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(f'✨ {summary}'))
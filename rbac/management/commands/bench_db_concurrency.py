@@ -0,0 +1,129 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, transaction, OperationalError
+from django.db.models import F
+
+from navigation.models import Links
+from rbac.models import Permission, Role, RolePermission, UserRole, User
+
+BENCH_PREFIX = '__bench__'
+
+
+class Command(BaseCommand):
+    help = '并发基准测试：在点击计数和RBAC写入的同时测量读取延迟，用于比较不同数据库配置'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=5.0, help='测试持续秒数')
+        parser.add_argument('--readers', type=int, default=4, help='读取线程数')
+        parser.add_argument('--writers', type=int, default=1, help='写入线程数')
+        parser.add_argument('--write-hold', type=float, default=0.01, help='每个写事务持有锁的秒数')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('⚠️ 该命令会在当前配置的数据库中临时写入测试数据，请勿在生产库上运行'))
+        self._describe_connection()
+
+        fixtures = self._create_fixtures()
+        stop = threading.Event()
+        latencies = []
+        counters = {'reads': 0, 'writes': 0, 'read_errors': 0, 'write_errors': 0}
+        lock = threading.Lock()
+
+        def reader():
+            local = []
+            errors = 0
+            try:
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    try:
+                        # 与 has_permission 和链接列表相同的热点查询
+                        list(RolePermission.objects.filter(
+                            role_id__in=UserRole.objects.filter(user_id=fixtures['user'].id).values('role_id')
+                        ).values_list('permission__codename', flat=True))
+                        list(Links.objects.filter(title__startswith=BENCH_PREFIX).values('id', 'click_count'))
+                    except OperationalError:
+                        errors += 1
+                    local.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(local)
+                counters['reads'] += len(local)
+                counters['read_errors'] += errors
+
+        def writer():
+            writes = 0
+            errors = 0
+            try:
+                while not stop.is_set():
+                    try:
+                        with transaction.atomic():
+                            Links.objects.filter(pk=fixtures['link'].pk).update(click_count=F('click_count') + 1)
+                            rp = RolePermission.objects.create(role=fixtures['role'], permission=fixtures['permission'])
+                            time.sleep(options['write_hold'])
+                            rp.delete()
+                        writes += 1
+                    except OperationalError:
+                        errors += 1
+            finally:
+                connections.close_all()
+            with lock:
+                counters['writes'] += writes
+                counters['write_errors'] += errors
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=writer) for _ in range(options['writers'])]
+        try:
+            for thread in threads:
+                thread.start()
+            time.sleep(options['duration'])
+            stop.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            self._delete_fixtures(fixtures)
+
+        self._report(latencies, counters, options['duration'])
+
+    def _describe_connection(self):
+        connection.ensure_connection()
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+                cursor.execute('PRAGMA synchronous')
+                synchronous = cursor.fetchone()[0]
+            self.stdout.write(f'数据库: sqlite, journal_mode={journal_mode}, synchronous={synchronous}')
+        else:
+            self.stdout.write(f'数据库: {connection.vendor}')
+
+    def _create_fixtures(self):
+        user = User.objects.create(username=f'{BENCH_PREFIX}user', email='bench@example.invalid')
+        role = Role.objects.create(name=f'{BENCH_PREFIX}role')
+        permission = Permission.objects.create(name=f'{BENCH_PREFIX}perm', codename=f'{BENCH_PREFIX}perm')
+        UserRole.objects.create(user=user, role=role)
+        link = Links.objects.create(title=f'{BENCH_PREFIX}link', url='https://bench.example.invalid/')
+        return {'user': user, 'role': role, 'permission': permission, 'link': link}
+
+    def _delete_fixtures(self, fixtures):
+        fixtures['link'].delete()
+        fixtures['user'].delete()
+        fixtures['role'].delete()
+        fixtures['permission'].delete()
+
+    def _report(self, latencies, counters, duration):
+        if not latencies:
+            self.stdout.write(self.style.ERROR('❌ 没有完成任何读取'))
+            return
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f'读取: {counters["reads"]} 次 ({counters["reads"] / duration:.0f}/s), 失败 {counters["read_errors"]} 次, '
+            f'p50={statistics.median(latencies) * 1000:.2f}ms, p99={p99 * 1000:.2f}ms, '
+            f'max={latencies[-1] * 1000:.2f}ms'
+        )
+        self.stdout.write(
+            f'写入: {counters["writes"]} 次 ({counters["writes"] / duration:.0f}/s), 失败 {counters["write_errors"]} 次'
+        )
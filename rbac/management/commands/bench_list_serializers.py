@@ -0,0 +1,106 @@
+import timeit
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from navigation import tag_counts
+from navigation.models import Links, Tags
+from navigation.serializers import LinksProjection, LinksSerializer
+from rbac.models import Role, User, UserRole
+from rbac.serializers import UserRoleSerializer, UserSerializer
+from utils.projection import ProjectionSerializer
+
+BENCH_PREFIX = '__bench__'
+
+
+class Command(BaseCommand):
+    help = '比较列表接口的 ModelSerializer 与基于 values() 的投影序列化的耗时（输出一致性由测试校验）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='每个列表的行数（相当于一页的大小）')
+        parser.add_argument('--number', type=int, default=20, help='每项测试的重复次数')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('⚠️ 该命令会在当前配置的数据库中临时写入测试数据，请勿在生产库上运行'))
+        rows = options['rows']
+        number = options['number']
+
+        self._create_fixtures(rows)
+        try:
+            cases = [
+                ('用户列表', User.objects.filter(username__startswith=BENCH_PREFIX).order_by('id'),
+                 UserSerializer, ProjectionSerializer, {}),
+                ('用户角色列表', UserRole.objects.filter(role__name=f'{BENCH_PREFIX}role').order_by('id'),
+                 UserRoleSerializer, ProjectionSerializer, {}),
+                ('链接列表', Links.objects.filter(title__startswith=BENCH_PREFIX).order_by('id'),
+                 LinksSerializer, LinksProjection, {}),
+                ('链接列表 ?fields=id,tags', Links.objects.filter(title__startswith=BENCH_PREFIX).order_by('id'),
+                 LinksSerializer, LinksProjection, {'fields': ['id', 'tags']}),
+                ('链接列表 ?fields=id,title,url,icon', Links.objects.filter(title__startswith=BENCH_PREFIX).order_by('id'),
+                 LinksSerializer, LinksProjection, {'fields': ['id', 'title', 'url', 'icon']}),
+            ]
+            for label, queryset, serializer_class, projection_class, fieldset in cases:
+                self._run_case(label, queryset, serializer_class, projection_class, fieldset, rows, number)
+        finally:
+            self._delete_fixtures()
+
+        self.stdout.write(self.style.SUCCESS('✨ 测试完成!'))
+
+    def _run_case(self, label, queryset, serializer_class, projection_class, fieldset, rows, number):
+        serializer = serializer_class(**fieldset)
+        projection = projection_class.for_serializer(serializer)
+        if projection is None:
+            self.stdout.write(self.style.ERROR(f'❌ {label}: 序列化器无法投影'))
+            return
+
+        # 与视图一致：序列化器路径使用按字段裁剪后的查询集
+        model_queryset = serializer.project_queryset(queryset)
+        values_queryset = projection.project(queryset)
+
+        def baseline():
+            return serializer_class(list(model_queryset[:rows]), many=True, **fieldset).data
+
+        def fast():
+            return projection.to_representation(values_queryset[:rows])
+
+        baseline_time = min(timeit.repeat(baseline, number=number, repeat=3)) / number
+        fast_time = min(timeit.repeat(fast, number=number, repeat=3)) / number
+        self.stdout.write(
+            f'✅ {label}: 序列化器 {baseline_time * 1000:.2f}ms, 投影 {fast_time * 1000:.2f}ms, '
+            f'加速 {baseline_time / fast_time:.1f}x'
+        )
+
+    def _create_fixtures(self, rows):
+        password = make_password(None)
+        users = User.objects.bulk_create([
+            User(username=f'{BENCH_PREFIX}{i}', email=f'bench{i}@example.invalid', password=password)
+            for i in range(rows)
+        ])
+        role = Role.objects.create(name=f'{BENCH_PREFIX}role')
+        UserRole.objects.bulk_create([UserRole(user=user, role=role) for user in users])
+
+        tags = Tags.objects.bulk_create([
+            Tags(name=f'{BENCH_PREFIX}{i}', slug=f'bench-{i}') for i in range(5)
+        ])
+        links = Links.objects.bulk_create([
+            Links(title=f'{BENCH_PREFIX}{i}', url=f'https://bench.example.invalid/{i}', click_count=i)
+            for i in range(rows)
+        ])
+        Through = Links.tags.through
+        link_tags = {
+            link.id: {tags[(i + offset) % len(tags)].id for offset in range(3)}
+            for i, link in enumerate(links)
+        }
+        Through.objects.bulk_create([
+            Through(links_id=link_id, tags_id=tag_id)
+            for link_id, tag_ids in link_tags.items()
+            for tag_id in tag_ids
+        ])
+        # 批量写入关联表不发送 m2m_changed，删除测试数据时会按关联扣减标签计数
+        tag_counts.apply_changes({}, link_tags)
+
+    def _delete_fixtures(self):
+        Links.objects.filter(title__startswith=BENCH_PREFIX).delete()
+        Tags.objects.filter(name__startswith=BENCH_PREFIX).delete()
+        User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+        Role.objects.filter(name=f'{BENCH_PREFIX}role').delete()
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rbac.importers import UserImporter
+from utils.streaming import EXPORT_FORMATS, guess_format, iter_records
+
+
+class Command(BaseCommand):
+    help = '从CSV或NDJSON文件批量导入用户'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='导入文件路径')
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), help='文件格式，默认根据扩展名判断')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批处理的记录数')
+        parser.add_argument('--workers', type=int, default=None, help='计算密码哈希的进程数，默认使用全部CPU，0表示不使用进程池')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or guess_format(options['path'])
+        importer = UserImporter(batch_size=options['batch_size'], workers=options['workers'])
+
+        try:
+            with open(options['path'], 'rb') as f:
+                result = importer.run(iter_records(f, fmt))
+        except OSError as e:
+            raise CommandError(f'无法读取文件: {e}')
+
+        for line_no, message in result.errors:
+            self.stdout.write(self.style.WARNING(f'⚠️ 第 {line_no} 行: {message}'))
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✨ 导入完成! 新建: {result.created} 个, 失败: {len(result.errors)} 个')
+        )
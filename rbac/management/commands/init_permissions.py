@@ -1,11 +1,14 @@
 from django.core.management.base import BaseCommand
-from rbac.models import Permission
-import time
-from django.db.utils import IntegrityError
+from rbac.registry import permission_registry, autodiscover
+from rbac.sync import plan_permission_sync, apply_permission_sync
 
 class Command(BaseCommand):
     help = '初始化RBAC系统的细粒度权限'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='只显示差异，不写入数据库')
+        parser.add_argument('--prune', action='store_true', help='删除未在此处声明的权限')
+
     def handle(self, *args, **options):
         # 用户管理权限
         user_permissions = [
@@ -48,13 +51,22 @@ class Command(BaseCommand):
             ('user_role_delete', '删除用户角色', '删除用户角色关联'),
         ]
         
+        # 导航管理权限
+        navigation_permissions = [
+            ('link_view', '查看链接', '导出链接数据'),
+            ('link_create', '创建链接', '批量创建链接'),
+            ('link_update', '更新链接', '批量更新链接'),
+            ('tag_update', '更新标签', '调整标签排序和层级'),
+        ]
+        
         # 合并所有权限
         all_permissions = (
             user_permissions + 
             role_permissions + 
             permission_permissions + 
             role_permission_permissions + 
-            user_role_permissions
+            user_role_permissions +
+            navigation_permissions
         )
         
         # 原有权限映射（保持兼容性）
@@ -68,70 +80,39 @@ class Command(BaseCommand):
         
         all_permissions.extend(legacy_permissions)
         
-        # 使用时间戳确保临时名称不会冲突
-        timestamp = int(time.time())
-        
-        created_count = 0
-        updated_count = 0
-        skipped_count = 0
-        
-        # 首先获取所有已存在的权限
-        existing_names = {perm.name: perm for perm in Permission.objects.all()}
-        existing_codes = {perm.codename: perm for perm in Permission.objects.all()}
-        
-        # 创建或更新权限
-        for codename, name, description in all_permissions:
-            try:
-                # 检查codename是否已存在
-                if codename in existing_codes:
-                    # 更新现有权限
-                    perm = existing_codes[codename]
-                    perm.description = description
-                    # 如果名称不同，且新名称不与其他权限冲突，则更新名称
-                    if perm.name != name and name not in existing_names:
-                        perm.name = name
-                    perm.save()
-                    self.stdout.write(f'✅ 更新权限: {codename}')
-                    updated_count += 1
-                else:
-                    # 检查名称是否已被使用
-                    if name in existing_names:
-                        # 为名称添加时间戳，使其唯一
-                        unique_name = f"{name}_{timestamp}"
-                        self.stdout.write(
-                            self.style.WARNING(f'⚠️ 权限名称冲突，使用唯一名称: {unique_name}')
-                        )
-                        # 创建新权限
-                        Permission.objects.create(
-                            codename=codename,
-                            name=unique_name,
-                            description=description
-                        )
-                    else:
-                        # 创建新权限
-                        Permission.objects.create(
-                            codename=codename,
-                            name=name,
-                            description=description
-                        )
-                    self.stdout.write(f'✅ 创建权限: {codename}')
-                    created_count += 1
-                    # 更新现有权限映射
-                    existing_names[name] = None
-                    existing_codes[codename] = None
-                
-            except IntegrityError as e:
-                # 处理唯一性约束错误
-                self.stdout.write(
-                    self.style.WARNING(f'⚠️ 权限 {codename} 创建失败(可能已存在): {str(e)}')
-                )
-                skipped_count += 1
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'❌ 处理权限 {codename} 失败: {str(e)}')
-                )
-                skipped_count += 1
+        # 补充视图中通过 @has_permission 使用、但未在上面声明的权限
+        autodiscover()
+        declared = {codename for codename, _, _ in all_permissions}
+        for codename in permission_registry.registered():
+            if codename not in declared:
+                all_permissions.append((codename, codename, ''))
         
-        self.stdout.write(
-            self.style.SUCCESS(f'✨ 初始化完成! 新建: {created_count} 个, 更新: {updated_count} 个, 跳过: {skipped_count} 个')
-        ) 
\ No newline at end of file
+        plan = plan_permission_sync(all_permissions, prune=options['prune'])
+
+        for perm in plan.creates:
+            self.stdout.write(f'➕ 创建权限: {perm.codename} ({perm.name})')
+        for perm in plan.updates:
+            self.stdout.write(f'✏️ 更新权限: {perm.codename} ({perm.name})')
+        for perm in plan.deletes:
+            if options['prune']:
+                self.stdout.write(f'➖ 删除权限: {perm.codename} ({perm.name})')
+            else:
+                self.stdout.write(f'… 未声明的权限(使用 --prune 删除): {perm.codename}')
+        for codename, name, holder in plan.conflicts:
+            self.stdout.write(
+                self.style.WARNING(f'⚠️ 权限 {codename} 的名称 "{name}" 已被 {holder} 占用，跳过')
+            )
+
+        deleted_count = len(plan.deletes) if options['prune'] else 0
+        summary = (
+            f'新建: {len(plan.creates)} 个, 更新: {len(plan.updates)} 个, '
+            f'删除: {deleted_count} 个, 跳过: {len(plan.conflicts)} 个'
+        )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'🔍 预览完成(未写入数据库)! {summary}'))
+            return
+
+        apply_permission_sync(plan, prune=options['prune'])
+
+        self.stdout.write(self.style.SUCCESS(f'✨ 初始化完成! {summary}'))
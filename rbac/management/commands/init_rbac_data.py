@@ -45,8 +45,8 @@ class Command(BaseCommand):
             {'name': '权限管理', 'codename': 'permission_management', 'description': '管理系统权限'},
             {'name': '角色权限管理', 'codename': 'role_permission_management', 'description': '管理角色权限关系'},
             {'name': '用户角色管理', 'codename': 'user_role_management', 'description': '管理用户角色关系'},
-            {'name': '查看用户', 'codename': 'view_user', 'description': '查看用户信息'},
-            {'name': '查看角色', 'codename': 'view_role', 'description': '查看角色信息'},
+            {'name': '查看用户', 'codename': 'user_view', 'description': '查看用户列表和详情'},
+            {'name': '查看角色', 'codename': 'role_view', 'description': '查看角色列表和详情'},
         ]
         
         created_permissions = []
@@ -69,7 +69,7 @@ class Command(BaseCommand):
             RolePermission.objects.get_or_create(role=admin_role, permission=perm)
         
         # 普通用户角色只有查看权限
-        view_permissions = [p for p in created_permissions if p.codename.startswith('view_')]
+        view_permissions = [p for p in created_permissions if p.codename.endswith('_view')]
         for perm in view_permissions:
             RolePermission.objects.get_or_create(role=user_role, permission=perm)
         
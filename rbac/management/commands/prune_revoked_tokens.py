@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from rbac.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = '分批清理已过期的刷新令牌撤销记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批删除的记录数')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        # 以命令开始时间为界，避免与新写入的记录互相追赶
+        cutoff = timezone.now()
+        expired = RevokedToken.objects.filter(expires_at__lte=cutoff)
+        deleted = 0
+
+        while True:
+            # 每批单独删除，避免长时间持有写锁阻塞刷新令牌
+            ids = list(expired.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            count, _ = RevokedToken.objects.filter(pk__in=ids).delete()
+            deleted += count
+            self.stdout.write(f'已删除 {deleted} 条')
+
+        remaining = RevokedToken.objects.count()
+        self.stdout.write(self.style.SUCCESS(f'✨ 清理完成! 删除过期记录: {deleted} 条, 剩余: {remaining} 条'))
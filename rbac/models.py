@@ -87,3 +87,21 @@ class UserRole(models.Model):
         unique_together = ['user', 'role']
         verbose_name = '用户角色'
         verbose_name_plural = '用户角色'
+
+class RevokedToken(models.Model):
+    """
+    已撤销的刷新令牌
+
+    按自增 id 只追加写入，各进程据此增量更新内存中的布隆过滤器；
+    令牌过期后的记录由 prune_revoked_tokens 命令分批清理。
+    """
+    jti = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.jti
+    
+    class Meta:
+        verbose_name = '已撤销令牌'
+        verbose_name_plural = '已撤销令牌'
@@ -1,5 +1,5 @@
 from rest_framework import permissions
-from .models import UserRole, RolePermission
+from .registry import permission_registry, get_permission_mask
 
 class HasRolePermission(permissions.BasePermission):
     """
@@ -24,15 +24,8 @@ class HasRolePermission(permissions.BasePermission):
         if not required_permission:
             return False
             
-        # 获取用户的所有角色
-        user_roles = UserRole.objects.filter(user=request.user)
-        role_ids = [user_role.role_id for user_role in user_roles]
-        
-        # 查询这些角色是否拥有所需权限
-        has_perm = RolePermission.objects.filter(
-            role_id__in=role_ids,
-            permission__codename=required_permission
-        ).exists()
+        # 比较权限位，用户的权限掩码在同一请求内只查询一次
+        has_perm = bool(get_permission_mask(request) & permission_registry.bit(required_permission))
         
         return has_perm
         
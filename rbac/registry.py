@@ -0,0 +1,93 @@
+import threading
+
+from django.utils.module_loading import autodiscover_modules
+
+
+class PermissionRegistry:
+    """
+    权限代码注册表
+
+    @has_permission 在装饰时把权限代码登记到这里，并把每个权限代码映射为一个
+    小整数 id，运行时通过位掩码比较权限，而不是逐个比较字符串。
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._codenames = []
+        self._usages = {}
+        self._lock = threading.Lock()
+
+    def intern(self, codename):
+        """返回权限代码对应的整数 id，首次出现时分配新的 id"""
+        perm_id = self._ids.get(codename)
+        if perm_id is None:
+            with self._lock:
+                perm_id = self._ids.get(codename)
+                if perm_id is None:
+                    perm_id = len(self._codenames)
+                    self._codenames.append(codename)
+                    self._ids[codename] = perm_id
+        return perm_id
+
+    def bit(self, codename):
+        """返回权限代码对应的位"""
+        return 1 << self.intern(codename)
+
+    def register(self, codename, view_func=None):
+        """登记一个被装饰器使用的权限代码"""
+        perm_id = self.intern(codename)
+        usages = self._usages.setdefault(codename, [])
+        if view_func is not None:
+            usages.append(f'{view_func.__module__}.{view_func.__qualname__}')
+        return perm_id
+
+    def mask(self, codenames):
+        """把一组权限代码转换为位掩码"""
+        mask = 0
+        for codename in codenames:
+            mask |= 1 << self.intern(codename)
+        return mask
+
+    def codenames_in(self, mask):
+        """把位掩码还原为权限代码列表"""
+        return [codename for perm_id, codename in enumerate(self._codenames) if mask >> perm_id & 1]
+
+    def registered(self):
+        """
+        返回所有被装饰器使用过的权限代码
+
+        返回:
+            {codename: [视图函数路径, ...]}，按权限 id 排序
+        """
+        return {
+            codename: list(self._usages[codename])
+            for codename in self._codenames
+            if codename in self._usages
+        }
+
+
+permission_registry = PermissionRegistry()
+
+
+def autodiscover():
+    """导入所有已安装应用的 views 模块，使其中的权限装饰器完成登记"""
+    autodiscover_modules('views')
+
+
+def get_permission_mask(request):
+    """
+    获取当前请求用户的权限位掩码
+
+    同一个请求内只查询一次数据库，结果缓存在 request 上。
+    """
+    mask = getattr(request, '_rbac_permission_mask', None)
+    if mask is None:
+        # 使用模型导入到函数内部，避免循环引用
+        from .models import RolePermission, UserRole
+
+        codenames = RolePermission.objects.filter(
+            role_id__in=UserRole.objects.filter(user=request.user).values('role_id')
+        ).values_list('permission__codename', flat=True)
+        mask = permission_registry.mask(codenames)
+        request._rbac_permission_mask = mask
+    return mask
@@ -0,0 +1,119 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from utils.bloom import BloomFilter
+
+from .models import RevokedToken
+
+
+class RevocationList:
+    """
+    刷新令牌撤销列表
+
+    撤销记录保存在 RevokedToken 表中，每个进程在内存中维护一个布隆过滤器：
+    过滤器判断“一定未撤销”时不访问数据库，只有可能命中时才查询数据库确认。
+    过滤器按自增 id 从撤销表中增量同步，累计元素超过容量时根据未过期的记录重建。
+
+    撤销时依靠 jti 的唯一约束写入，同一个刷新令牌只能成功撤销（轮换）一次，
+    因此即使过滤器尚未同步到其他进程的撤销记录，重放的令牌也会在写入时被拒绝。
+
+    参数:
+        capacity: 布隆过滤器的预期容量
+        error_rate: 布隆过滤器的误判率
+        sync_interval: 两次增量同步之间的最短间隔（秒）
+        batch_size: 同步时每次读取的记录数
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001, sync_interval=5, batch_size=2000):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.batch_size = batch_size
+        self._filter = BloomFilter(capacity, error_rate)
+        self._last_id = 0
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def is_revoked(self, jti):
+        """判断刷新令牌是否已撤销"""
+        self.maybe_sync()
+        if jti not in self._filter:
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, jti, expires_at):
+        """
+        撤销刷新令牌
+
+        返回:
+            True 表示本次撤销成功，False 表示该令牌此前已被撤销
+        """
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        with self._lock:
+            self._filter.add(jti)
+        return True
+
+    def maybe_sync(self):
+        now = time.monotonic()
+        if self._synced_at is not None and now - self._synced_at < self.sync_interval:
+            return
+        # 其他线程正在同步时直接使用当前的过滤器
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._sync()
+            self._synced_at = now
+        finally:
+            self._lock.release()
+
+    def _sync(self):
+        while True:
+            rows = list(
+                RevokedToken.objects.filter(pk__gt=self._last_id)
+                .order_by('pk')
+                .values_list('pk', 'jti')[:self.batch_size]
+            )
+            if not rows:
+                break
+            for pk, jti in rows:
+                self._filter.add(jti)
+            self._last_id = rows[-1][0]
+            if len(rows) < self.batch_size:
+                break
+
+        if len(self._filter) > self._filter.capacity:
+            self._rebuild()
+
+    def _rebuild(self):
+        # 已清理的过期记录无法从过滤器中删除，重建时只保留未过期的记录
+        live = RevokedToken.objects.filter(expires_at__gt=timezone.now())
+        capacity = max(self.capacity, live.count() * 2)
+        bloom = BloomFilter(capacity, self.error_rate)
+        last_id = 0
+        for pk, jti in live.order_by('pk').values_list('pk', 'jti').iterator(chunk_size=self.batch_size):
+            bloom.add(jti)
+            last_id = pk
+        self._filter = bloom
+        self._last_id = max(self._last_id, last_id)
+
+    def reset(self):
+        """清空内存中的过滤器，下次检查时从数据库重新同步"""
+        with self._lock:
+            self._filter = BloomFilter(self.capacity, self.error_rate)
+            self._last_id = 0
+            self._synced_at = None
+
+
+revocation_list = RevocationList(
+    capacity=getattr(settings, 'TOKEN_REVOCATION_BLOOM_CAPACITY', 100000),
+    error_rate=getattr(settings, 'TOKEN_REVOCATION_BLOOM_ERROR_RATE', 0.001),
+    sync_interval=getattr(settings, 'TOKEN_REVOCATION_SYNC_SECONDS', 5),
+)
@@ -1,7 +1,16 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from utils.fieldsets import SparseFieldsetMixin
+
 from .models import User, Role, Permission, RolePermission, UserRole
+from .revocation import revocation_list
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     
     class Meta:
@@ -19,17 +28,17 @@ class UserSerializer(serializers.ModelSerializer):
         )
         return user
 
-class PermissionSerializer(serializers.ModelSerializer):
+class PermissionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Permission
         fields = ['id', 'name', 'codename', 'description']
 
-class RoleSerializer(serializers.ModelSerializer):
+class RoleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Role
         fields = ['id', 'name', 'description']
 
-class RolePermissionSerializer(serializers.ModelSerializer):
+class RolePermissionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     role_name = serializers.ReadOnlyField(source='role.name')
     permission_name = serializers.ReadOnlyField(source='permission.name')
     
@@ -37,7 +46,7 @@ class RolePermissionSerializer(serializers.ModelSerializer):
         model = RolePermission
         fields = ['id', 'role', 'role_name', 'permission', 'permission_name']
 
-class UserRoleSerializer(serializers.ModelSerializer):
+class UserRoleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     username = serializers.ReadOnlyField(source='user.username')
     role_name = serializers.ReadOnlyField(source='role.name')
     
@@ -57,4 +66,38 @@ class ChangePasswordSerializer(serializers.Serializer):
         # 这里可以添加密码强度验证
         if len(value) < 8:
             raise serializers.ValidationError("密码必须至少8个字符")
-        return value 
\ No newline at end of file
+        return value 
+
+class RevokingTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    刷新令牌时检查撤销列表
+
+    开启 ROTATE_REFRESH_TOKENS 时，旧的刷新令牌在签发新令牌的同时写入撤销列表，
+    同一个刷新令牌被重复使用时返回401。
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        jti = refresh[jwt_settings.JTI_CLAIM]
+        if revocation_list.is_revoked(jti):
+            raise InvalidToken('刷新令牌已被撤销')
+
+        data = super().validate(attrs)
+
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            # 唯一约束保证并发重放时只有一个请求能轮换成功
+            if not revocation_list.revoke(jti, datetime_from_epoch(refresh['exp'])):
+                raise InvalidToken('刷新令牌已被撤销')
+        return data
+
+
+class TokenRevokeSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=True, write_only=True)
+
+    def validate(self, attrs):
+        try:
+            refresh = RefreshToken(attrs['refresh'])
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+        revocation_list.revoke(refresh[jwt_settings.JTI_CLAIM], datetime_from_epoch(refresh['exp']))
+        return {}
@@ -0,0 +1,88 @@
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from .models import Permission
+
+
+@dataclass
+class PermissionSyncPlan:
+    """
+    权限同步计划
+
+    由 plan_permission_sync 根据声明的权限与数据库现状一次性计算得出，
+    apply_permission_sync 在单个事务内批量执行。
+    """
+    creates: list = field(default_factory=list)
+    updates: list = field(default_factory=list)
+    deletes: list = field(default_factory=list)
+    conflicts: list = field(default_factory=list)
+
+
+def plan_permission_sync(definitions, prune=False):
+    """
+    计算声明的权限与数据库中权限的差异
+
+    参数:
+        definitions: (codename, name, description) 三元组的可迭代对象
+        prune: 是否删除未声明的权限
+
+    返回:
+        PermissionSyncPlan，其中 deletes 始终列出未声明的权限，
+        是否真正删除由 apply_permission_sync 的 prune 参数决定
+    """
+    declared = {}
+    for codename, name, description in definitions:
+        declared[codename] = (name, description)
+
+    existing = {perm.codename: perm for perm in Permission.objects.all()}
+    plan = PermissionSyncPlan()
+
+    for codename, perm in existing.items():
+        if codename not in declared:
+            plan.deletes.append(perm)
+
+    # 删除（仅 prune 时）或改名后会释放的名称，不视为冲突
+    released = {perm.name for perm in plan.deletes} if prune else set()
+    released.update(
+        perm.name for codename, perm in existing.items()
+        if codename in declared and declared[codename][0] != perm.name
+    )
+    holders = {perm.name: perm.codename for perm in existing.values() if perm.name not in released}
+    wanted = {}
+
+    for codename, (name, description) in declared.items():
+        owner = wanted.setdefault(name, codename)
+        holder = holders.get(name, codename)
+        if owner != codename or holder != codename:
+            plan.conflicts.append((codename, name, owner if owner != codename else holder))
+            continue
+
+        perm = existing.get(codename)
+        if perm is None:
+            plan.creates.append(Permission(codename=codename, name=name, description=description))
+        elif perm.name != name or perm.description != description:
+            perm.name = name
+            perm.description = description
+            plan.updates.append(perm)
+
+    return plan
+
+
+def apply_permission_sync(plan, prune=False, batch_size=500):
+    """
+    在单个事务中批量执行同步计划
+
+    删除、更新（分两步写入名称）、创建各自只需常数次数据库往返，与权限数量无关。
+    """
+    with transaction.atomic():
+        if prune and plan.deletes:
+            Permission.objects.filter(pk__in=[perm.pk for perm in plan.deletes]).delete()
+        if plan.updates:
+            # 互换名称、改名链等情况下逐行写入的中间状态会违反 name 的唯一约束，
+            # 先把要更新的权限改为按主键生成的临时名称，再写入最终的名称
+            placeholders = [Permission(pk=perm.pk, name=f'~sync-{perm.pk}') for perm in plan.updates]
+            Permission.objects.bulk_update(placeholders, ['name'], batch_size=batch_size)
+            Permission.objects.bulk_update(plan.updates, ['name', 'description'], batch_size=batch_size)
+        if plan.creates:
+            Permission.objects.bulk_create(plan.creates, batch_size=batch_size)
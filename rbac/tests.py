@@ -1,3 +1,453 @@
-from django.test import TestCase
+import io
+import threading
+import time
+from datetime import timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from rbac.auth_pool import CredentialPool, LoginOverloaded
+from rbac.authentication import CachedJWTAuthentication, VerifiedTokenCache
+from rbac.importers import UserImporter
+from rbac.models import Permission, RevokedToken, Role, RolePermission, User, UserRole
+from rbac.registry import PermissionRegistry
+from rbac.revocation import RevocationList, revocation_list
+from rbac.serializers import RolePermissionSerializer, UserRoleSerializer, UserSerializer
+from rbac.sync import apply_permission_sync, plan_permission_sync
+from utils.bloom import BloomFilter
+from utils.db import REPLICA_PIN_COOKIE, ReplicaRouter, apply_sqlite_pragmas, use_replica_for_reads
+from utils.projection import ProjectionSerializer
+from utils.query_plans import find_plan_issues
+from utils.streaming import DECODE_ERROR, iter_records
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class UserImportTests(TestCase):
+    """批量导入用户"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.role = Role.objects.create(name='editor')
+
+    def upload(self, content, name='users.csv', **data):
+        return self.client.post(
+            '/api/v1/users/import',
+            {'file': SimpleUploadedFile(name, content), **data},
+            format='multipart',
+        )
+
+    def test_import_csv(self):
+        content = (
+            'username,email,password,roles,is_active\n'
+            'alice,alice@example.com,secret,editor,1\n'
+            'bob,not-an-email,secret,,\n'
+            'carol,carol@example.com,secret,missing,no\n'
+            'admin,admin2@example.com,secret,,\n'
+        ).encode()
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['created'], 1)
+        self.assertEqual([error['line'] for error in body['errors']], [3, 4, 5])
+
+        alice = User.objects.get(username='alice')
+        self.assertTrue(alice.check_password('secret'))
+        self.assertTrue(UserRole.objects.filter(user=alice, role=self.role).exists())
+
+    def test_invalid_utf8_rows_are_reported(self):
+        content = (
+            b'{"username": "alice", "email": "alice@example.com", "password": "secret"}\n'
+            b'{"username": "b\xffb", "email": "bob@example.com", "password": "secret"}\n'
+            b'{"username": "carol", "email": "carol@example.com", "password": "secret"}\n'
+        )
+        response = self.upload(content, name='users.ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'created': 2, 'errors': [{'line': 2, 'detail': DECODE_ERROR}]})
+
+    @override_settings(USER_IMPORT_MAX_ROWS=2)
+    def test_large_files_are_rejected(self):
+        content = b'username,email,password\n' + b''.join(
+            f'user{index},user{index}@example.com,secret\n'.encode() for index in range(3)
+        )
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('import_users', response.json()['detail'])
+        self.assertFalse(User.objects.filter(username__startswith='user').exists())
+
+    def test_importer_batches_and_duplicates(self):
+        content = b'username,email,password\n' + b''.join(
+            f'user{index % 4},user{index}@example.com,secret\n'.encode() for index in range(6)
+        )
+        result = UserImporter(batch_size=2, workers=0).run(iter_records(io.BytesIO(content), 'csv'))
+        self.assertEqual(result.created, 4)
+        self.assertEqual([line_no for line_no, _ in result.errors], [6, 7])
+
+
+class IterRecordsTests(TestCase):
+    """CSV 和 NDJSON 记录的流式解析"""
+
+    def test_csv_rows_spanning_lines(self):
+        content = b'\xef\xbb\xbfname,note\nok,"a\nb"\nbad,"c\n\xfe"\nlast,x\n'
+        self.assertEqual(list(iter_records(io.BytesIO(content), 'csv')), [
+            (3, {'name': 'ok', 'note': 'a\nb'}, None),
+            (5, None, DECODE_ERROR),
+            (6, {'name': 'last', 'note': 'x'}, None),
+        ])
+
+    def test_ndjson_errors(self):
+        content = b'{"a": 1}\n\n[1]\n{oops\n'
+        records = list(iter_records(io.BytesIO(content), 'ndjson'))
+        self.assertEqual(records[0], (1, {'a': 1}, None))
+        self.assertEqual([(line_no, record) for line_no, record, _ in records[1:]], [(3, None), (4, None)])
+
+
+class ProjectionTests(TestCase):
+    """列表接口的投影序列化与原序列化器输出逐字节一致"""
+
+    def setUp(self):
+        role = Role.objects.create(name='editor')
+        permission = Permission.objects.create(name='查看链接', codename='links_view')
+        for index in range(3):
+            user = User.objects.create(username=f'user{index}', email=f'user{index}@example.com', is_active=index != 1)
+            UserRole.objects.create(user=user, role=role)
+        RolePermission.objects.create(role=role, permission=permission)
+
+    def assert_matches(self, queryset, serializer_class, **fieldset):
+        serializer = serializer_class(**fieldset)
+        projection = ProjectionSerializer.for_serializer(serializer)
+        self.assertIsNotNone(projection)
+        renderer = JSONRenderer()
+        expected = renderer.render(serializer_class(list(serializer.project_queryset(queryset)), many=True, **fieldset).data)
+        self.assertEqual(renderer.render(projection.to_representation(projection.project(queryset))), expected)
+
+    def test_users(self):
+        self.assert_matches(User.objects.order_by('id'), UserSerializer)
+        self.assert_matches(User.objects.order_by('id'), UserSerializer, fields=['id', 'date_joined'])
+
+    def test_related_names(self):
+        self.assert_matches(UserRole.objects.order_by('id'), UserRoleSerializer)
+        self.assert_matches(RolePermission.objects.order_by('id'), RolePermissionSerializer)
+
+
+class PermissionSyncTests(TestCase):
+    """权限的批量同步"""
+
+    def setUp(self):
+        Permission.objects.create(codename='user_view', name='旧名称', description='')
+        Permission.objects.create(codename='obsolete', name='废弃权限', description='')
+
+    def test_plan(self):
+        definitions = [
+            ('user_view', '查看用户', '查看用户列表和详情'),
+            ('user_create', '创建用户', ''),
+            ('user_delete', '废弃权限', ''),
+        ]
+        plan = plan_permission_sync(definitions)
+        self.assertEqual([perm.codename for perm in plan.creates], ['user_create'])
+        self.assertEqual([perm.codename for perm in plan.updates], ['user_view'])
+        self.assertEqual([perm.codename for perm in plan.deletes], ['obsolete'])
+        # 不删除时名称仍被占用
+        self.assertEqual(plan.conflicts, [('user_delete', '废弃权限', 'obsolete')])
+
+        plan = plan_permission_sync(definitions, prune=True)
+        self.assertEqual(plan.conflicts, [])
+        apply_permission_sync(plan, prune=True)
+        self.assertEqual(
+            dict(Permission.objects.values_list('codename', 'name')),
+            {'user_view': '查看用户', 'user_create': '创建用户', 'user_delete': '废弃权限'},
+        )
+
+    def test_swap_names(self):
+        Permission.objects.create(codename='user_edit', name='编辑用户', description='')
+        plan = plan_permission_sync([('user_view', '编辑用户', ''), ('user_edit', '旧名称', ''), ('obsolete', '废弃权限', '')])
+        self.assertEqual(plan.conflicts, [])
+        self.assertEqual(len(plan.updates), 2)
+        apply_permission_sync(plan)
+        self.assertEqual(
+            dict(Permission.objects.values_list('codename', 'name')),
+            {'user_view': '编辑用户', 'user_edit': '旧名称', 'obsolete': '废弃权限'},
+        )
+
+    def test_command_is_idempotent(self):
+        out = io.StringIO()
+        call_command('init_permissions', '--dry-run', stdout=out)
+        self.assertEqual(Permission.objects.count(), 2)
+        call_command('init_permissions', stdout=out)
+        # 视图中使用的权限代码自动补充
+        self.assertTrue(Permission.objects.filter(codename='permission_view').exists())
+        count = Permission.objects.count()
+        out = io.StringIO()
+        call_command('init_permissions', stdout=out)
+        self.assertIn('新建: 0 个, 更新: 0 个, 删除: 0 个', out.getvalue())
+        self.assertEqual(Permission.objects.count(), count)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class PermissionRegistryTests(TestCase):
+    """@has_permission 登记的权限代码和按位掩码的权限检查"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('viewer', 'viewer@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_registry(self):
+        registry = PermissionRegistry()
+        self.assertEqual(registry.register('b_view'), 0)
+        self.assertEqual(registry.intern('a_view'), 1)
+        self.assertEqual(registry.register('b_view'), 0)
+        self.assertEqual(registry.mask(['a_view', 'b_view']), 0b11)
+        self.assertEqual(registry.codenames_in(0b10), ['a_view'])
+        # 只有被装饰器使用过的权限代码才出现在 registered() 中
+        self.assertEqual(list(registry.registered()), ['b_view'])
+
+    def test_permission_check(self):
+        self.assertEqual(self.client.get('/api/v1/permissions/registry').status_code, 403)
+        role = Role.objects.create(name='auditor')
+        permission = Permission.objects.create(codename='permission_view', name='查看权限')
+        RolePermission.objects.create(role=role, permission=permission)
+        UserRole.objects.create(user=self.user, role=role)
+
+        response = self.client.get('/api/v1/permissions/registry')
+        self.assertEqual(response.status_code, 200)
+        entries = {entry['codename']: entry for entry in response.json()}
+        self.assertTrue(entries['permission_view']['synced'])
+        self.assertIn('rbac.views.PermissionViewSet.registry', entries['permission_view']['views'])
+        self.assertEqual(self.client.get('/api/v1/users').status_code, 403)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class UserExportTests(TestCase):
+    """用户和用户角色的流式导出"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_authenticate(self.admin)
+        UserRole.objects.create(user=self.admin, role=Role.objects.create(name='editor'))
+
+    def test_users_csv(self):
+        response = self.client.get('/api/v1/users/export', {'fmt': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,username,email,first_name,last_name,is_active,is_staff,date_joined')
+        self.assertTrue(lines[1].startswith(f'{self.admin.pk},admin,admin@example.com,'))
+        self.assertNotIn('password', b''.join(self.client.get('/api/v1/users/export').streaming_content).decode())
+
+    def test_user_roles_ndjson(self):
+        response = self.client.get('/api/v1/user-roles/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('"role_name": "editor"', b''.join(response.streaming_content).decode())
+
+
+class SQLitePragmaTests(TestCase):
+    """SQLite 连接建立时设置的 PRAGMA"""
+
+    def test_pragmas_applied(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('只适用于 SQLite')
+        # 测试数据库的连接建立时已经执行过 apply_sqlite_pragmas
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA busy_timeout = 1234')
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': settings.SQLITE_PRAGMAS['busy_timeout']}):
+            apply_sqlite_pragmas(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    """只读副本的读取路由"""
+
+    def test_reads_routed_only_when_enabled(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(User))
+        with use_replica_for_reads():
+            self.assertEqual(router.db_for_read(User), 'replica')
+            # 写入后同一请求的读取回到主库
+            router.db_for_write(User)
+            self.assertIsNone(router.db_for_read(User))
+        self.assertIsNone(router.db_for_read(User))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        with use_replica_for_reads():
+            self.assertIsNone(ReplicaRouter().db_for_read(User))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, DATABASE_REPLICAS=['replica'])
+class ReplicaPinTests(TestCase):
+    """写请求后把读取固定到主库"""
+
+    def test_write_sets_pin_cookie(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = client.post('/api/v1/roles', {'name': 'editor'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+
+
+class QueryPlanAuditTests(TestCase):
+    """热点查询的执行计划检查"""
+
+    def test_find_plan_issues(self):
+        plan = (
+            '3 0 0 SCAN links\n'
+            '5 0 0 SCAN links USING INDEX links_order_sort_idx\n'
+            '9 0 0 USE TEMP B-TREE FOR ORDER BY'
+        )
+        self.assertEqual(find_plan_issues(plan, 'sqlite'), [
+            ('全表扫描', '3 0 0 SCAN links'),
+            ('临时B树', '9 0 0 USE TEMP B-TREE FOR ORDER BY'),
+        ])
+
+    def test_registered_queries_use_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('PostgreSQL 在空表上总是选择全表扫描')
+        out = io.StringIO()
+        call_command('audit_query_plans', '--fail-on-issues', stdout=out)
+        self.assertIn('存在问题: 0 个', out.getvalue())
+
+
+class CredentialPoolTests(SimpleTestCase):
+    """有界的凭据校验线程池"""
+
+    def test_rejects_when_full(self):
+        pool = CredentialPool(max_workers=1, max_pending=2)
+        release = threading.Event()
+        futures = [pool.submit(release.wait, 5) for _ in range(2)]
+        with self.assertRaises(LoginOverloaded):
+            pool.submit(release.wait, 5)
+        release.set()
+        for future in futures:
+            self.assertTrue(future.result())
+        self.assertEqual(pool.call(lambda: 42), 42)
+        self.assertEqual(pool.pending, 0)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class LoginTests(TransactionTestCase):
+    """登录在凭据校验线程池中完成（工作线程使用独立的数据库连接，数据需要提交）"""
+
+    def setUp(self):
+        User.objects.create_user('alice', 'alice@example.com', 'secret')
+
+    def test_login(self):
+        client = APIClient()
+        response = client.post('/api/v1/users/login', {'username': 'alice', 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['username'], 'alice')
+        self.assertIn('access', response.json())
+        response = client.post('/api/v1/users/login', {'username': 'alice', 'password': 'wrong'}, format='json')
+        self.assertEqual(response.status_code, 401)
+        response = client.post('/api/v1/token', {'username': 'alice', 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+class VerifiedTokenCacheTests(SimpleTestCase):
+    """已验证 JWT 的 LRU 缓存"""
+
+    def test_lru_and_expiry(self):
+        cache = VerifiedTokenCache(max_size=2, shards=1)
+        keys = [cache.digest(f'token{index}') for index in range(3)]
+        now = time.time()
+        cache.set(keys[0], AccessToken, {'n': 0}, now + 60)
+        cache.set(keys[1], AccessToken, {'n': 1}, now + 60)
+        self.assertEqual(cache.get(keys[0]), (AccessToken, {'n': 0}))
+        # 超出容量时淘汰最久未使用的条目
+        cache.set(keys[2], AccessToken, {'n': 2}, now + 60)
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNone(cache.get(keys[2], now=now + 61))
+        self.assertEqual(cache.stats()['size'], 1)
+        self.assertEqual((cache.stats()['hits'], cache.stats()['misses']), (1, 2))
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class CachedJWTAuthenticationTests(TestCase):
+    """带验签缓存的 JWT 认证"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.authentication = CachedJWTAuthentication()
+        self.authentication.cache = VerifiedTokenCache(max_size=10, shards=2)
+
+    def authenticate(self, raw_token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {raw_token}')
+        return self.authentication.authenticate(request)
+
+    def test_cache_hit_returns_same_claims(self):
+        raw_token = str(AccessToken.for_user(self.user))
+        user, token = self.authenticate(raw_token)
+        cached_user, cached_token = self.authenticate(raw_token)
+        self.assertEqual(cached_user, self.user)
+        self.assertEqual(cached_token.payload, token.payload)
+        self.assertIsNot(cached_token.payload, token.payload)
+        self.assertEqual(self.authentication.cache.stats()['hits'], 1)
+
+    def test_invalid_tokens_are_not_cached(self):
+        raw_token = str(AccessToken.for_user(self.user))[:-2] + 'xx'
+        for _ in range(2):
+            with self.assertRaises(InvalidToken):
+                self.authenticate(raw_token)
+        self.assertEqual(self.authentication.cache.stats()['size'], 0)
+
+
+class BloomFilterTests(SimpleTestCase):
+    """撤销列表使用的布隆过滤器"""
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for index in range(1000):
+            bloom.add(f'added{index}')
+        self.assertTrue(all(f'added{index}' in bloom for index in range(1000)))
+        false_positives = sum(f'other{index}' in bloom for index in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class TokenRevocationTests(TestCase):
+    """刷新令牌的轮换和撤销"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'secret')
+        self.client = APIClient()
+        revocation_list.reset()
+        self.addCleanup(revocation_list.reset)
+
+    def refresh(self, token):
+        return self.client.post('/api/v1/token/refresh', {'refresh': str(token)}, format='json')
+
+    def test_rotation_rejects_reuse(self):
+        refresh = RefreshToken.for_user(self.user)
+        response = self.refresh(refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+        self.assertEqual(self.refresh(response.json()['refresh']).status_code, 200)
+
+    def test_revoke(self):
+        refresh = RefreshToken.for_user(self.user)
+        response = self.client.post('/api/v1/token/revoke', {'refresh': str(refresh)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_syncs_revocations_from_other_processes(self):
+        revocations = RevocationList(capacity=100, sync_interval=0)
+        self.assertFalse(revocations.is_revoked('a'))
+        RevokedToken.objects.create(jti='a', expires_at=timezone.now() + timedelta(days=1))
+        self.assertTrue(revocations.is_revoked('a'))
+        self.assertFalse(revocations.revoke('a', timezone.now() + timedelta(days=1)))
+        self.assertTrue(revocations.revoke('b', timezone.now() + timedelta(days=1)))
@@ -1,10 +1,12 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from .views import (
     UserViewSet, RoleViewSet, PermissionViewSet,
     RolePermissionViewSet, UserRoleViewSet, 
-    CustomTokenObtainPairView, CustomTokenRefreshView
+    CustomTokenObtainPairView, CustomTokenRefreshView, CustomTokenRevokeView,
+    TokenCacheStatsView
 )
 
 router = DefaultRouter(trailing_slash=False)
@@ -14,8 +16,21 @@ router.register(r'permissions', PermissionViewSet, basename='permission')
 router.register(r'role-permissions', RolePermissionViewSet, basename='role-permission')
 router.register(r'user-roles', UserRoleViewSet, basename='user-role')
 
-urlpatterns = [
+urlpatterns = []
+
+# ASGI 部署时启用，登录和获取令牌由异步视图在凭据校验线程池中完成
+if settings.ASYNC_LOGIN:
+    from .async_views import AsyncLoginView, AsyncTokenObtainPairView
+
+    urlpatterns += [
+        path('users/login', AsyncLoginView.as_view(), name='user-login-async'),
+        path('token', AsyncTokenObtainPairView.as_view(), name='token_obtain_pair_async'),
+    ]
+
+urlpatterns += [
     path('', include(router.urls)),
     path('token', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh', CustomTokenRefreshView.as_view(), name='token_refresh'),
+    path('token/revoke', CustomTokenRevokeView.as_view(), name='token_revoke'),
+    path('token/cache', TokenCacheStatsView.as_view(), name='token_cache_stats'),
 ] 
\ No newline at end of file
@@ -1,30 +1,89 @@
+from itertools import islice
+
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenViewBase
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.db.models import F
 from drf_yasg import openapi
 
 # 导入自定义文档装饰器
 from utils.swagger import (
     api_docs, list_api_docs, create_api_docs, retrieve_api_docs,
-    update_api_docs, partial_update_api_docs, destroy_api_docs
+    update_api_docs, partial_update_api_docs, destroy_api_docs,
+    EXPORT_FORMAT_PARAMETER
 )
+from utils.db import ReplicaReadMixin
+from utils.fieldsets import SparseFieldsetViewMixin
+from utils.projection import ProjectionListMixin
+from utils.streaming import EXPORT_FORMATS, export_response, guess_format, iter_records
 
 # 导入权限装饰器
+from .auth_pool import get_credential_pool
+from .authentication import token_cache
 from .decorators import has_permission, self_or_admin
+from .importers import UserImporter
+from .registry import permission_registry, autodiscover
 
 from .models import User, Role, Permission, RolePermission, UserRole
 from .serializers import (
     UserSerializer, RoleSerializer, PermissionSerializer,
     RolePermissionSerializer, UserRoleSerializer,
-    UserLoginSerializer, ChangePasswordSerializer
+    UserLoginSerializer, ChangePasswordSerializer, TokenRevokeSerializer
 )
 
 
-class UserViewSet(viewsets.ModelViewSet):
+def perform_login(data):
+    """
+    校验用户名和密码并签发令牌
+
+    在凭据校验线程池中执行，同步和异步登录视图共用。
+
+    返回:
+        (响应数据, 状态码)
+    """
+    serializer = UserLoginSerializer(data=data)
+    if not serializer.is_valid():
+        return serializer.errors, status.HTTP_400_BAD_REQUEST
+    
+    username = serializer.validated_data['username']
+    password = serializer.validated_data['password']
+    user = authenticate(username=username, password=password)
+    
+    if not user:
+        return {'detail': '无效的凭据'}, status.HTTP_401_UNAUTHORIZED
+    
+    refresh = RefreshToken.for_user(user)
+    user_serializer = UserSerializer(user)
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+        'user': user_serializer.data
+    }, status.HTTP_200_OK
+
+
+def perform_token_obtain(serializer_class, data):
+    """
+    使用 simplejwt 的序列化器校验凭据并签发令牌
+
+    在凭据校验线程池中执行，同步和异步令牌视图共用。
+    """
+    serializer = serializer_class(data=data)
+    try:
+        serializer.is_valid(raise_exception=True)
+    except TokenError as e:
+        raise InvalidToken(e.args[0])
+    return serializer.validated_data
+
+
+class UserViewSet(ProjectionListMixin, SparseFieldsetViewMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     用户管理API
     
@@ -32,6 +91,7 @@ class UserViewSet(viewsets.ModelViewSet):
     """
     queryset = User.objects.all().order_by('id')
     serializer_class = UserSerializer
+    replica_read_actions = ('list', 'retrieve', 'export')
     
     def get_permissions(self):
         """
@@ -79,6 +139,77 @@ class UserViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
     
+    @api_docs(
+        summary='导出用户',
+        description='以NDJSON或CSV流式导出全部用户，需要user_view权限',
+        manual_parameters=[EXPORT_FORMAT_PARAMETER]
+    )
+    @action(detail=False, methods=['get'])
+    @has_permission('user_view')
+    def export(self, request):
+        columns = ['id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'date_joined']
+        queryset = self.filter_queryset(self.get_queryset()).values(*columns)
+        return export_response(request, queryset, columns, 'users')
+    
+    @api_docs(
+        summary='批量导入用户',
+        description='上传CSV或NDJSON文件批量创建用户，roles列为以分号分隔的角色名称。出错的行（包括不是有效UTF-8的行）'
+                    '会被跳过并在结果中列出；超过 USER_IMPORT_MAX_ROWS 行的文件返回400，需使用 import_users 命令导入。'
+                    '需要user_create权限',
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True, description='导入文件'),
+            openapi.Parameter('fmt', openapi.IN_FORM, type=openapi.TYPE_STRING, enum=['ndjson', 'csv'],
+                              description='文件格式，默认根据扩展名判断'),
+        ],
+        responses={
+            200: openapi.Response(
+                description='导入完成',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'created': openapi.Schema(type=openapi.TYPE_INTEGER, description='新建用户数'),
+                        'errors': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'line': openapi.Schema(type=openapi.TYPE_INTEGER, description='行号'),
+                                    'detail': openapi.Schema(type=openapi.TYPE_STRING, description='错误信息'),
+                                }
+                            )
+                        ),
+                    }
+                )
+            )
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    @has_permission('user_create')
+    def import_users(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'detail': '请上传导入文件'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        fmt = request.data.get('fmt') or guess_format(upload.name)
+        if fmt not in EXPORT_FORMATS:
+            return Response({'detail': f'不支持的导入格式: {fmt}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # 密码哈希在当前请求内逐批计算，每个哈希耗时数百毫秒，只接受有限行数的文件；
+        # 请求内不能启动进程池（gunicorn/uvicorn 的工作进程中创建子进程不安全）
+        max_rows = settings.USER_IMPORT_MAX_ROWS
+        records = list(islice(iter_records(upload.file, fmt), max_rows + 1))
+        if len(records) > max_rows:
+            return Response(
+                {'detail': f'导入文件超过 {max_rows} 行，请使用 python manage.py import_users 命令导入'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        result = UserImporter(batch_size=settings.USER_IMPORT_BATCH_SIZE, workers=0).run(records)
+        return Response({
+            'created': result.created,
+            'errors': [{'line': line_no, 'detail': message} for line_no, message in result.errors]
+        })
+    
     @api_docs(
         summary='用户登录',
         description='通过用户名和密码登录，返回JWT令牌和用户信息',
@@ -113,27 +244,9 @@ class UserViewSet(viewsets.ModelViewSet):
     )
     @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny])
     def login(self, request):
-        serializer = UserLoginSerializer(data=request.data)
-        if serializer.is_valid():
-            username = serializer.validated_data['username']
-            password = serializer.validated_data['password']
-            user = authenticate(username=username, password=password)
-            
-            if user:
-                refresh = RefreshToken.for_user(user)
-                user_serializer = UserSerializer(user)
-                return Response({
-                    'refresh': str(refresh),
-                    'access': str(refresh.access_token),
-                    'user': user_serializer.data
-                })
-            
-            return Response(
-                {'detail': '无效的凭据'},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
-        
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # 密码哈希在有界线程池中计算，排队过多时直接返回503
+        payload, status_code = get_credential_pool().call(perform_login, request.data)
+        return Response(payload, status=status_code)
     
     @api_docs(
         summary='修改密码',
@@ -162,7 +275,7 @@ class UserViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class RoleViewSet(viewsets.ModelViewSet):
+class RoleViewSet(SparseFieldsetViewMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     角色管理API
     
@@ -204,7 +317,7 @@ class RoleViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
 
-class PermissionViewSet(viewsets.ModelViewSet):
+class PermissionViewSet(SparseFieldsetViewMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     权限管理API
     
@@ -212,6 +325,7 @@ class PermissionViewSet(viewsets.ModelViewSet):
     """
     queryset = Permission.objects.all().order_by('id')
     serializer_class = PermissionSerializer
+    replica_read_actions = ('list', 'retrieve', 'registry')
     
     def get_permissions(self):
         return [permissions.IsAuthenticated()]
@@ -246,7 +360,50 @@ class PermissionViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
 
-class RolePermissionViewSet(viewsets.ModelViewSet):
+    @api_docs(
+        summary='权限注册表',
+        description='列出视图中通过 @has_permission 使用的所有权限代码，以及它们是否已同步到数据库',
+        responses={
+            200: openapi.Response(
+                description='获取成功',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'id': openapi.Schema(type=openapi.TYPE_INTEGER, description='权限位编号'),
+                            'codename': openapi.Schema(type=openapi.TYPE_STRING, description='权限代码'),
+                            'views': openapi.Schema(
+                                type=openapi.TYPE_ARRAY,
+                                items=openapi.Schema(type=openapi.TYPE_STRING),
+                                description='使用该权限的视图'
+                            ),
+                            'synced': openapi.Schema(type=openapi.TYPE_BOOLEAN, description='是否已存在于权限表'),
+                        }
+                    )
+                )
+            )
+        }
+    )
+    @action(detail=False, methods=['get'])
+    @has_permission('permission_view')
+    def registry(self, request):
+        autodiscover()
+        registered = permission_registry.registered()
+        synced = set(
+            Permission.objects.filter(codename__in=list(registered)).values_list('codename', flat=True)
+        )
+        return Response([
+            {
+                'id': permission_registry.intern(codename),
+                'codename': codename,
+                'views': views,
+                'synced': codename in synced,
+            }
+            for codename, views in registered.items()
+        ])
+
+class RolePermissionViewSet(ProjectionListMixin, SparseFieldsetViewMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     角色权限管理API
     
@@ -254,6 +411,7 @@ class RolePermissionViewSet(viewsets.ModelViewSet):
     """
     queryset = RolePermission.objects.all().order_by('id')
     serializer_class = RolePermissionSerializer
+    replica_read_actions = ('list', 'retrieve', 'export')
     
     def get_permissions(self):
         return [permissions.IsAuthenticated()]
@@ -287,8 +445,24 @@ class RolePermissionViewSet(viewsets.ModelViewSet):
     @has_permission('role_permission_delete')
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
+    
+    @api_docs(
+        summary='导出角色权限关联',
+        description='以NDJSON或CSV流式导出全部角色权限关联，需要role_permission_view权限',
+        manual_parameters=[EXPORT_FORMAT_PARAMETER]
+    )
+    @action(detail=False, methods=['get'])
+    @has_permission('role_permission_view')
+    def export(self, request):
+        columns = ['id', 'role', 'role_name', 'permission', 'permission_name']
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            'id', 'role', 'permission',
+            role_name=F('role__name'),
+            permission_name=F('permission__name')
+        )
+        return export_response(request, queryset, columns, 'role_permissions')
 
-class UserRoleViewSet(viewsets.ModelViewSet):
+class UserRoleViewSet(ProjectionListMixin, SparseFieldsetViewMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     用户角色管理API
     
@@ -296,6 +470,7 @@ class UserRoleViewSet(viewsets.ModelViewSet):
     """
     queryset = UserRole.objects.all().order_by('id')
     serializer_class = UserRoleSerializer
+    replica_read_actions = ('list', 'retrieve', 'export')
     
     def get_permissions(self):
         return [permissions.IsAuthenticated()]
@@ -329,6 +504,22 @@ class UserRoleViewSet(viewsets.ModelViewSet):
     @has_permission('user_role_delete')
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
+    
+    @api_docs(
+        summary='导出用户角色关联',
+        description='以NDJSON或CSV流式导出全部用户角色关联，需要user_role_view权限',
+        manual_parameters=[EXPORT_FORMAT_PARAMETER]
+    )
+    @action(detail=False, methods=['get'])
+    @has_permission('user_role_view')
+    def export(self, request):
+        columns = ['id', 'user', 'username', 'role', 'role_name']
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            'id', 'user', 'role',
+            username=F('user__username'),
+            role_name=F('role__name')
+        )
+        return export_response(request, queryset, columns, 'user_roles')
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     """
@@ -356,7 +547,9 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         }
     )
     def post(self, request, *args, **kwargs):
-        return super().post(request, *args, **kwargs)
+        # 密码哈希在有界线程池中计算，排队过多时直接返回503
+        data = get_credential_pool().call(perform_token_obtain, self.get_serializer_class(), request.data)
+        return Response(data, status=status.HTTP_200_OK)
 
 class CustomTokenRefreshView(TokenRefreshView):
     """
@@ -376,11 +569,63 @@ class CustomTokenRefreshView(TokenRefreshView):
                     type=openapi.TYPE_OBJECT,
                     properties={
                         'access': openapi.Schema(type=openapi.TYPE_STRING, description='新的访问令牌'),
+                        'refresh': openapi.Schema(type=openapi.TYPE_STRING, description='新的刷新令牌，旧的刷新令牌随即失效'),
                     }
                 )
             ),
+            401: '无效或已撤销的刷新令牌'
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
+class CustomTokenRevokeView(TokenViewBase):
+    """
+    撤销刷新令牌API
+    
+    退出登录时撤销刷新令牌，之后无法再用它换取新的访问令牌
+    """
+    serializer_class = TokenRevokeSerializer
+
+    @api_docs(
+        summary='撤销刷新令牌',
+        description='撤销指定的刷新令牌，已签发的访问令牌在过期前仍然有效',
+        security=False,
+        request_body=TokenRevokeSerializer,
+        responses={
+            200: '撤销成功',
             401: '无效的刷新令牌'
         }
     )
     def post(self, request, *args, **kwargs):
         return super().post(request, *args, **kwargs)
+
+
+class TokenCacheStatsView(APIView):
+    """
+    JWT验签缓存统计API
+
+    查看当前进程中已验证访问令牌缓存的条目数和命中情况
+    """
+    @api_docs(
+        summary='JWT验签缓存统计',
+        description='返回当前进程中访问令牌验签缓存的条目数、命中次数和未命中次数',
+        responses={
+            200: openapi.Response(
+                description='获取成功',
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'size': openapi.Schema(type=openapi.TYPE_INTEGER, description='当前条目数'),
+                        'max_size': openapi.Schema(type=openapi.TYPE_INTEGER, description='条目数上限'),
+                        'hits': openapi.Schema(type=openapi.TYPE_INTEGER, description='命中次数'),
+                        'misses': openapi.Schema(type=openapi.TYPE_INTEGER, description='未命中次数'),
+                        'hit_rate': openapi.Schema(type=openapi.TYPE_NUMBER, description='命中率'),
+                    }
+                )
+            )
+        }
+    )
+    @has_permission('permission_view')
+    def get(self, request):
+        return Response(token_cache.stats())
@@ -0,0 +1,121 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+# 写入后把读取固定到主库的 Cookie 名称
+REPLICA_PIN_COOKIE = 'db_pin'
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    connection_created 信号处理函数，为新建的 SQLite 连接设置 PRAGMA
+
+    PRAGMA 来自 settings.SQLITE_PRAGMAS，只在连接建立时执行一次；
+    配合 CONN_MAX_AGE 持久连接，请求处理过程中不会重复执行。
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+# 当前请求的读取是否允许路由到只读副本，由 ReplicaReadMixin 设置
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def _replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class ReplicaRouter:
+    """
+    读写分离数据库路由
+
+    写入始终使用 default。只有 ReplicaReadMixin 标记为可读副本的请求，
+    其读取才会随机分发到 settings.DATABASE_REPLICAS 中的某个别名；
+    一旦请求中发生写入，或者处于事务中，后续读取都回到 default，保证读到自己的写入。
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = _replica_aliases()
+        if not replicas or not _use_replica.get():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # 请求中发生写入后固定到主库
+        _use_replica.set(False)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本与主库数据相同，允许跨别名的关联
+        return True
+
+
+@contextmanager
+def use_replica_for_reads(enabled=True):
+    """在代码块内允许读取路由到只读副本，用于不经过 ReplicaReadMixin 的视图"""
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def pin_to_primary(request, response):
+    """写入后在 REPLICA_PIN_SECONDS 内把该用户（或浏览器会话）的读取固定到主库"""
+    seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        cache.set(f'db_pin:user:{user.pk}', True, seconds)
+    response.set_cookie(REPLICA_PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+
+
+def is_pinned_to_primary(request):
+    if request.COOKIES.get(REPLICA_PIN_COOKIE):
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_authenticated and cache.get(f'db_pin:user:{user.pk}', False)
+
+
+class ReplicaReadMixin:
+    """
+    视图集混入类：让指定动作的安全方法请求从只读副本读取
+
+    使用方式：
+    class LinksView(ReplicaReadMixin, ModelViewSet):
+        replica_read_actions = ('list', 'retrieve')
+
+    写请求完成后会把当前用户固定到主库一小段时间，避免紧接着的读取读不到刚写入的数据。
+    """
+    replica_read_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # 认证完成后才能判断用户是否被固定到主库
+        use_replica = (
+            request.method in SAFE_METHODS
+            and self.action in self.replica_read_actions
+            and not is_pinned_to_primary(request)
+        )
+        self._replica_token = _use_replica.set(use_replica)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _use_replica.reset(token)
+            self._replica_token = None
+        if request.method not in SAFE_METHODS and _replica_aliases():
+            pin_to_primary(request, response)
+        return response
@@ -0,0 +1,125 @@
+import math
+import re
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 未安装时回退到标准库 json
+    orjson = None
+
+# datetime、date、time 交给 DRF 的编码器处理，保证与 JSONRenderer 的输出一致（UTC 写成 Z）
+ORJSON_OPTIONS = 0
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+_LINE_SEPARATOR = '\u2028'.encode()
+_PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+_encoder_default = JSONEncoder().default
+
+# orjson 输出中可能与 JSONRenderer 不同的片段：指数形式的数字写作 e 后接数字或负号（1e16、1e-7），
+# 1e-6 到 1e-4 之间的数字写作 0.0000 开头的小数（0.00001，json 为 1e-05），NaN 和 Infinity 写作 null。
+# 字符串中的相同片段只会多触发一次精确检查，不影响结果
+_EXPONENT = re.compile(rb'e[-0-9]')
+_SMALL_DECIMAL = b'0.0000'
+_NULL = b'null'
+
+
+class _Incompatible(Exception):
+    """数据中有 orjson 与 JSONRenderer 输出不同的值，需要回退"""
+
+
+def _has_incompatible_float(data):
+    """
+    数据中是否有 orjson 与 JSONRenderer 输出不同的浮点数
+
+    repr 使用指数形式的浮点数（|x| >= 1e16 或 0 < |x| < 1e-4）orjson 的写法不同，例如 1e16、1e-7、0.00001
+    （json 为 1e+16、1e-07、1e-05）；NaN 和 Infinity orjson 输出 null，JSONRenderer 则拒绝编码。
+    只比较大小，不格式化数字。需要在 Python 中遍历全部数据，只在 orjson 的输出中出现可疑片段时调用。
+    """
+    stack = [[data]]
+    while stack:
+        value = stack.pop()
+        for item in (value.values() if isinstance(value, dict) else value):
+            kind = type(item)
+            if kind is str or kind is int or kind is bool or item is None:
+                continue
+            if kind is float or isinstance(item, float):
+                magnitude = abs(item)
+                # NaN 与任何数比较都不成立
+                if not (magnitude == 0 or 1e-4 <= magnitude < 1e16):
+                    return True
+            elif isinstance(item, (dict, list, tuple)):
+                stack.append(item)
+    return False
+
+
+def _default(obj):
+    # DRF 的编码器把 Decimal 转为 float，转换得到的值同样需要检查：渲染后的遍历只检查原始数据
+    value = _encoder_default(obj)
+    if type(value) is float:
+        if not (value == 0 or (math.isfinite(value) and 1e-4 <= abs(value) < 1e16)):
+            raise _Incompatible
+    elif isinstance(value, (dict, list, tuple)) and _has_incompatible_float(value):
+        raise _Incompatible
+    return value
+
+
+def _may_be_incompatible(ret):
+    """orjson 的输出中是否有可能与 JSONRenderer 不同的片段，只在 C 中扫描字节，没有时不需要遍历数据"""
+    return _NULL in ret or _SMALL_DECIMAL in ret or _EXPONENT.search(ret) is not None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    使用 orjson 的 JSON 渲染器
+
+    在紧凑输出、ensure_ascii 关闭的默认配置下，输出与 DRF 的 JSONRenderer 逐字节一致：
+    orjson 无法直接编码的对象（datetime、Decimal、惰性翻译字符串等）交给 DRF 的编码器转换，
+    \\u2028 和 \\u2029 同样转义。需要缩进、ASCII 转义或 orjson 无法编码（如超过64位的整数）时，
+    数据中有 repr 使用指数形式的浮点数或 NaN、Infinity 时，以及未安装 orjson 时，回退到 JSONRenderer。
+    先用 orjson 编码，只有输出中出现 null 或指数形式的片段时才遍历数据精确检查浮点数，
+    常见的没有空值的负载不需要在 Python 中遍历。
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if _may_be_incompatible(ret) and _has_incompatible_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if _LINE_SEPARATOR in ret or _PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(_LINE_SEPARATOR, b'\\u2028').replace(_PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """
+    使用 orjson 的 JSON 解析器
+
+    请求体为 UTF-8 时直接用 orjson 解析，其他编码以及未安装 orjson 时回退到 JSONParser。
+    orjson 本身拒绝 NaN 和 Infinity，与 STRICT_JSON 下的行为一致。
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
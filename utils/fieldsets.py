@@ -0,0 +1,139 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.relations import ManyRelatedField
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_field_list(value):
+    """把逗号分隔的参数解析为字段名列表，参数不存在时返回 None"""
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def get_sparse_fieldset(query_params):
+    """
+    从查询参数中读取 ?fields= 和 ?expand=
+
+    返回:
+        (fields, expand)，未提供的参数为 None
+    """
+    return parse_field_list(query_params.get(FIELDS_PARAM)), parse_field_list(query_params.get(EXPAND_PARAM))
+
+
+class SparseFieldsetMixin:
+    """
+    序列化器的稀疏字段集支持
+
+    fields 只保留列出的字段（未知字段忽略）；expand 列出需要展开的关联字段，
+    只能取 expandable_fields 中声明的字段。两个参数都未提供时保持原有输出，
+    展开 default_expand 中的字段。
+
+    project_queryset 根据裁剪后的字段生成 only()、select_related 和 prefetch，
+    只读取响应中实际用到的列。
+
+    类属性:
+        expandable_fields: {字段名: 展开时需要读取的关联模型列}
+        default_expand: 未提供 fields 和 expand 时默认展开的字段
+    """
+    expandable_fields = {}
+    default_expand = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            self.expanded = set(self.default_expand)
+        else:
+            self.expanded = set(expand or ()) & set(self.expandable_fields)
+
+        if fields is not None:
+            allowed = set(fields)
+            for name in list(self.fields):
+                if name not in allowed:
+                    self.fields.pop(name)
+
+    def is_expanded(self, name):
+        return name in self.expanded and name in self.fields
+
+    def project_queryset(self, queryset):
+        """
+        按当前字段裁剪查询集
+
+        字段来源无法映射到模型字段（如方法字段、属性）时不使用 only()，
+        但仍然只为用到的关联字段做 select_related 和 prefetch。
+        """
+        model = queryset.model
+        columns = {model._meta.pk.name}
+        select_related = set()
+        prefetches = []
+        projectable = True
+
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            source = field.source
+            if source == '*':
+                projectable = False
+                continue
+
+            parts = source.split('.')
+            try:
+                model_field = model._meta.get_field(parts[0])
+            except FieldDoesNotExist:
+                projectable = False
+                continue
+
+            if isinstance(field, ManyRelatedField) or model_field.many_to_many:
+                related_model = model_field.related_model
+                related_columns = self.expandable_fields.get(name, ()) if self.is_expanded(name) else ()
+                related_columns = {related_model._meta.pk.name, *related_columns}
+                prefetches.append(Prefetch(parts[0], queryset=related_model.objects.only(*related_columns)))
+            elif len(parts) > 1 and model_field.is_relation:
+                select_related.add(parts[0])
+                columns.update((parts[0], '__'.join(parts)))
+            else:
+                columns.add(parts[0])
+
+        queryset = queryset.prefetch_related(None).select_related(None)
+        if select_related:
+            queryset = queryset.select_related(*sorted(select_related))
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        if projectable:
+            queryset = queryset.only(*sorted(columns))
+        return queryset
+
+
+class SparseFieldsetViewMixin:
+    """
+    视图集的稀疏字段集支持
+
+    sparse_fieldset_actions 中的动作从请求参数读取 ?fields= 和 ?expand=，
+    传给序列化器并按序列化器裁剪后的字段调整查询集；写操作不受影响。
+    """
+    sparse_fieldset_actions = ('list', 'retrieve')
+
+    def get_sparse_fieldset(self):
+        if getattr(self, 'action', None) not in self.sparse_fieldset_actions:
+            return None
+        return get_sparse_fieldset(self.request.query_params)
+
+    def get_serializer(self, *args, **kwargs):
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is not None:
+            kwargs.setdefault('fields', fieldset[0])
+            kwargs.setdefault('expand', fieldset[1])
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is None:
+            return queryset
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, SparseFieldsetMixin):
+            return queryset
+        serializer = serializer_class(fields=fieldset[0], expand=fieldset[1], context=self.get_serializer_context())
+        return serializer.project_queryset(queryset)
@@ -0,0 +1,186 @@
+from django.db.models import Exists, OuterRef
+from rest_framework.exceptions import ParseError
+from rest_framework.filters import BaseFilterBackend
+
+TRUE_VALUES = frozenset({'true', '1', 'yes'})
+FALSE_VALUES = frozenset({'false', '0', 'no'})
+# 排序相同时按主键排序，保证分页稳定；索引的排序字段后需要跟着主键
+TIEBREAKER = 'id'
+
+
+def parse_boolean(name, value):
+    value = value.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ParseError(f'{name} 只能是 true 或 false')
+
+
+def index_combinations(model, filter_fields, ordering_fields):
+    """
+    列出模型的索引支持的（过滤字段集合, 排序字段）组合
+
+    字段为 (过滤字段..., 排序字段, id) 的索引支持这组过滤字段按该字段正序或倒序排列：
+    过滤字段是等值条件，排在索引前面，SQL 直接按索引顺序读取一段，不需要额外排序。
+    部分索引（带 condition）只用于固定条件的查询，不参与匹配。
+
+    返回:
+        [(frozenset(过滤字段), 排序字段)]，按索引声明的顺序
+    """
+    filter_fields = set(filter_fields)
+    combinations = []
+    for index in model._meta.indexes:
+        if index.condition is not None or index.expressions:
+            continue
+        fields = [field.lstrip('-') for field in index.fields]
+        for size in range(len(fields) - 1):
+            prefix = set(fields[:size])
+            if not prefix <= filter_fields or len(prefix) != size:
+                break
+            if fields[size] in ordering_fields and fields[size + 1:size + 2] == [TIEBREAKER]:
+                combination = (frozenset(prefix), fields[size])
+                if combination not in combinations:
+                    combinations.append(combination)
+    return combinations
+
+
+def related_filter(model, name, value):
+    """
+    多对多字段的过滤条件：EXISTS (SELECT 1 FROM 关联表 WHERE 本表ID = 外层ID AND 关联ID = value)
+
+    不使用 JOIN：联表时数据库会先按关联ID从关联表取出记录，再对结果临时排序。
+    改为相关子查询后，数据库仍按复合索引的顺序读取，逐行用关联表的 (本表ID, 关联ID) 唯一索引判断，
+    排序继续由索引提供，读满一页即可停止。
+    """
+    field = model._meta.get_field(name)
+    through = field.remote_field.through
+    return Exists(through.objects.filter(**{
+        field.m2m_field_name(): OuterRef('pk'),
+        field.m2m_reverse_field_name(): value,
+    }))
+
+
+def describe_combinations(combinations):
+    groups = {}
+    for filters, ordering in combinations:
+        groups.setdefault(filters, []).append(ordering)
+    return '; '.join(
+        f'{"+".join(sorted(filters)) or "不过滤"}: {", ".join(orderings)}'
+        for filters, orderings in groups.items()
+    )
+
+
+class IndexedFilterBackend(BaseFilterBackend):
+    """
+    只允许有索引支持的过滤和排序
+
+    视图通过以下属性声明可用的查询参数：
+        index_filter_fields: 布尔字段，?is_show=true 等值过滤，与排序字段组成复合索引
+        related_filter_fields: 多对多字段，?tags=<ID> 可以与任意支持的组合同时使用，见 related_filter
+        ordering_fields: ?ordering=字段 或 ?ordering=-字段 可以排序的字段，每次只能按一个字段排序
+        ordering: 未提供 ?ordering= 时的排序字段，保证分页稳定
+        implied_filters: {过滤字段: {其他过滤字段: 值}}，提供该过滤字段而没有提供其他字段时补充的条件，
+            用于没有以该字段开头的索引的过滤（例如 is_recommend 只在 is_show 之后建索引）
+
+    过滤和排序的组合必须有对应的复合索引（见 index_combinations），否则返回 400，
+    客户端无法触发全表排序。布尔过滤编译为 IN 而不是 Django 默认的 WHERE "字段"，
+    这样数据库才会把它当作等值条件使用复合索引的前缀列。只作用于 list。
+    """
+    ordering_param = 'ordering'
+
+    def get_default_ordering(self, view):
+        return getattr(view, 'ordering', None) or ''
+
+    def get_fields(self, view):
+        return (
+            tuple(getattr(view, 'index_filter_fields', ())),
+            tuple(getattr(view, 'related_filter_fields', ())),
+            tuple(getattr(view, 'ordering_fields', ())),
+        )
+
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, 'action', 'list') not in (None, 'list'):
+            return queryset
+        index_fields, related_fields, ordering_fields = self.get_fields(view)
+        params = request.GET
+
+        filters = {}
+        for name in index_fields:
+            if params.get(name, '') != '':
+                filters[name] = parse_boolean(name, params[name])
+        for name, implied in getattr(view, 'implied_filters', {}).items():
+            if name in filters:
+                for other, value in implied.items():
+                    filters.setdefault(other, value)
+        for name in related_fields:
+            if params.get(name, '') != '':
+                try:
+                    value = int(params[name])
+                except ValueError:
+                    raise ParseError(f'{name} 必须是整数ID')
+                queryset = queryset.filter(related_filter(queryset.model, name, value))
+
+        # 没有排序时分页的结果不确定，使用视图的默认排序（同样需要有索引支持）
+        ordering = params.get(self.ordering_param, '').strip() or self.get_default_ordering(view)
+        field = ordering.lstrip('-')
+        if ordering and field not in ordering_fields:
+            raise ParseError(f'不支持的排序字段: {ordering}，可选: {", ".join(ordering_fields)}')
+
+        combinations = index_combinations(queryset.model, index_fields, ordering_fields)
+        if field:
+            supported = (frozenset(filters), field) in combinations
+        else:
+            # 视图没有默认排序时只要求过滤字段是某个索引的前缀
+            supported = not filters or any(combination[0] == set(filters) for combination in combinations)
+        if not supported:
+            requested = '+'.join(sorted(filters)) or '不过滤'
+            raise ParseError(
+                f'没有索引支持的过滤和排序组合: {requested}, {ordering or "不排序"}。'
+                f'可用组合: {describe_combinations(combinations)}'
+            )
+
+        queryset = queryset.filter(**{f'{name}__in': [value] for name, value in filters.items()})
+        if field:
+            descending = ordering.startswith('-')
+            queryset = queryset.order_by(*(f'-{name}' if descending else name for name in (field, TIEBREAKER)))
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        index_fields, related_fields, ordering_fields = self.get_fields(view)
+        implied_filters = getattr(view, 'implied_filters', {})
+        parameters = [
+            {
+                'name': name,
+                'required': False,
+                'in': 'query',
+                'description': f'按 {name} 过滤' + ''.join(
+                    f'，未提供 {other} 时按 {other}={str(value).lower()} 过滤'
+                    for other, value in implied_filters.get(name, {}).items()
+                ),
+                'schema': {'type': 'boolean'},
+            }
+            for name in index_fields
+        ]
+        parameters += [
+            {
+                'name': name,
+                'required': False,
+                'in': 'query',
+                'description': f'按 {name} 的ID过滤',
+                'schema': {'type': 'integer'},
+            }
+            for name in related_fields
+        ]
+        if ordering_fields:
+            model = view.get_queryset().model
+            combinations = index_combinations(model, index_fields, ordering_fields)
+            parameters.append({
+                'name': self.ordering_param,
+                'required': False,
+                'in': 'query',
+                'description': f'排序字段，前缀 - 表示倒序，默认 {self.get_default_ordering(view) or "不排序"}。'
+                               f'有索引支持的组合: {describe_combinations(combinations)}',
+                'schema': {'type': 'string', 'enum': [*ordering_fields, *(f'-{name}' for name in ordering_fields)]},
+            })
+        return parameters
@@ -0,0 +1,166 @@
+import codecs
+import re
+from json import JSONDecodeError
+from json.decoder import scanstring
+
+# 每次从文件读取的字节数
+READ_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?')
+_NUMBER_CHARS = re.compile(r'[-+.eE0-9]*')
+_CONSTANTS = {'true': True, 'false': False, 'null': None}
+
+
+class _Buffer:
+    """按需从二进制文件读取并解码的文本缓冲区，已消费的前缀会被丢弃"""
+
+    def __init__(self, fileobj, read_size):
+        self.fileobj = fileobj
+        self.read_size = read_size
+        self.decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """读取更多数据，已到文件末尾时返回 False"""
+        if self.eof:
+            return False
+        data = self.fileobj.read(self.read_size)
+        if self.pos:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        if not data:
+            self.eof = True
+            self.text += self.decoder.decode(b'', final=True)
+            return False
+        self.text += self.decoder.decode(data)
+        return True
+
+    def skip_whitespace(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text) or not self.fill():
+                return
+
+    def error(self, message):
+        return JSONDecodeError(message, self.text, self.pos)
+
+
+def iter_json_events(fileobj, read_size=READ_SIZE):
+    """
+    流式解析 JSON，逐个产出解析事件，内存占用与文件大小无关
+
+    事件与 ijson 的 parse 事件一致：start_map、map_key、end_map、start_array、end_array，
+    以及标量值的 string、number、boolean、null。
+
+    参数:
+        fileobj: 以二进制方式打开的文件对象
+
+    产出:
+        (事件, 值)
+    """
+    buf = _Buffer(fileobj, read_size)
+    # 每层容器：'map' 或 'array'
+    stack = []
+    # 下一个允许出现的内容：value、value_or_end（[ 之后）、key、key_or_end（{ 之后）、
+    # colon、comma_or_end（值之后）、eof（最外层的值结束后）
+    expect = 'value'
+
+    def after_value():
+        return 'comma_or_end' if stack else 'eof'
+
+    while True:
+        buf.skip_whitespace()
+        if buf.pos >= len(buf.text):
+            if expect != 'eof':
+                raise buf.error('JSON 不完整')
+            return
+        char = buf.text[buf.pos]
+        if expect == 'eof':
+            raise buf.error(f'多余的内容 {char!r}')
+
+        if char == ',':
+            if expect != 'comma_or_end':
+                raise buf.error('意外的 ,')
+            buf.pos += 1
+            expect = 'key' if stack[-1] == 'map' else 'value'
+            continue
+        if char == ':':
+            if expect != 'colon':
+                raise buf.error('意外的 :')
+            buf.pos += 1
+            expect = 'value'
+            continue
+        if expect == 'colon':
+            raise buf.error('缺少 :')
+        if char in '}]':
+            container = 'map' if char == '}' else 'array'
+            allowed = ('key_or_end' if container == 'map' else 'value_or_end', 'comma_or_end')
+            if not stack or stack[-1] != container or expect not in allowed:
+                raise buf.error(f'意外的 {char}')
+            stack.pop()
+            buf.pos += 1
+            expect = after_value()
+            yield ('end_map' if container == 'map' else 'end_array'), None
+            continue
+        if expect == 'comma_or_end':
+            raise buf.error('缺少 ,')
+
+        if char == '"':
+            while True:
+                try:
+                    value, end = scanstring(buf.text, buf.pos + 1)
+                    break
+                except JSONDecodeError:
+                    # 字符串被读取边界截断时读取更多数据后重试
+                    if not buf.fill():
+                        raise
+            buf.pos = end
+            if expect in ('key', 'key_or_end'):
+                expect = 'colon'
+                yield 'map_key', value
+            else:
+                expect = after_value()
+                yield 'string', value
+            continue
+        if expect in ('key', 'key_or_end'):
+            raise buf.error('对象的键必须是字符串')
+
+        if char == '{':
+            buf.pos += 1
+            stack.append('map')
+            expect = 'key_or_end'
+            yield 'start_map', None
+            continue
+        if char == '[':
+            buf.pos += 1
+            stack.append('array')
+            expect = 'value_or_end'
+            yield 'start_array', None
+            continue
+
+        if char in '-0123456789':
+            # 数字可能被读取边界截断，读到数字之后的字符或文件末尾为止
+            while _NUMBER_CHARS.match(buf.text, buf.pos).end() == len(buf.text) and buf.fill():
+                pass
+            match = _NUMBER.match(buf.text, buf.pos)
+            if not match:
+                raise buf.error('无法解析的数字')
+            text = match.group()
+            buf.pos = match.end()
+            expect = after_value()
+            yield 'number', float(text) if any(c in text for c in '.eE') else int(text)
+            continue
+
+        while len(buf.text) - buf.pos < 5 and buf.fill():
+            pass
+        for literal, value in _CONSTANTS.items():
+            if buf.text.startswith(literal, buf.pos):
+                buf.pos += len(literal)
+                expect = after_value()
+                yield ('null' if value is None else 'boolean'), value
+                break
+        else:
+            raise buf.error(f'无法解析的字符 {char!r}')
@@ -0,0 +1,145 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
+from rest_framework.response import Response
+
+from utils.streaming import iter_batches
+
+# 这些字段的 to_representation 对数据库返回的值是恒等的（None 由序列化器直接输出），可以跳过
+IDENTITY_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.ReadOnlyField,
+)
+
+# 批量读取多对多关联时，IN 查询每次携带的参数个数
+RELATED_BATCH_SIZE = 900
+
+
+class ProjectionSerializer:
+    """
+    基于 values() 的只读列表序列化
+
+    根据 ModelSerializer（已按 ?fields= 裁剪）的可读字段生成 values() 查询：
+    外键的关联名称（source='role.name'）在 SQL 中 JOIN 取出，多对多字段每页只查询一次关联表，
+    不实例化模型对象。需要格式转换的字段（日期时间等）仍调用原序列化器字段的 to_representation，
+    输出与序列化器完全一致。
+
+    字段来源无法映射到 values() 时（如 source='*'、方法字段、属性），或序列化器重写了
+    to_representation 而投影类没有对应实现时，for_serializer 返回 None，调用方应回退到原序列化器。
+    """
+    # 子类实现了序列化器 to_representation 中的自定义输出时设为 True
+    overrides_representation = False
+
+    def __init__(self, serializer, columns, related):
+        self.serializer = serializer
+        self.model = serializer.Meta.model
+        # [(输出字段名, values() 查询路径或 None, 格式化函数或 None)]，None 路径表示多对多字段
+        self.columns = columns
+        self.related = related
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        if (type(serializer).to_representation is not serializers.Serializer.to_representation
+                and not cls.overrides_representation):
+            return None
+
+        model = serializer.Meta.model
+        columns = []
+        related = {}
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or isinstance(field, serializers.SerializerMethodField):
+                return None
+
+            parts = field.source.split('.')
+            try:
+                model_field = model._meta.get_field(parts[0])
+            except FieldDoesNotExist:
+                return None
+
+            if isinstance(field, ManyRelatedField):
+                if not model_field.many_to_many or len(parts) > 1:
+                    return None
+                related[name] = model_field
+                columns.append((name, None, None))
+                continue
+            if len(parts) > 1 and not model_field.is_relation:
+                return None
+
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                if field.pk_field is not None:
+                    return None
+                formatter = None
+            elif isinstance(field, IDENTITY_FIELDS):
+                formatter = None
+            else:
+                formatter = field.to_representation
+            columns.append((name, '__'.join(parts), formatter))
+        return cls(serializer, columns, related)
+
+    def project(self, queryset):
+        """把查询集转换为 values() 查询，关联名称通过 JOIN 取出"""
+        lookups = [lookup for _, lookup, _ in self.columns if lookup is not None]
+        if self.related:
+            lookups.append('pk')
+        return queryset.prefetch_related(None).select_related(None).values(*lookups)
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        related_values = {}
+        if self.related:
+            pks = [row['pk'] for row in rows]
+            for name, model_field in self.related.items():
+                related_values[name] = self.load_related(name, model_field, pks)
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, lookup, formatter in self.columns:
+                if lookup is None:
+                    item[name] = related_values[name].get(row['pk'], [])
+                    continue
+                value = row[lookup]
+                item[name] = value if value is None or formatter is None else formatter(value)
+            data.append(item)
+        return data
+
+    def load_related(self, name, model_field, pks):
+        """
+        读取一页数据的多对多关联ID
+
+        返回:
+            {主键: [关联ID, ...]}
+        """
+        through = model_field.remote_field.through
+        source = through._meta.get_field(model_field.m2m_field_name()).attname
+        target = through._meta.get_field(model_field.m2m_reverse_field_name()).attname
+        values = {}
+        for batch in iter_batches(pks, RELATED_BATCH_SIZE):
+            queryset = through.objects.filter(**{f'{source}__in': batch}).order_by(source, target)
+            for pk, related_pk in queryset.values_list(source, target):
+                values.setdefault(pk, []).append(related_pk)
+        return values
+
+
+class ProjectionListMixin:
+    """
+    list 动作使用 ProjectionSerializer 直接从 values() 构造响应
+
+    序列化器无法投影时回退到默认实现；分页、过滤和 ?fields= 的行为与默认实现一致。
+    """
+    projection_class = ProjectionSerializer
+
+    def list(self, request, *args, **kwargs):
+        projection = self.projection_class.for_serializer(self.get_serializer())
+        if projection is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = projection.project(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(projection.to_representation(page))
+        return Response(projection.to_representation(queryset))
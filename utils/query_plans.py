@@ -0,0 +1,61 @@
+import re
+
+from django.utils.module_loading import autodiscover_modules
+
+# 各数据库执行计划中表示全表扫描或临时排序的模式
+PLAN_ISSUE_PATTERNS = {
+    'sqlite': [
+        (re.compile(r'\bSCAN (?!.*\bUSING\b.*\bINDEX\b)(\S+)'), '全表扫描'),
+        (re.compile(r'USE TEMP B-TREE FOR (.+)'), '临时B树'),
+    ],
+    'postgresql': [
+        (re.compile(r'Seq Scan on (\S+)'), '全表扫描'),
+        (re.compile(r'Sort Key: (.+)'), '额外排序'),
+    ],
+}
+
+
+class HotQueryRegistry:
+    """
+    热点查询注册表
+
+    各应用在 hot_queries 模块中用 @hot_query 登记返回 QuerySet 的函数，
+    audit_query_plans 命令会对每个查询执行 EXPLAIN 并检查执行计划。
+    """
+
+    def __init__(self):
+        self._queries = {}
+
+    def register(self, name, description=''):
+        def decorator(func):
+            self._queries[name] = (func, description)
+            return func
+        return decorator
+
+    def items(self):
+        return [(name, func, description) for name, (func, description) in self._queries.items()]
+
+
+hot_queries = HotQueryRegistry()
+hot_query = hot_queries.register
+
+
+def autodiscover():
+    """导入所有已安装应用的 hot_queries 模块"""
+    autodiscover_modules('hot_queries')
+
+
+def find_plan_issues(plan, vendor):
+    """
+    从 EXPLAIN 输出中找出全表扫描、临时排序等问题
+
+    返回:
+        [(问题类型, 执行计划中的对应行), ...]
+    """
+    issues = []
+    patterns = PLAN_ISSUE_PATTERNS.get(vendor, [])
+    for line in plan.splitlines():
+        for pattern, label in patterns:
+            if pattern.search(line):
+                issues.append((label, line.strip()))
+    return issues
@@ -0,0 +1,199 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+# 支持的导入导出格式及其 Content-Type
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# 每次从数据库游标读取的行数
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """csv.writer 需要的类文件对象，write 直接返回写入的内容"""
+
+    def write(self, value):
+        return value
+
+
+def iter_chunks(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    按块迭代 values() 投影后的查询结果
+
+    使用 QuerySet.iterator(chunk_size=...)，任意时刻内存中最多保留一个块。
+    """
+    return iter_batches(queryset.iterator(chunk_size=chunk_size), chunk_size)
+
+
+def _format_csv_value(value):
+    if isinstance(value, (list, tuple)):
+        return ';'.join(str(item) for item in value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def render_ndjson(chunks):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for chunk in chunks:
+        yield ''.join(encoder.encode(row) + '\n' for row in chunk)
+
+
+def render_csv(chunks, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for chunk in chunks:
+        yield ''.join(
+            writer.writerow([_format_csv_value(row.get(column)) for column in columns])
+            for row in chunk
+        )
+
+
+def stream_export(queryset, columns, fmt='ndjson', filename='export', enrich=None,
+                  chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    以 NDJSON 或 CSV 流式导出查询结果
+
+    参数:
+        queryset: 已经通过 values() 投影的查询集，应指定稳定的排序
+        columns: 输出的列，CSV 按此顺序写出
+        fmt: 导出格式，'ndjson' 或 'csv'
+        filename: 下载文件名（不含扩展名）
+        enrich: 可选回调，接收一个块（字典列表）并就地补充字段，例如批量查询多对多关系
+        chunk_size: 每块行数
+
+    返回:
+        StreamingHttpResponse
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'不支持的导出格式: {fmt}')
+
+    # 响应内容在视图返回后才被消费，提前确定读取使用的数据库别名
+    queryset = queryset.using(queryset.db)
+
+    def chunks():
+        for chunk in iter_chunks(queryset, chunk_size):
+            if enrich is not None:
+                enrich(chunk)
+            yield chunk
+
+    if fmt == 'csv':
+        content = render_csv(chunks(), columns)
+    else:
+        content = render_ndjson(chunks())
+
+    response = StreamingHttpResponse(content, content_type=f'{EXPORT_FORMATS[fmt]}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+def export_response(request, queryset, columns, filename, enrich=None):
+    """
+    视图中使用的导出快捷函数
+
+    从查询参数 fmt 读取导出格式（默认 ndjson），格式不支持时返回 400。
+    """
+    fmt = request.query_params.get('fmt', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return Response(
+            {'detail': f'不支持的导出格式: {fmt}，可选: {", ".join(EXPORT_FORMATS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return stream_export(queryset, columns, fmt=fmt, filename=filename, enrich=enrich)
+
+
+def guess_format(filename, default='ndjson'):
+    """根据文件扩展名推断导入格式"""
+    suffix = str(filename).rsplit('.', 1)[-1].lower()
+    if suffix in EXPORT_FORMATS:
+        return suffix
+    if suffix in ('jsonl', 'json'):
+        return 'ndjson'
+    return default
+
+
+# 无法按 UTF-8 解码的行的错误信息
+DECODE_ERROR = '不是有效的 UTF-8 编码'
+
+
+def _iter_text_lines(fileobj, bad_lines):
+    """逐行按 UTF-8 解码，无法解码的行用替换字符解码并把行号加入 bad_lines，不中断读取"""
+    for line_no, raw in enumerate(fileobj, start=1):
+        encoding = 'utf-8-sig' if line_no == 1 else 'utf-8'
+        try:
+            yield raw.decode(encoding)
+        except UnicodeDecodeError:
+            bad_lines.add(line_no)
+            yield raw.decode(encoding, errors='replace')
+
+
+def iter_records(fileobj, fmt='ndjson'):
+    """
+    流式解析 CSV 或 NDJSON 文件，逐条产出记录
+
+    不是有效 UTF-8 的行作为该行（CSV 为该条记录）的错误产出，不影响其他行。
+
+    参数:
+        fileobj: 以二进制方式打开的文件对象
+        fmt: 'ndjson' 或 'csv'
+
+    产出:
+        (行号, 记录字典, 错误信息)，解析失败时记录为 None
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'不支持的导入格式: {fmt}')
+
+    bad_lines = set()
+    lines = _iter_text_lines(fileobj, bad_lines)
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        if reader.fieldnames is None:
+            return
+        if bad_lines:
+            yield reader.line_num, None, f'表头{DECODE_ERROR}'
+            return
+        last_line = reader.line_num
+        for row in reader:
+            # 一条记录可能跨越多行（引号内的换行）
+            if any(line_no in bad_lines for line_no in range(last_line + 1, reader.line_num + 1)):
+                yield reader.line_num, None, DECODE_ERROR
+            else:
+                yield reader.line_num, row, None
+            bad_lines.clear()
+            last_line = reader.line_num
+        return
+
+    for line_no, line in enumerate(lines, start=1):
+        if line_no in bad_lines:
+            bad_lines.discard(line_no)
+            yield line_no, None, DECODE_ERROR
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f'JSON解析失败: {e}'
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, '每行必须是一个JSON对象'
+            continue
+        yield line_no, record, None
+
+
+def iter_batches(iterable, batch_size):
+    """把可迭代对象切分为固定大小的列表"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
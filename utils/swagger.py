@@ -25,6 +25,31 @@ SUCCESS_RESPONSE = openapi.Response(
     )
 )
 
+# 导出接口的格式参数
+EXPORT_FORMAT_PARAMETER = openapi.Parameter(
+    'fmt',
+    openapi.IN_QUERY,
+    description='导出格式: ndjson（默认）或 csv',
+    type=openapi.TYPE_STRING,
+    enum=['ndjson', 'csv']
+)
+
+# 稀疏字段集参数，列表和详情接口通用
+SPARSE_FIELDSET_PARAMETERS = [
+    openapi.Parameter(
+        'fields',
+        openapi.IN_QUERY,
+        description='只返回列出的字段，逗号分隔，如 id,title,url',
+        type=openapi.TYPE_STRING
+    ),
+    openapi.Parameter(
+        'expand',
+        openapi.IN_QUERY,
+        description='需要展开的关联字段，逗号分隔；提供 fields 或 expand 后，未列出的关联字段不再展开',
+        type=openapi.TYPE_STRING
+    ),
+]
+
 # 自定义操作描述装饰器
 def api_docs(summary='', description='', security=True, responses=None, **kwargs):
     """
@@ -64,6 +89,7 @@ def api_docs(summary='', description='', security=True, responses=None, **kwargs
 # 针对标准ViewSet方法的预定义装饰器
 def list_api_docs(description=None, **kwargs):
     """获取列表数据的API文档装饰器"""
+    kwargs['manual_parameters'] = SPARSE_FIELDSET_PARAMETERS + kwargs.get('manual_parameters', [])
     return api_docs(
         summary='获取列表数据',
         description=description or '获取资源的列表数据',
@@ -80,6 +106,7 @@ def create_api_docs(description=None, **kwargs):
 
 def retrieve_api_docs(description=None, **kwargs):
     """获取详情的API文档装饰器"""
+    kwargs['manual_parameters'] = SPARSE_FIELDSET_PARAMETERS + kwargs.get('manual_parameters', [])
     return api_docs(
         summary='获取详情',
         description=description or '获取资源的详细信息',
@@ -0,0 +1,70 @@
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# 不影响页面内容的跟踪参数，规范化时去掉
+TRACKING_PARAMETERS = frozenset({
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', 'spm', 'share_source', 'from_source',
+})
+TRACKING_PREFIXES = ('utm_',)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# http 和 https 视为同一地址，规范化形式中不带协议
+WEB_SCHEMES = frozenset(DEFAULT_PORTS)
+# 规范化地址哈希的字节数，十六进制后为两倍长度
+HASH_BYTES = 8
+HASH_LENGTH = HASH_BYTES * 2
+
+
+def _is_tracking(name):
+    name = name.lower()
+    return name in TRACKING_PARAMETERS or name.startswith(TRACKING_PREFIXES)
+
+
+def normalize_url(url):
+    """
+    返回链接地址的规范化形式，用于判断两个地址是否指向同一页面
+
+    规则：缺少协议时按 http 处理，http 与 https 视为相同；主机名转为小写并去掉默认端口；
+    去掉路径末尾的斜杠、跟踪参数（utm_* 等）和锚点（#/、#! 开头的前端路由除外）；其余查询参数按名称排序。
+
+    例如 http://A.com/、https://a.com 和 a.com/?utm_source=x 的规范化形式都是 a.com
+    """
+    url = url.strip()
+    if '://' not in url:
+        url = f'http://{url}'
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+
+    host = (parts.hostname or '').rstrip('.')
+    try:
+        host = host.encode('idna').decode('ascii')
+    except UnicodeError:
+        pass
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{port}'
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f'{parts.username}:{parts.password}'
+        host = f'{userinfo}@{host}'
+
+    path = parts.path.rstrip('/')
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(name)
+    )
+    normalized = host + path
+    if scheme not in WEB_SCHEMES:
+        normalized = f'{scheme}://{normalized}'
+    if query:
+        normalized += '?' + urlencode(query)
+    if parts.fragment.startswith(('/', '!')):
+        normalized += '#' + parts.fragment
+    return normalized
+
+
+def url_hash(url):
+    """规范化地址的定长哈希（16 位十六进制），作为索引列保存"""
+    return hashlib.blake2b(normalize_url(url).encode(), digest_size=HASH_BYTES).hexdigest()